@@ -0,0 +1,350 @@
+from helper import ALIAS_FILE, NUM_DOCS, ADJ_LIST_FILE, DOC_INFO_FILE, INDEX_DIR, INV_IDX_FILE
+from crawler_v2 import API_URL, BATCH_SIZE, MAX_RAW_QUEUE_SIZE, NUM_RAND_SEEDS, SEEDS, parse_page
+from crawlerWorker import PageWriter
+from response_cache import ResponseCache
+
+import aiohttp
+import asyncio
+import json
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import os
+import shutil
+
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+
+### Declare constants
+NUM_FETCHERS         = 256  # Num pages being fetched at once
+MAX_CONNECTIONS      = 256  # Max open connections in total
+MAX_HOST_CONNECTIONS = 64   # Max open connections to a single host
+
+NUM_PARSERS = os.cpu_count() or 1   # Num processes to parse pages (only CPU bound work)
+
+SUMMARY_TIMEOUT = aiohttp.ClientTimeout(sock_connect=1, sock_read=3)
+HTML_TIMEOUT    = aiohttp.ClientTimeout(sock_connect=1, sock_read=10)
+
+IDLE_WAIT = 0.05            # Seconds an idle fetcher waits for new pages
+
+
+class AsyncCrawler:
+    def __init__(self, session: aiohttp.ClientSession, parser_pool: ProcessPoolExecutor,
+                 num_docs: int, api_url: str, cache: ResponseCache | None = None) -> None:
+        """Initialize the crawl state
+
+        Everything runs on one event loop, so the seen sets and the docid
+        counter don't need locks
+
+        :param cache: response cache to replay and record the summaries and html w/
+        """
+
+        self.session = session
+        self.parser_pool = parser_pool
+        self.cache = cache
+
+        self.num_docs = num_docs
+        self.api_url = api_url
+
+        self.frontier: asyncio.Queue[str] = asyncio.Queue(maxsize=MAX_RAW_QUEUE_SIZE)
+
+        self.visited: set[str] = set()
+        self.aliased: set[str] = set()
+        self.omitted: set[str] = set()
+
+        self.curr_aliases: dict[str, str] = {}
+        self.alias_writer: pq.ParquetWriter | None = None
+
+        self.page_writer = PageWriter(DOC_INFO_FILE, INV_IDX_FILE, ADJ_LIST_FILE)
+
+        self.next_docid = 0
+        self.in_flight = 0
+
+        self.finished = asyncio.Event()
+
+        self.pbar: tqdm | None = None
+
+        return
+
+    def save_aliases(self) -> None:
+        """Save the aliases found since the last save"""
+
+        if len(self.curr_aliases) == 0:
+            return
+
+        aliases_df = pd.DataFrame({'from': self.curr_aliases.keys(), 'to': self.curr_aliases.values()})
+        aliases_df = aliases_df.astype({'from': str, 'to': str}).set_index('from')
+
+        aliases_table = pa.Table.from_pandas(aliases_df)
+
+        if self.alias_writer is None:
+            self.alias_writer = pq.ParquetWriter(ALIAS_FILE, aliases_table.schema)
+        self.alias_writer.write_table(aliases_table)
+
+        self.curr_aliases.clear()
+
+        return
+
+    async def _get(self, url: str, timeout: aiohttp.ClientTimeout, as_json: bool) -> dict | str | None:
+        """Get a page over the shared session
+
+        :returns: the decoded response, or None if the request failed
+        """
+
+        try:
+            async with self.session.get(url, timeout=timeout) as res:
+                if not res.ok:
+                    return None
+
+                return await res.json() if as_json else await res.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            return None
+
+    async def _get_page(self, kind: str, slug: str, url: str, timeout: aiohttp.ClientTimeout,
+                        as_json: bool) -> dict | str | None:
+        """Get a response of a page from the cache, or over the shared session on a miss
+
+        :returns: the decoded response, or None if the request failed (or it isn't cached while offline)
+        """
+
+        if self.cache is not None:
+            cached = self.cache.get(kind, slug)
+            if cached is not None:
+                return json.loads(cached[0]) if as_json else cached[0]
+
+            if self.cache.offline:
+                return None
+
+        try:
+            async with self.session.get(url, timeout=timeout) as res:
+                if not res.ok:
+                    return None
+
+                text = await res.text()
+                etag = res.headers.get('ETag', None)
+
+            page = json.loads(text) if as_json else text
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            return None
+
+        if self.cache is not None:
+            self.cache.put(kind, slug, text, etag)
+
+        return page
+
+    async def _resolve_summary(self, slug: str) -> tuple[str, dict] | None:
+        """Get the summary of a page, following aliases to the canonical page
+
+        :returns: the canonical slug and its summary, or None if the page is omitted or already visited
+        """
+
+        while True:
+            summary = await self._get_page('summary', slug, f'{self.api_url}/summary/{slug}', SUMMARY_TIMEOUT, as_json=True)
+            if summary is None:
+                self.omitted.add(slug)
+                self.visited.discard(slug)
+
+                return None
+
+            if summary.get('titles', None) is None or summary['titles'].get('canonical', None) is None:
+                self.omitted.add(slug)
+                self.visited.discard(slug)
+
+                return None
+
+            new_slug = summary['titles']['canonical']
+            if new_slug == slug:
+                return slug, summary
+
+            self.curr_aliases[slug] = new_slug
+            if len(self.curr_aliases) >= BATCH_SIZE:
+                self.save_aliases()
+
+            self.aliased.add(slug)
+            self.visited.discard(slug)
+
+            if new_slug in self.visited:
+                return None
+
+            self.visited.add(new_slug)
+            slug = new_slug
+
+    async def _crawl_page(self, slug: str) -> None:
+        """Fetch, parse, and save a page"""
+
+        resolved = await self._resolve_summary(slug)
+        if resolved is None:
+            return
+
+        slug, summary = resolved
+
+        html = await self._get_page('html', slug, f'{self.api_url}/html/{slug}', HTML_TIMEOUT, as_json=False)
+        if html is None:
+            self.omitted.add(slug)
+            self.visited.discard(slug)
+            return
+
+        # parse in the process pool to keep the event loop free for requests
+        loop = asyncio.get_running_loop()
+        out_links, filtered = await loop.run_in_executor(self.parser_pool, parse_page, html)
+
+        if self.next_docid >= self.num_docs:
+            return
+
+        docid = self.next_docid
+        self.next_docid += 1
+
+        # queue new titles
+        for sub_link in out_links:
+            try:
+                self.frontier.put_nowait(sub_link)
+            except asyncio.QueueFull:
+                break
+
+        self.page_writer.add_page(docid, summary['title'], summary['content_urls']['desktop']['page'], filtered, out_links,
+                                  int(summary.get('revision', 0)))
+
+        # save docs to files every BATCH_SIZE pages
+        if len(self.page_writer.urls) >= BATCH_SIZE:
+            self.page_writer.save_data()
+
+        if self.pbar is not None:
+            self.pbar.update(1)
+
+        if self.next_docid >= self.num_docs:
+            self.finished.set()
+
+        return
+
+    async def _fetcher(self) -> None:
+        """The job of each fetcher coroutine"""
+
+        while not self.finished.is_set():
+            try:
+                slug = self.frontier.get_nowait()
+            except asyncio.QueueEmpty:
+                # stop once no page in flight can add to the frontier
+                if self.in_flight == 0:
+                    self.finished.set()
+                    return
+
+                await asyncio.sleep(IDLE_WAIT)
+                continue
+
+            if slug in self.visited or slug in self.aliased or slug in self.omitted:
+                continue
+
+            self.visited.add(slug)
+
+            self.in_flight += 1
+            try:
+                await self._crawl_page(slug)
+            finally:
+                self.in_flight -= 1
+
+        return
+
+    async def crawl(self, seeds: tuple[str, ...], num_rand_seeds: int, num_fetchers: int) -> None:
+        """Crawl pages from the seeds until num_docs pages are saved or the frontier runs out"""
+
+        for title in seeds:
+            self.frontier.put_nowait(title)
+
+        # add random seeds (random pages can't be replayed)
+        print('Adding some random seed pages...')
+        for i in range(0 if self.cache is not None and self.cache.offline else num_rand_seeds):
+            summary = await self._get(f'{self.api_url}/random/summary', SUMMARY_TIMEOUT, as_json=True)
+            if summary is None:
+                continue
+
+            title = summary['titles']['canonical']
+
+            print(f'\t{i+1}) {title}')
+
+            self.frontier.put_nowait(title)
+
+        print()
+
+        print(f'Starting {num_fetchers} fetchers...')
+        print('\nScrapping pages:')
+
+        self.pbar = tqdm(total=self.num_docs)
+
+        fetchers = [ asyncio.create_task(self._fetcher()) for _ in range(num_fetchers) ]
+        await self.finished.wait()
+
+        # drop the pages still in flight
+        for fetcher in fetchers:
+            fetcher.cancel()
+        await asyncio.gather(*fetchers, return_exceptions=True)
+
+        self.pbar.close()
+        print()
+
+        self.save_aliases()
+        if self.alias_writer is not None:
+            self.alias_writer.close()
+
+        self.page_writer.close()
+
+        print(f'\tThere were {len(self.aliased)} aliased pages and {len(self.omitted)} omitted pages\n')
+
+        if self.cache is not None:
+            print(f'\tResponse cache: {self.cache.hits} hits, {self.cache.misses} misses\n')
+
+        return
+
+
+async def _run_crawler(num_docs: int, api_url: str, seeds: tuple[str, ...], num_rand_seeds: int,
+                       num_fetchers: int, cache_file: str | None, offline: bool) -> None:
+    """Set up the session, parser pool, and response cache, then crawl"""
+
+    cache = ResponseCache(cache_file, offline) if cache_file is not None else None
+
+    # one session reuses keep-alive connections, capped per host
+    connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS, limit_per_host=MAX_HOST_CONNECTIONS)
+
+    print(f'Starting {NUM_PARSERS} parsers...')
+    with ProcessPoolExecutor(max_workers=NUM_PARSERS) as parser_pool:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            crawler = AsyncCrawler(session, parser_pool, num_docs, api_url, cache)
+            await crawler.crawl(seeds, num_rand_seeds, num_fetchers)
+
+        parser_pool.shutdown(cancel_futures=True)
+
+    if cache is not None:
+        cache.close()
+
+    return
+
+def start_async_crawler(num_docs: int = NUM_DOCS, api_url: str = API_URL, seeds: tuple[str, ...] = SEEDS,
+                        num_rand_seeds: int = NUM_RAND_SEEDS, num_fetchers: int = NUM_FETCHERS,
+                        cache_file: str | None = None, offline: bool = False) -> None:
+    """Start crawling web pages and building inverted index w/ concurrent requests
+
+    Writes the same files as crawler_v2.start_crawler, but the summary and
+    html requests of many pages are in flight at once on an event loop.
+    Parsing is done in a process pool, and the pages are saved by the main
+    process (so there are no per worker files to join).
+
+    :param api_url: base url of the Wikipedia REST page API
+    :param cache_file: response cache to replay and record the summaries and html w/ (no cache if None)
+    :param offline: only replay from the response cache (pages that aren't cached are omitted)
+    """
+
+    if offline and cache_file is None:
+        raise ValueError('Crawling offline needs a response cache')
+
+    # del old files
+    for file in (ALIAS_FILE, ADJ_LIST_FILE, DOC_INFO_FILE, INV_IDX_FILE):
+        if os.path.exists(file):
+            os.remove(file)
+
+    if os.path.exists(INDEX_DIR):
+        shutil.rmtree(INDEX_DIR)
+
+    asyncio.run(_run_crawler(num_docs, api_url, seeds, num_rand_seeds, num_fetchers, cache_file, offline))
+
+    print('Finished\n')
+
+    return
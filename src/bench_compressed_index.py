@@ -0,0 +1,75 @@
+from compressed_index import CompressedIndex
+from models import bm25_weights
+from test_compressed_index import NUM_LOOKUP_DOCS, compressed_index, decode_terms
+
+import numpy as np
+import time
+
+### Declare constants
+NUM_BENCH_PAGES = 4000
+
+
+### Declare benchmarks
+def bench_compressed_index() -> None:
+    """Time encoding, decoding, and looking up the compressed index against the raw index"""
+
+    inv_idx, compressed = compressed_index(NUM_BENCH_PAGES)
+
+    start = time.time()
+    CompressedIndex.from_index(inv_idx)
+    encode_time = time.time() - start
+
+    start = time.time()
+    compressed._decode(np.arange(len(compressed.block_firsts)))
+    decode_time = time.time() - start
+
+    rng = np.random.default_rng(6)
+    num_docs = int(inv_idx.docids.max()) + 1
+    lookup_docids = np.sort(rng.choice(num_docs, NUM_LOOKUP_DOCS, replace=False))
+
+    terms = decode_terms(inv_idx, 6)
+    doc_lens = np.bincount(inv_idx.docids, weights=inv_idx.freqs, minlength=num_docs)
+
+    raw_bytes = inv_idx.docids.nbytes + inv_idx.freqs.nbytes
+    num_postings = len(inv_idx.docids)
+    num_decoded = sum( inv_idx.doc_freq(term) for term in terms )
+
+    print(f'Compressed index ({num_postings:,} postings, {len(compressed.block_firsts):,} blocks):')
+    print(f'\tRaw: {raw_bytes / 1e6:.1f} MB ({8 * raw_bytes / num_postings:.1f} bits/posting)')
+    print(f'\tCompressed: {compressed.nbytes / 1e6:.1f} MB ({8 * compressed.nbytes / num_postings:.1f} bits/posting), '
+          f'encoded in {encode_time:.2f} seconds')
+    print(f'\tDecoding every block: {num_postings / decode_time / 1e6:.1f}M postings/sec')
+
+    for name, index in (('Raw', inv_idx), ('Compressed', compressed)):
+        start = time.time()
+        for term in terms:
+            index.postings(term)
+        postings_time = time.time() - start
+
+        # like each query term in tf_idf_ranking
+        start = time.time()
+        for term in terms:
+            doc_ids, doc_cnts = index.postings(term)
+            bm25_weights(doc_cnts, doc_lens[doc_ids], doc_lens.mean(), 1.0)
+        weight_time = time.time() - start
+
+        start = time.time()
+        for term in terms:
+            index.lookup(term, lookup_docids)
+        lookup_time = time.time() - start
+
+        print(f'\t{name}: {num_decoded / postings_time / 1e6:.1f}M postings/sec over {len(terms)} posting lists '
+              f'({num_decoded / weight_time / 1e6:.1f}M/sec w/ BM25 weights), '
+              f'{len(terms) / lookup_time:,.0f} lookups/sec of {NUM_LOOKUP_DOCS} docs')
+    print()
+
+    return
+
+def main() -> None:
+    bench_compressed_index()
+
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+from crawl_state import CrawlState
+from resolver import RESOLVE_BATCH_SIZE
+from test_crawl_state import NUM_CONCURRENT_SLUGS, NUM_CONCURRENT_THREADS
+
+import random
+import tempfile
+import time
+
+from threading import Thread
+
+### Declare benchmarks
+def bench_concurrent_state() -> None:
+    """Time claiming and assigning the same slugs from many threads at once"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        state = CrawlState([], f'{tmp_dir}/concurrent-tasks.jsonl', f'{tmp_dir}/concurrent-frontier.sqlite')
+
+        slugs = [ f'Page_{i}' for i in range(NUM_CONCURRENT_SLUGS) ]
+
+        def organize(i: int) -> None:
+            order = slugs.copy()
+            random.Random(i).shuffle(order)
+
+            for j in range(0, len(order), RESOLVE_BATCH_SIZE):
+                batch = state.claim(order[j:j+RESOLVE_BATCH_SIZE])
+                state.assign([ (slug, slug, slug) for slug in batch ], NUM_CONCURRENT_SLUGS)
+
+            return
+
+        start = time.time()
+        threads = [ Thread(target=organize, args=(i,)) for i in range(NUM_CONCURRENT_THREADS) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+
+        state.close()
+
+    print(f'Concurrent crawl state ({NUM_CONCURRENT_THREADS} threads, {NUM_CONCURRENT_SLUGS} slugs):')
+    print(f'\tClaimed and assigned: {NUM_CONCURRENT_THREADS * NUM_CONCURRENT_SLUGS / elapsed:,.0f} slugs/sec\n')
+
+    return
+
+def main() -> None:
+    bench_concurrent_state()
+
+    return
+
+
+if __name__ == '__main__':
+    main()
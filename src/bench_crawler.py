@@ -0,0 +1,60 @@
+from async_crawler import start_async_crawler
+from crawler_v2 import start_crawler
+from fake_wiki import ACTION_API_URL, API_URL, FAKE_LATENCY, NUM_TEST_DOCS, check_output, fake_server, make_pages, scratch_dir
+
+import io
+import time
+
+from contextlib import redirect_stdout
+
+### Declare constants
+FETCHER_COUNTS   = (8, 64, 256)
+ORGANIZER_COUNTS = (1, 4)
+
+SEEDS = ('Page_0', 'Alias_1')
+
+
+### Declare benchmarks
+def bench_crawlers() -> None:
+    """Time crawls of the fake API w/ different nums of fetchers and organizer threads, and w/ a response cache"""
+
+    pages = make_pages()
+
+    crawls = [ (f'Async crawler w/ {num_fetchers} fetchers',
+                lambda _, num_fetchers=num_fetchers: start_async_crawler(NUM_TEST_DOCS, API_URL, SEEDS, num_rand_seeds=1,
+                                                                          num_fetchers=num_fetchers))
+               for num_fetchers in FETCHER_COUNTS ]
+    crawls += [ (f'Threaded crawler w/ {num_organizers} organizers',
+                 lambda _, num_organizers=num_organizers: start_crawler('mediawiki', num_docs=NUM_TEST_DOCS, api_url=API_URL,
+                                                                        action_api_url=ACTION_API_URL, seeds=SEEDS,
+                                                                        num_rand_seeds=1, num_organizers=num_organizers))
+                for num_organizers in ORGANIZER_COUNTS ]
+    crawls += [ (f'Async crawler w/ a response cache ({"offline replay" if offline else "recording"})',
+                 lambda tmp_dir, offline=offline: start_async_crawler(NUM_TEST_DOCS, API_URL, SEEDS, num_rand_seeds=1,
+                                                                      num_fetchers=FETCHER_COUNTS[-1],
+                                                                      cache_file=f'{tmp_dir}/responses.sqlite', offline=offline))
+                for offline in (False, True) ]
+
+    print(f'Crawlers ({NUM_TEST_DOCS} pages, {FAKE_LATENCY*1000:.0f} ms latency):')
+    with fake_server(pages), scratch_dir() as tmp_dir:
+        for name, crawl in crawls:
+            start = time.time()
+            with redirect_stdout(io.StringIO()):
+                crawl(tmp_dir)
+            elapsed = time.time() - start
+
+            check_output(pages)
+
+            print(f'\t{name}: {elapsed:.2f} seconds, {NUM_TEST_DOCS / elapsed:.1f} pages/sec')
+    print()
+
+    return
+
+def main() -> None:
+    bench_crawlers()
+
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+from crawler_v2 import BATCH_SIZE
+from fake_wiki import make_docs
+from test_crawlerWorker import buffer_postings, vstack_postings
+
+import tempfile
+import time
+import tracemalloc
+
+### Declare constants
+NUM_BENCH_PAGES = 4 * BATCH_SIZE
+
+
+### Declare benchmarks
+def bench_postings_buffer() -> None:
+    """Time buffering and saving postings w/ the old np.vstack buffers and w/ a PageWriter"""
+
+    docs = make_docs(NUM_BENCH_PAGES, 3)
+
+    print(f'Postings buffers ({NUM_BENCH_PAGES} pages, {sum( len(c) for _, c in docs ) // NUM_BENCH_PAGES} terms/page, '
+          f'{BATCH_SIZE} page batches):')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, save in (('np.vstack', vstack_postings), ('PostingsBuffer', buffer_postings)):
+            tracemalloc.start()
+            start = time.time()
+            for i in range(0, NUM_BENCH_PAGES, BATCH_SIZE):
+                save(docs[i:i+BATCH_SIZE], f'{tmp_dir}/{name}-postings.parquet')
+            elapsed = time.time() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            print(f'\t{name}: {NUM_BENCH_PAGES / elapsed:.1f} pages/sec, {peak / 1e6:.1f} MB peak')
+    print()
+
+    return
+
+def main() -> None:
+    bench_postings_buffer()
+
+    return
+
+
+if __name__ == '__main__':
+    main()
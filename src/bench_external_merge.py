@@ -0,0 +1,47 @@
+from external_merge import MERGE_FAN_IN, merge_postings
+from helper import measure
+from test_external_merge import MERGE_PART_SIZE, merge_in_memory, write_parts
+
+import os
+import pyarrow.parquet as pq
+import tempfile
+
+### Declare constants
+MERGE_PART_COUNTS = (24, 96)
+
+
+### Declare benchmarks
+def bench_external_merge() -> None:
+    """Time merging part files in passes and in memory"""
+
+    print(f'External merge (fan in of {MERGE_FAN_IN}, {MERGE_PART_SIZE} docs/part):')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_parts in MERGE_PART_COUNTS:
+            merge_dir = f'{tmp_dir}/merge-{num_parts}'
+            os.mkdir(merge_dir)
+
+            files = write_parts(merge_dir, num_parts)
+
+            results = dict()
+            with measure() as results['In memory']:
+                merge_in_memory(files['inv_idx'], f'{merge_dir}/in-memory.parquet')
+
+            with measure() as results['External merge']:
+                merge_postings(files['inv_idx'], f'{merge_dir}/merged.parquet', merge_dir)
+
+            metadata = pq.ParquetFile(f'{merge_dir}/merged.parquet').metadata
+            for name, stats in results.items():
+                print(f'\t{name} of {num_parts} parts ({metadata.num_rows:,} postings, {metadata.num_row_groups} row groups): '
+                      f'{stats["seconds"]:.2f} seconds, {stats["peak"] / 1e6:.1f} MB peak')
+    print()
+
+    return
+
+def main() -> None:
+    bench_external_merge()
+
+    return
+
+
+if __name__ == '__main__':
+    main()
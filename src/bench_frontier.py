@@ -0,0 +1,55 @@
+from frontier import PriorityFrontier
+from test_frontier import frontier_links
+
+import tempfile
+import time
+
+from collections import Counter
+
+### Declare constants
+NUM_BENCH_LINKS = 200000
+NUM_BENCH_SLUGS = 50000
+BENCH_SIZES     = (NUM_BENCH_LINKS, 2000)
+NUM_FIRST_POPS  = 1000
+
+
+### Declare benchmarks
+def bench_frontier() -> None:
+    """Time pushing and popping links w/ skewed in-link counts, and compare the pop order to a FIFO queue"""
+
+    links = frontier_links(NUM_BENCH_LINKS, NUM_BENCH_SLUGS)
+    in_links = Counter(links)
+
+    fifo = list(dict.fromkeys(links))[:NUM_FIRST_POPS]
+    print(f'Frontier ({NUM_BENCH_LINKS} links, {len(in_links)} slugs):')
+    print(f'\tFIFO: {sum( in_links[slug] for slug in fifo ) / len(fifo):.1f} avg in-links of the first {NUM_FIRST_POPS} slugs')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for max_size in BENCH_SIZES:
+            frontier = PriorityFrontier(f'{tmp_dir}/frontier-{max_size}.sqlite', max_size)
+
+            start = time.time()
+            for link in links:
+                frontier.push(link)
+
+            popped = list()
+            while (slug := frontier.pop()) is not None:
+                popped.append(slug)
+            elapsed = time.time() - start
+            frontier.close()
+
+            first = popped[:NUM_FIRST_POPS]
+            print(f'\tMax size {max_size}: {sum( in_links[slug] for slug in first ) / len(first):.1f} avg in-links of the first '
+                  f'{NUM_FIRST_POPS} slugs, {NUM_BENCH_LINKS / elapsed:,.0f} links/sec')
+    print()
+
+    return
+
+def main() -> None:
+    bench_frontier()
+
+    return
+
+
+if __name__ == '__main__':
+    main()
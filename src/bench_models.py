@@ -0,0 +1,71 @@
+from fake_wiki import WORDS, make_pages, scratch_dir, write_pages
+from helper import INDEX_DIR, load_data
+from link_ranking import calc_link_ranks
+from models import WeightMatrix, prob_ranking, tf_idf_maxscore_ranking, tf_idf_ranking, weighted_ranking
+from processer import build_vocab_and_index, store_index
+from test_models import NUM_MAXSCORE_DOCS, NUM_WEIGHT_QUERIES, maxscore_index
+
+import io
+import random
+import time
+
+from contextlib import redirect_stdout
+from functools import partial
+
+### Declare benchmarks
+def bench_weight_matrix() -> None:
+    """Time ranking queries w/ the stored model weights and w/ the single query models"""
+
+    with scratch_dir():
+        write_pages(make_pages())
+        with redirect_stdout(io.StringIO()):
+            build_vocab_and_index()
+            calc_link_ranks()
+            store_index()
+
+        doc_info, inv_idx, vocab = load_data(silence=True)
+        weights = { model: WeightMatrix.load(INDEX_DIR, model, mmap_mode=None) for model in ('tf_idf', 'prob') }
+
+    rng = random.Random(7)
+    queries = [ ' '.join(rng.choices(WORDS, k=rng.randint(1, 4))) for _ in range(NUM_WEIGHT_QUERIES) ]
+
+    print(f'Weight matrices ({len(doc_info)} docs, {len(inv_idx)} terms, {NUM_WEIGHT_QUERIES} queries):')
+    for model, rank_query in (('tf_idf', tf_idf_ranking), ('prob', prob_ranking)):
+        start = time.time()
+        for query in queries:
+            rank_query(doc_info, inv_idx, vocab, query, silence=True)
+        print(f'\t{model} (postings): {(time.time() - start) / NUM_WEIGHT_QUERIES * 1000:.3f} ms/query')
+
+        start = time.time()
+        for query in queries:
+            weighted_ranking(doc_info, weights[model], vocab, query, silence=True)
+        print(f'\t{model} (weight matrix): {(time.time() - start) / NUM_WEIGHT_QUERIES * 1000:.3f} ms/query')
+    print()
+
+    return
+
+def bench_maxscore() -> None:
+    """Time ranking queries w/ and w/o MaxScore pruning"""
+
+    doc_info, inv_idx, vocab, prior_top, queries = maxscore_index(NUM_MAXSCORE_DOCS)
+
+    print(f'MaxScore ({len(doc_info)} docs, {len(inv_idx)} terms, {len(queries)} queries):')
+    for top_k in (1, 10, 100):
+        for name, rank_query in (('exhaustive', tf_idf_ranking), ('MaxScore', partial(tf_idf_maxscore_ranking, prior_top=prior_top))):
+            start = time.time()
+            for query in queries:
+                rank_query(doc_info, inv_idx, vocab, query, top_k=top_k, silence=True)
+            print(f'\t{name} (top {top_k}): {(time.time() - start) / len(queries) * 1000:.3f} ms/query')
+    print()
+
+    return
+
+def main() -> None:
+    bench_weight_matrix()
+    bench_maxscore()
+
+    return
+
+
+if __name__ == '__main__':
+    main()
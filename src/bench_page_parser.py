@@ -0,0 +1,50 @@
+from crawler_v2 import parse_page
+from test_page_parser import soup_parse_page, parser_pages
+
+import time
+import tracemalloc
+
+### Declare constants
+NUM_LARGE_COPIES = 8    # Num of copies of the fixture pages in the large page the parsers are timed on
+PARSE_BENCH_TIME = 2    # CPU seconds each parser is timed for
+
+
+### Declare benchmarks
+def bench_page_parser() -> None:
+    """Time the streaming page parser and a BeautifulSoup tree on the fixture pages and on a large page"""
+
+    fixtures = [ html for name, html in parser_pages().items() if name.endswith('.html') ]
+
+    # a page about as large as a long article
+    bodies = ''.join( html.split('<body', 1)[1].split('>', 1)[1].replace('</body></html>', '') for html in fixtures )
+    large = f'<html><body>{bodies * NUM_LARGE_COPIES}</body></html>'
+
+    print('Page parser:')
+    for pages, label in ((fixtures, f'{len(fixtures)} fixture pages'), ([large], f'a {len(large) // 1000} KB page')):
+        for name, parse in (('BeautifulSoup', soup_parse_page), ('Streaming', parse_page)):
+            num_pages = 0
+            start = time.process_time()
+            while time.process_time() - start < PARSE_BENCH_TIME:
+                for html in pages:
+                    parse(html)
+                num_pages += len(pages)
+            elapsed = time.process_time() - start
+
+            tracemalloc.start()
+            parse(pages[0])
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            print(f'\t{name} on {label}: {num_pages / elapsed:.1f} pages/sec per core, {peak / 1e6:.1f} MB peak')
+    print()
+
+    return
+
+def main() -> None:
+    bench_page_parser()
+
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+from helper import _parse_word, parse_text
+from test_parse import NUM_RANDOM_TEXTS, REGRESSION_CORPUS, parse_text_ref, random_texts
+
+import time
+
+### Declare constants
+BENCH_REPEATS = 5
+
+
+### Declare benchmarks
+def bench_parse_text() -> None:
+    """Compare the throughput of the original parse_text and the single pass one on a corpus of realistic text"""
+
+    texts = REGRESSION_CORPUS + random_texts(NUM_RANDOM_TEXTS)
+    bench_texts = [ REGRESSION_CORPUS[i] for i in (2, 3, 14) ] * 200 + texts
+    num_tokens = sum( len(parse_text_ref(text)) for text in bench_texts )
+
+    for name, parse in (('Original', parse_text_ref), ('Single pass', parse_text)):
+        _parse_word.cache_clear()
+
+        start = time.time()
+        for _ in range(BENCH_REPEATS):
+            for text in bench_texts:
+                parse(text)
+        elapsed = time.time() - start
+
+        print(f'{name}:')
+        print(f'\tTime: {elapsed:.2f} seconds')
+        print(f'\tThroughput: {BENCH_REPEATS*num_tokens / elapsed:,.0f} tokens/sec\n')
+
+    print(f'Stem cache: {_parse_word.cache_info()}')
+
+    return
+
+def main() -> None:
+    bench_parse_text()
+
+    return
+
+
+if __name__ == '__main__':
+    main()
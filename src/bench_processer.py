@@ -0,0 +1,48 @@
+from fake_wiki import make_docs, scratch_dir, write_docs
+from helper import INV_IDX_FILE, measure
+from processer import build_vocab_and_index
+from test_processer import string_build, write_string_postings
+
+import io
+import pyarrow.parquet as pq
+
+from contextlib import redirect_stdout
+
+### Declare constants
+NUM_BENCH_PAGES = 4000
+
+
+### Declare benchmarks
+def bench_term_ids() -> None:
+    """Time building the vocab and reducing the inverted index of many docs in the fused stages and w/ strings"""
+
+    with scratch_dir():
+        write_docs(make_docs(NUM_BENCH_PAGES, 4))
+        write_string_postings()
+        num_postings = pq.ParquetFile(INV_IDX_FILE).metadata.num_rows
+
+        results = dict()
+        with redirect_stdout(io.StringIO()):
+            with measure() as results['Strings']:
+                string_build()
+
+            with measure() as results['Fused']:
+                stages = build_vocab_and_index()
+
+        num_kept = pq.ParquetFile(INV_IDX_FILE).metadata.num_rows
+
+    print(f'Vocab and reduced index ({NUM_BENCH_PAGES} docs, {num_postings:,} postings, {num_kept:,} kept):')
+    for name, stats in list(results.items()) + [ (f'- {stage}', stats) for stage, stats in stages.items() ]:
+        print(f'\t{name}: {stats["seconds"]:.2f} seconds, {stats["peak"] / 1e6:.1f} MB peak')
+    print()
+
+    return
+
+def main() -> None:
+    bench_term_ids()
+
+    return
+
+
+if __name__ == '__main__':
+    main()
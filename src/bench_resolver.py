@@ -0,0 +1,38 @@
+from fake_wiki import ACTION_API_URL, API_URL, FAKE_LATENCY, fake_server, make_pages
+from resolver import FakeBackend, MediaWikiBackend, SummaryBackend
+from test_resolver import NUM_RESOLVE_SLUGS, canonical_pages, resolve_slugs
+
+import requests
+import time
+
+### Declare benchmarks
+def bench_resolvers() -> None:
+    """Time resolving the links of the canned pages w/ each backend"""
+
+    pages = make_pages()
+
+    slugs = list(dict.fromkeys( link for page in pages.values() for link in page['links'] ))[:NUM_RESOLVE_SLUGS]
+    fake = FakeBackend(canonical_pages(pages))
+
+    print(f'Resolvers ({len(slugs)} slugs, {FAKE_LATENCY*1000:.0f} ms latency):')
+    session = requests.Session()
+    with fake_server(pages):
+        for name, backend in (('Summary', SummaryBackend(session, API_URL)), ('MediaWiki', MediaWikiBackend(session, ACTION_API_URL))):
+            start = time.time()
+            crawl, _, _ = resolve_slugs(backend, slugs, fake)
+            elapsed = time.time() - start
+
+            print(f'\t{name}: {elapsed:.2f} seconds, {len(crawl)} pages to crawl')
+    session.close()
+    print()
+
+    return
+
+def main() -> None:
+    bench_resolvers()
+
+    return
+
+
+if __name__ == '__main__':
+    main()
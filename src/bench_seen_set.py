@@ -0,0 +1,56 @@
+from seen_set import BloomFilter, SeenSet, ShardedSeenSet
+from test_seen_set import seen_slugs
+
+import sys
+import time
+import tracemalloc
+
+### Declare constants
+NUM_BENCH_SLUGS = 200000
+
+
+### Declare benchmarks
+def bench_seen_sets() -> None:
+    """Measure the memory and lookup time of a set of slugs, a SeenSet, a ShardedSeenSet, and a BloomFilter"""
+
+    slugs, unseen = seen_slugs(NUM_BENCH_SLUGS)
+
+    print(f'Seen sets ({NUM_BENCH_SLUGS} slugs):')
+    for name, make in (('set[str]', set), ('SeenSet', SeenSet), ('ShardedSeenSet', ShardedSeenSet)):
+        tracemalloc.start()
+        seen = make()
+        for slug in slugs:
+            seen.add(slug)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        # the memory of the slugs themselves is only saved if nothing else keeps them
+        size += sum( sys.getsizeof(slug) for slug in slugs ) if name == 'set[str]' else 0
+
+        start = time.time()
+        for slug in slugs + unseen:
+            slug in seen
+        elapsed = time.time() - start
+
+        print(f'\t{name}: {size / NUM_BENCH_SLUGS:.1f} bytes/slug, {2*NUM_BENCH_SLUGS / elapsed:,.0f} lookups/sec')
+
+    seen_filter = BloomFilter(NUM_BENCH_SLUGS, 0.001)
+    start = time.time()
+    seen_filter.add(slugs)
+    seen_filter.contains(slugs)
+    false_positives = seen_filter.contains(unseen).mean()
+    elapsed = time.time() - start
+
+    print(f'\tBloomFilter: {len(seen_filter.bits) / NUM_BENCH_SLUGS:.1f} bytes/slug, '
+          f'{false_positives:.4f} false positive rate, {3*NUM_BENCH_SLUGS / elapsed:,.0f} slugs/sec\n')
+
+    return
+
+def main() -> None:
+    bench_seen_sets()
+
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,53 @@
-from crawler_v2 import start_crawler
+from async_crawler import start_async_crawler
+from crawler_v2 import NUM_ORG_THREADS, RESOLVER_BACKEND, start_crawler
+from helper import RESPONSE_CACHE_FILE
 from link_ranking import calc_link_ranks
-from processer import create_vocab, reduce_and_sort
+from processer import build_vocab_and_index, store_index
+from recrawl import start_recrawl
+
+import argparse
 
 def main() -> None:
-    start_crawler()
+    parser = argparse.ArgumentParser(description='Crawl Wikipedia and build the index')
+    parser.add_argument('--async-crawl', action='store_true',
+                        help='fetch pages concurrently on an event loop instead of w/ threads and workers')
+    parser.add_argument('--resolver', choices=('mediawiki', 'summary'), default=RESOLVER_BACKEND,
+                        help='how the threaded crawler resolves aliases (bulk action API queries or a summary per page)')
+    parser.add_argument('--organizers', type=int, default=NUM_ORG_THREADS,
+                        help='num of threads the threaded crawler resolves slugs and assigns docids w/')
+    parser.add_argument('--cache', action='store_true',
+                        help=f'replay pages from (and record new pages to) the response cache in {RESPONSE_CACHE_FILE}')
+    parser.add_argument('--offline', action='store_true',
+                        help='only replay pages from the response cache (implies --cache)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only refetch the pages that changed since the last build and patch the stored index')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue the threaded crawl from its last checkpoint instead of starting over')
+    args = parser.parse_args()
+
+    if args.resume and args.async_crawl:
+        parser.error('--resume only works w/ the threaded crawler')
+
+    cache_file = RESPONSE_CACHE_FILE if args.cache or args.offline else None
 
-    inv_idx, vocab = create_vocab()
+    if args.incremental:
+        start_recrawl(cache_file=cache_file)
+        return
 
-    reduce_and_sort(inv_idx, vocab)
+    if args.async_crawl:
+        start_async_crawler(cache_file=cache_file, offline=args.offline)
+        vocab = None
+    else:
+        vocab = start_crawler(args.resolver, cache_file, args.offline, args.resume, num_organizers=args.organizers)
 
-    del inv_idx, vocab
+    build_vocab_and_index(vocab)
+
+    del vocab
 
     calc_link_ranks()
 
+    store_index()
+
     return
 
 if __name__ == "__main__":
@@ -0,0 +1,238 @@
+from inverted_index import InvertedIndex, lookup_sorted
+
+import numpy as np
+import os
+
+### Declare constants
+BLOCK_SIZE = 128    # Postings in each block (the unit that is skipped or decoded)
+
+# arrays of the compressed index format (stored as <index dir>/<name>.npy)
+COMPRESSED_ARRAYS = ('terms', 'offsets', 'block_firsts', 'block_pos', 'block_widths', 'data')
+
+# byte, and bit in the byte, each value of a block starts at, and the mask of its bits, for each width
+_LANES      = np.arange(BLOCK_SIZE)
+_LANE_BYTES = (np.arange(33)[:, None] * _LANES) >> 3
+_LANE_BITS  = ((np.arange(33)[:, None] * _LANES) & 7).astype(np.uint64)
+_MASKS      = (np.uint64(1) << np.arange(33, dtype=np.uint64)) - np.uint64(1)
+
+# bytes after the data, so a whole block of 32 bit values (and the word at its end) can be read past any block
+_PADDING = 4 * BLOCK_SIZE + 8
+
+def _bit_widths(values: np.ndarray) -> np.ndarray:
+    """Get the num of bits needed for each (non-negative) value"""
+
+    widths = np.zeros(len(values), dtype=np.uint8)
+    for bit in range(32):
+        widths += (values >> bit) > 0
+
+    return widths
+
+def _pack(data: np.ndarray, values: np.ndarray, bit_pos: np.ndarray) -> None:
+    """Write each value (of at most 32 bits) at its bit position in the data
+
+    The values' bits don't overlap, so adding the bytes of each is the same
+    as or-ing them in
+    """
+
+    shifted = values.astype(np.uint64) << (bit_pos & 7).astype(np.uint64)
+    byte_pos = (bit_pos >> 3).astype(np.int64)
+
+    for i in range(5):
+        data += np.bincount(byte_pos + i, weights=(shifted >> np.uint64(8 * i)) & np.uint64(0xff),
+                            minlength=len(data))[:len(data)].astype(np.uint8)
+
+    return
+
+def _unpack(words: np.ndarray, byte_pos: np.ndarray, widths: np.ndarray) -> np.ndarray:
+    """Read a whole block of values of each width at each byte position
+
+    Each value is gathered, shifted, and masked w/ the lanes of its block's
+    width, so blocks of any widths are read at once. The values past the
+    end of a partial block are garbage.
+
+    :param words: the little endian 64 bit word starting at each byte of the data
+    :returns: values of each block as a (num of blocks x BLOCK_SIZE) array
+    """
+
+    widths = widths.astype(np.intp)
+    block_words = words[byte_pos[:, None] + _LANE_BYTES[widths]]
+
+    return ((block_words >> _LANE_BITS[widths]) & _MASKS[widths, None]).astype(np.uint32)
+
+class CompressedIndex:
+    def __init__(self, terms: np.ndarray, offsets: np.ndarray, block_firsts: np.ndarray, block_pos: np.ndarray,
+                 block_widths: np.ndarray, data: np.ndarray) -> None:
+        """Initialize the index from its compressed arrays
+
+        The postings of the term terms[i] (offsets[i]:offsets[i+1] in
+        docid order) are split into blocks of BLOCK_SIZE. Each block is
+        data[block_pos[b]:block_pos[b+1]], and holds the gaps between its
+        docids (less 1) and then its frequencies (less 1), each bit packed
+        w/ the widths in block_widths[b]. The first docid of each block is
+        kept in block_firsts, so blocks can be skipped w/o decoding them.
+
+        It has the same lookups as InvertedIndex, but can't be updated
+        """
+
+        self.terms: np.ndarray        = terms
+        self.offsets: np.ndarray      = offsets.astype(np.int64, copy=False)
+        self.block_firsts: np.ndarray = block_firsts
+        self.block_pos: np.ndarray    = block_pos
+        self.block_widths: np.ndarray = block_widths
+        self.data: np.ndarray         = data
+
+        self.term_ids: dict[str, int] = { str(term): i for i, term in enumerate(terms) }
+
+        # first block of each term
+        self.block_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(-(-np.diff(self.offsets) // BLOCK_SIZE), out=self.block_offsets[1:])
+
+        # the data is padded, so a word can be read at any byte of it
+        self.words = np.ndarray(shape=(max(len(data) - 7, 0),), dtype='<u8', buffer=data, strides=(1,))
+
+        return
+
+    @classmethod
+    def from_index(cls, inv_idx: InvertedIndex) -> 'CompressedIndex':
+        """Compress the postings of an index"""
+
+        offsets, docids, freqs = inv_idx.offsets, inv_idx.docids, inv_idx.freqs
+        doc_freqs = np.diff(offsets)
+
+        block_offsets = np.zeros(len(doc_freqs) + 1, dtype=np.int64)
+        np.cumsum(-(-doc_freqs // BLOCK_SIZE), out=block_offsets[1:])
+        num_blocks = int(block_offsets[-1])
+
+        # index of each posting in its term's list, and its block
+        pos = np.arange(len(docids)) - np.repeat(offsets[:-1], doc_freqs)
+        blocks = np.repeat(block_offsets[:-1], doc_freqs) + pos // BLOCK_SIZE
+        pos_in_block = pos % BLOCK_SIZE
+
+        is_first = pos_in_block == 0
+        block_starts = np.flatnonzero(is_first)
+        block_lens = np.diff(np.append(block_starts, len(docids)))
+
+        gaps = np.zeros(len(docids), dtype=np.int64)
+        gaps[1:] = np.diff(docids.astype(np.int64)) - 1
+        gaps[is_first] = 0
+        freq_vals = freqs.astype(np.int64) - 1
+
+        block_widths = np.zeros((num_blocks, 2), dtype=np.uint8)
+        if num_blocks > 0:
+            block_widths[:, 0] = _bit_widths(np.maximum.reduceat(gaps, block_starts))
+            block_widths[:, 1] = _bit_widths(np.maximum.reduceat(freq_vals, block_starts))
+
+        # the gaps, then the freqs, of each block are padded to whole bytes
+        gap_bytes  = (block_lens * block_widths[:, 0] + 7) // 8
+        freq_bytes = (block_lens * block_widths[:, 1] + 7) // 8
+
+        block_pos = np.zeros(num_blocks + 1, dtype=np.int64)
+        np.cumsum(gap_bytes + freq_bytes, out=block_pos[1:])
+
+        data = np.zeros(block_pos[-1] + _PADDING, dtype=np.uint8)
+        _pack(data, gaps, 8 * block_pos[blocks] + pos_in_block * block_widths[blocks, 0])
+        _pack(data, freq_vals, 8 * (block_pos[blocks] + gap_bytes[blocks]) + pos_in_block * block_widths[blocks, 1])
+
+        return cls(inv_idx.terms, offsets, docids[block_starts], block_pos, block_widths, data)
+
+    @classmethod
+    def load(cls, index_dir: str, mmap_mode: str = 'r') -> 'CompressedIndex':
+        """Open an index stored w/ save as memory mapped arrays (see InvertedIndex.load)"""
+
+        arrays = { name: np.load(f'{index_dir}/{name}.npy', mmap_mode=mmap_mode) for name in COMPRESSED_ARRAYS }
+
+        return cls(**arrays)
+
+    def save(self, index_dir: str) -> None:
+        """Store the index as flat binary arrays that can be memory mapped"""
+
+        if not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+
+        arrays = {
+            'terms':        np.asarray(self.terms, dtype=str),
+            'offsets':      self.offsets,
+            'block_firsts': self.block_firsts,
+            'block_pos':    self.block_pos,
+            'block_widths': self.block_widths,
+            'data':         self.data
+        }
+
+        for name, array in arrays.items():
+            np.save(f'{index_dir}/{name}.npy', array)
+
+        return
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the compressed postings (w/ the block metadata)"""
+
+        return self.data.nbytes + self.block_firsts.nbytes + self.block_pos.nbytes + self.block_widths.nbytes
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.term_ids
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def _decode(self, blocks: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Decode the postings of some blocks (in order)"""
+
+        term_ids = np.searchsorted(self.block_offsets, blocks, side='right') - 1
+        block_starts = self.offsets[term_ids] + BLOCK_SIZE * (blocks - self.block_offsets[term_ids])
+        block_lens = np.minimum(self.offsets[term_ids + 1] - block_starts, BLOCK_SIZE)
+
+        gap_widths, freq_widths = self.block_widths[blocks, 0], self.block_widths[blocks, 1]
+        gap_pos  = self.block_pos[blocks]
+        freq_pos = gap_pos + (block_lens * gap_widths + 7) // 8
+
+        # each docid is the block's first plus the gaps (and 1 per gap) up to it
+        docids = np.cumsum(_unpack(self.words, gap_pos, gap_widths), axis=1, dtype=np.int32)
+        docids += self.block_firsts[blocks, None] + _LANES.astype(np.int32)
+
+        freqs = _unpack(self.words, freq_pos, freq_widths).view(np.int32)
+        freqs += 1
+
+        if (block_lens == BLOCK_SIZE).all():
+            return docids.ravel(), freqs.ravel()
+
+        in_block = _LANES < block_lens[:, None]
+
+        return docids[in_block], freqs[in_block]
+
+    def postings(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        """Get the posting list of a term
+
+        :returns:
+            docids of the docs containing the term
+            frequency of the term in each doc
+        """
+
+        term_id = self.term_ids[term]
+
+        return self._decode(np.arange(self.block_offsets[term_id], self.block_offsets[term_id + 1]))
+
+    def doc_freq(self, term: str) -> int:
+        """Get the number of docs containing the term"""
+
+        term_id = self.term_ids[term]
+
+        return int(self.offsets[term_id + 1] - self.offsets[term_id])
+
+    def lookup(self, term: str, docids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Look up the frequency of a term in the given (sorted) docs, only decoding the blocks they fall in
+
+        :returns:
+            mask of the docs that contain the term
+            frequency of the term in each of those docs
+        """
+
+        term_id = self.term_ids[term]
+        start, end = self.block_offsets[term_id], self.block_offsets[term_id + 1]
+
+        blocks = np.searchsorted(self.block_firsts[start:end], docids, side='right') - 1
+        blocks = np.unique(blocks[blocks >= 0]) + start
+
+        doc_ids, doc_cnts = self._decode(blocks)
+
+        return lookup_sorted(doc_ids, doc_cnts, docids)
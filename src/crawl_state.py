@@ -0,0 +1,302 @@
+from helper import NUM_DOCS
+from frontier import PriorityFrontier
+from seen_set import BloomFilter, ShardedSeenSet
+
+import itertools
+import json
+import os
+import pickle
+
+from contextlib import ExitStack
+from threading import Condition, Lock
+from typing import Iterator
+
+SEEN_FILTER_CAPACITY   = 4 * NUM_DOCS   # Num seen slugs the filter the workers check is sized for
+SEEN_FILTER_ERROR_RATE = 0.001          # Chance of an unseen link being dropped by a worker at capacity
+
+MAX_FRONTIER_SIZE = 2 * NUM_DOCS        # Num frontier slugs kept in memory before spilling to disk
+
+MAX_RESOLVE_ATTEMPTS = 3                # Num of failed requests to resolve a slug before it's omitted
+
+# docid, slug, title, and url of a page assigned to a worker
+Task = tuple[int, str, str, str]
+
+class CrawlState:
+    def __init__(self, seeds: list[str], task_log_file: str, frontier_file: str) -> None:
+        """Initialize the bookkeeping shared by the organizer threads
+
+        Any num of organizers can use it at once, there is no lock over all
+        of it. The seen sets are sharded by hash w/ a lock per shard, docids
+        are drawn from an atomic counter, and the frontier has its own lock.
+        Every assigned task is appended to the task log, so no docid is lost
+        between checkpoints.
+
+        The seen sets only store the hashes of the slugs. Every slug that
+        has been resolved is also added to a shared Bloom filter, so the
+        workers can skip queueing links that have been seen.
+
+        The frontier orders the slugs that haven't been seen yet by their
+        in-link count, and frontier_ready is notified when slugs are pushed.
+        The batches popped from it are in flight until finish_batch, so the
+        crawl can tell when the frontier has run out (see is_idle).
+        """
+
+        self.seeds = seeds
+
+        self.visited = ShardedSeenSet()
+        self.aliased = ShardedSeenSet()
+        self.omitted = ShardedSeenSet()
+
+        self.seen_filter = BloomFilter(SEEN_FILTER_CAPACITY, SEEN_FILTER_ERROR_RATE)
+
+        self.frontier = PriorityFrontier(frontier_file, MAX_FRONTIER_SIZE)
+        self.frontier_lock = Lock()
+        self.frontier_ready = Condition(self.frontier_lock)
+
+        # batches popped from the frontier that aren't finished (guarded by the frontier lock)
+        self.num_batches = 0
+
+        # links the workers queued that were pushed to the frontier (only updated by the feeder thread)
+        self.num_links_fed = 0
+
+        self.aliases: dict[str, str] = dict()
+
+        # slug -> num of failed requests to resolve it (guarded by the frontier lock)
+        self.failures: dict[str, int] = dict()
+
+        # next on a count (or a chain of C iterators) never releases the GIL, so it is atomic
+        self.docids: Iterator[int] = itertools.count()
+        self.num_assigned = 0
+
+        self.task_log = open(task_log_file, 'a', encoding='utf-8')
+        self.task_log_lock = Lock()
+
+        # held by each organizer while it has a batch in flight
+        self.batch_locks: list[Lock] = list()
+
+        return
+
+    def is_seen(self, slug: str) -> bool:
+        return slug in self.visited or slug in self.aliased or slug in self.omitted
+
+    def push_links(self, slugs: list[str]) -> None:
+        """Push the slugs that haven't been seen to the frontier (one in-link each)"""
+
+        unseen = [ slug for slug in slugs if not self.is_seen(slug) ]
+
+        with self.frontier_lock:
+            for slug in unseen:
+                self.frontier.push(slug)
+
+            self.frontier_ready.notify_all()
+
+        return
+
+    def requeue(self, slugs: list[str]) -> None:
+        """Push the slugs whose request to resolve them failed back to the frontier
+
+        A slug is omitted once MAX_RESOLVE_ATTEMPTS requests have failed
+        """
+
+        with self.frontier_lock:
+            for slug in slugs:
+                self.failures[slug] = self.failures.get(slug, 0) + 1
+                if self.failures[slug] >= MAX_RESOLVE_ATTEMPTS:
+                    self.omitted.add(slug)
+                    continue
+
+                self.frontier.push(slug)
+
+            self.frontier_ready.notify_all()
+
+        return
+
+    def pop_batch(self, max_size: int, timeout: float) -> list[str]:
+        """Pop the highest scored slugs of the frontier
+
+        If the frontier is empty, waits up to timeout for slugs to be pushed
+        (the frontier lock is released while waiting)
+
+        :returns: up to max_size slugs (that may have been seen since they were pushed),
+            a batch that isn't empty must be finished w/ finish_batch
+        """
+
+        batch: list[str] = list()
+        with self.frontier_lock:
+            if len(self.frontier) == 0:
+                self.frontier_ready.wait(timeout)
+
+            while len(batch) < max_size:
+                slug = self.frontier.pop()
+                if slug is None:
+                    break
+
+                batch.append(slug)
+
+            if len(batch) > 0:
+                self.num_batches += 1
+
+        return batch
+
+    def finish_batch(self) -> None:
+        """Mark a batch popped w/ pop_batch as finished (once its tasks are queued)"""
+
+        with self.frontier_lock:
+            self.num_batches -= 1
+
+        return
+
+    def is_idle(self) -> bool:
+        """Check if the frontier is empty and no batch popped from it is in flight"""
+
+        with self.frontier_lock:
+            return len(self.frontier) == 0 and self.num_batches == 0
+
+    def claim(self, slugs: list[str]) -> list[str]:
+        """Mark the slugs that haven't been seen as visited
+
+        :returns: the slugs this call marked (each slug is only claimed once, even across threads)
+        """
+
+        return [ slug for slug in slugs if slug not in self.aliased and slug not in self.omitted and self.visited.add(slug) ]
+
+    def batch_lock(self) -> Lock:
+        """Create the lock an organizer holds while it has a batch in flight
+
+        Checkpoints wait for every batch lock, so a batch is never half saved
+        """
+
+        lock = Lock()
+        self.batch_locks.append(lock)
+
+        return lock
+
+    def assign(self, pages: list[tuple[str, str, str]], max_docid: int) -> list[Task]:
+        """Assign the next docids to pages and log the tasks
+
+        :param pages: slug, title, and url of each page
+        :param max_docid: docids are only assigned below it
+        :returns: the tasks of the pages that were assigned a docid
+        """
+
+        tasks: list[Task] = list()
+        for slug, title, url in pages:
+            docid = next(self.docids)
+            if docid >= max_docid:
+                break
+
+            tasks.append((docid, slug, title, url))
+
+        if len(tasks) > 0:
+            with self.task_log_lock:
+                self.task_log.write(''.join( f'{json.dumps(task)}\n' for task in tasks ))
+                self.task_log.flush()
+
+                self.num_assigned += len(tasks)
+
+        return tasks
+
+    def save(self, checkpoint_file: str) -> None:
+        """Atomically save a checkpoint of the seen sets and the frontier
+
+        Waits for the batches in flight, so every visited slug that is saved
+        has its task logged (or its alias saved)
+        """
+
+        with ExitStack() as stack:
+            for lock in list(self.batch_locks):
+                stack.enter_context(lock)
+            stack.enter_context(self.frontier_lock)
+
+            state = {
+                'seeds':        list(self.seeds),
+                'visited':      self.visited.copy(),
+                'omitted':      self.omitted.copy(),
+                'aliases':      dict(self.aliases),
+                'frontier':     self.frontier.snapshot(),
+                'failures':     dict(self.failures)
+            }
+
+        with open(f'{checkpoint_file}.tmp', 'wb') as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(f'{checkpoint_file}.tmp', checkpoint_file)
+
+        return
+
+    def close(self) -> None:
+        """Close the task log and the frontier"""
+
+        self.task_log.close()
+        self.frontier.close()
+
+        return
+
+    @classmethod
+    def load(cls, checkpoint_file: str, task_log_file: str, frontier_file: str) -> tuple['CrawlState', dict[int, Task]]:
+        """Load the state from a checkpoint saved w/ save and the task log
+
+        The frontier is restored as it was at the checkpoint (the spill file
+        of the crashed crawl is scratch space, so it's replaced). Docids that
+        were drawn, but whose task wasn't logged before the crash, are
+        assigned first so the docids stay 0 ... num docs - 1.
+
+        :returns:
+            the crawl state
+            every task assigned so far (docid -> task)
+        """
+
+        with open(checkpoint_file, 'rb') as file:
+            state = pickle.load(file)
+
+        tasks = read_tasks(task_log_file)
+
+        # rewrite the log w/o a line cut off by a crash before appending to it
+        with open(f'{task_log_file}.tmp', 'w', encoding='utf-8') as file:
+            file.write(''.join( f'{json.dumps(task)}\n' for task in tasks.values() ))
+        os.replace(f'{task_log_file}.tmp', task_log_file)
+
+        if os.path.exists(frontier_file):
+            os.remove(frontier_file)
+
+        crawl_state = cls(state['seeds'], task_log_file, frontier_file)
+        crawl_state.visited    = state['visited']
+        crawl_state.omitted    = state['omitted']
+        crawl_state.aliases    = state['aliases']
+        crawl_state.failures   = state['failures']
+
+        crawl_state.frontier.restore(state['frontier'])
+
+        last_docid = max(tasks.keys(), default=-1)
+        gaps = sorted(set(range(last_docid + 1)) - tasks.keys())
+
+        crawl_state.docids       = itertools.chain(gaps, itertools.count(last_docid + 1))
+        crawl_state.num_assigned = len(tasks)
+
+        crawl_state.visited.update( task[1] for task in tasks.values() )
+        crawl_state.aliased.update(state['aliases'].keys())
+
+        for seen in (crawl_state.visited, crawl_state.aliased, crawl_state.omitted):
+            crawl_state.seen_filter.add_hashes(seen.hashes())
+
+        return crawl_state, tasks
+
+def read_tasks(task_log_file: str) -> dict[int, Task]:
+    """Read the tasks of a task log
+
+    :returns: the tasks (docid -> task), w/o a line cut off by a crash
+    """
+
+    tasks: dict[int, Task] = dict()
+    with open(task_log_file, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                task = tuple(json.loads(line))
+            except ValueError:
+                break
+
+            tasks[task[0]] = task
+
+    return tasks
@@ -1,4 +1,5 @@
-from helper import ALIAS_FILE, NUM_DOCS, ADJ_LIST_FILE, DOC_INFO_FILE, INV_IDX_FILE, parse_text
+from crawlerWorker import PostingsBuffer
+from helper import ALIAS_FILE, NUM_DOCS, ADJ_LIST_FILE, DOC_INFO_FILE, INV_IDX_FILE, INV_IDX_SCHEMA, parse_text
 
 from sys import flags
 if flags.dev_mode:
@@ -6,7 +7,6 @@ if flags.dev_mode:
 
     LOG_FILE = 'yappi.out'
 
-import numpy as np
 import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
@@ -38,21 +38,18 @@ SEEDS = (
 NUM_RAND_SEEDS = 2
 
 def _save_data(docids: list[int], titles: list[str], urls: list[str], doc_lens: list[int],
-               out_links: list[list[str]], aliases: dict[str, str], thread_ii: np.ndarray, pbar: tqdm,
+               out_links: list[list[str]], aliases: dict[str, str], thread_ii: PostingsBuffer, pbar: tqdm,
                lock: Lock, writers: dict[str, pq.ParquetWriter]) -> None:
     """Save the data to disk"""
 
     doc_info = pd.DataFrame({'docid': docids, 'title': titles, 'url': urls, 'len': doc_lens})
     doc_info = doc_info.astype({'docid': int, 'title': str, 'url': str, 'len': int}).set_index('docid')
 
-    inv_idx = pd.DataFrame(thread_ii, columns=['term', 'docid', 'frequency'])
-    inv_idx = inv_idx.astype({'term': str, 'docid': int, 'frequency': int}).set_index(['term', 'docid'])
-
     adj_list = pd.DataFrame({'docid': docids, 'out_links': out_links})
     adj_list = adj_list.astype({'docid': int}).set_index('docid')
 
     doc_table = pa.Table.from_pandas(doc_info)
-    ii_table  = pa.Table.from_pandas(inv_idx)
+    ii_batch  = thread_ii.to_batch()
     adj_table = pa.Table.from_pandas(adj_list)
 
     with lock:
@@ -61,8 +58,8 @@ def _save_data(docids: list[int], titles: list[str], urls: list[str], doc_lens:
         writers['doc_info'].write_table(doc_table)
 
         if writers.get('ii', None) is None:
-            writers['ii'] = pq.ParquetWriter(INV_IDX_FILE, ii_table.schema)
-        writers['ii'].write_table(ii_table)
+            writers['ii'] = pq.ParquetWriter(INV_IDX_FILE, INV_IDX_SCHEMA)
+        writers['ii'].write_batch(ii_batch)
 
         if writers.get('adj_list', None) is None:
             writers['adj_list'] = pq.ParquetWriter(ADJ_LIST_FILE, adj_table.schema)
@@ -76,6 +73,8 @@ def _save_data(docids: list[int], titles: list[str], urls: list[str], doc_lens:
     doc_lens.clear()
     out_links.clear()
 
+    thread_ii.clear()
+
     if len(aliases) > 0:
         aliases_df = pd.DataFrame({'from': aliases.keys(), 'to': aliases.values()})
         aliases_df = aliases_df.astype({'from': str, 'to': str}).set_index('from')
@@ -97,7 +96,7 @@ def _thread_task(queue: Queue[str], visited: set[str], aliased: set[str], omitte
 
     request_session = requests.Session()
 
-    thread_ii = None
+    thread_ii = PostingsBuffer()
 
     docids: list[int]   = []
     urls: list[str]     = []
@@ -212,23 +211,15 @@ def _thread_task(queue: Queue[str], visited: set[str], aliased: set[str], omitte
         thread_out_links.append(list(out_links))
 
         # append inv idx
-        doc_ii = np.array([(str(term), docid, cnt) for term, cnt in doc_counter.items()])
-        doc_ii = np.reshape(doc_ii, (len(doc_ii), 3))
-
-        if thread_ii is None:
-            thread_ii = doc_ii.copy()
-        else:
-            thread_ii = np.vstack((thread_ii, doc_ii))
+        thread_ii.add(docid, doc_counter)
 
         # save docs to files every BATCH_SIZE iterations
         if len(urls) >= BATCH_SIZE:
             _save_data(docids, titles, urls, doc_lens, thread_out_links, aliases, thread_ii, pbar, data_lock, writers)
-            thread_ii = None
 
     # save docs that have yet to be
-    if not thread_ii is None:
+    if len(docids) > 0:
         _save_data(docids, titles, urls, doc_lens, thread_out_links, aliases, thread_ii, pbar, data_lock, writers)
-        thread_ii = None
 
     return
 
@@ -1,7 +1,9 @@
-from helper import ADJ_LIST_FILE, DOC_INFO_FILE, INV_IDX_FILE
+from helper import ADJ_LIST_FILE, ADJ_LIST_SCHEMA, DOC_INFO_FILE, DOC_INFO_SCHEMA, INV_IDX_FILE, INV_IDX_SCHEMA, postings_batch
+from inverted_index import sort_postings, table_postings
+from response_cache import ResponseCache
+from seen_set import BloomFilter
 
 import numpy as np
-import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
 import requests
@@ -9,92 +11,247 @@ import signal
 import sys
 import os
 
+from array import array
+from collections import Counter
+from itertools import repeat
 from multiprocessing import Queue
+from uuid import uuid4
 
 OUTPUT_DIR = '/tmp/wiki_crawler'
 
-class Worker:
-    def __init__(self, raw_queue: Queue) -> None:
-        """Initialize worker"""
+PART_OUTPUTS = (DOC_INFO_FILE, INV_IDX_FILE, ADJ_LIST_FILE)
 
-        self.request_session = requests.Session()
+def part_file(part: str, file: str) -> str:
+    """Get the file a worker saves its part of an output to
+
+    :param part: id of the saved batch
+    :param file: the output (e.g. DOC_INFO_FILE)
+    """
+
+    return f'{OUTPUT_DIR}/{part}-{file[7:]}'
+
+def saved_parts() -> list[str]:
+    """Get the ids of the batches the workers have saved
+
+    The doc info of a batch is saved last, so a batch w/o it is incomplete
+
+    :returns: the batch ids, sorted
+    """
+
+    suffix = f'-{DOC_INFO_FILE[7:]}'
+
+    return sorted( file[:-len(suffix)] for file in os.listdir(OUTPUT_DIR) if file.endswith(suffix) )
+
+class PostingsBuffer:
+    def __init__(self) -> None:
+        """Initialize the columns of a batch of (term, docid, frequency) postings
+
+        Each page's postings are appended to the columns in place, so
+        buffering a batch takes linear time, and the docids and frequencies
+        are kept as int32s. The terms are dictionary encoded (by Arrow) when
+        the batch is saved.
+        """
+
+        self.terms: list[str] = []
+        self.docids = array('i')
+        self.freqs  = array('i')
+
+        return
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def add(self, docid: int, doc_counter: Counter[str]) -> None:
+        """Append the postings of a page
+
+        :param doc_counter: frequency of each term in the page
+        """
+
+        self.terms.extend(doc_counter.keys())
+        self.docids.extend(repeat(docid, len(doc_counter)))
+        self.freqs.extend(doc_counter.values())
+
+        return
+
+    def to_batch(self) -> pa.RecordBatch:
+        """Get the buffered postings as a record batch w/ INV_IDX_SCHEMA, sorted by (term, docid)"""
+
+        table = pa.table({'term': pa.array(self.terms, pa.string()).dictionary_encode(),
+                          'docid': np.frombuffer(self.docids, np.int32), 'frequency': np.frombuffer(self.freqs, np.int32)})
+
+        return postings_batch(*sort_postings(table_postings(table)))
 
-        self.inv_idx: np.ndarray | None  = None
+    def clear(self) -> None:
+        # new arrays, since a batch may still be viewing the old ones
+        self.terms  = []
+        self.docids = array('i')
+        self.freqs  = array('i')
+
+        return
+
+class PageWriter:
+    def __init__(self, doc_info_file: str, inv_idx_file: str, adj_list_file: str) -> None:
+        """Initialize the page buffers and the files they are saved to"""
+
+        self.postings = PostingsBuffer()
 
         self.docids: list[int]   = []
         self.urls: list[str]     = []
         self.titles: list[str]   = []
         self.doc_lens: list[int] = []
+        self.revisions: list[int] = []
 
         self.out_links: list[list[str]] = []
 
         self.writers: dict[str, pq.ParquetWriter] = {}
 
-        self.raw_queue = raw_queue
-
-        self.pid = os.getpid()
-
-        self.doc_info_file = f'{OUTPUT_DIR}/{self.pid}-{DOC_INFO_FILE[7:]}'
-        self.inv_idx_file  = f'{OUTPUT_DIR}/{self.pid}-{INV_IDX_FILE[7:]}'
-        self.adj_list_file = f'{OUTPUT_DIR}/{self.pid}-{ADJ_LIST_FILE[7:]}'
+        self.doc_info_file = doc_info_file
+        self.inv_idx_file  = inv_idx_file
+        self.adj_list_file = adj_list_file
 
         for file in (self.doc_info_file, self.inv_idx_file, self.adj_list_file):
             if os.path.exists(file):
                 os.remove(file)
 
-        def cleanup(num, frame):
-            """Cleanup worker"""
-
-            self.raw_queue.close()
+        return
 
-            self.request_session.close()
+    def add_page(self, docid: int, title: str, url: str, filtered: list[str], out_links: list[str],
+                 revision: int = 0) -> None:
+        """Buffer the data of a parsed page
 
-            if len(self.docids) > 0:
-                self.save_data()
+        :param revision: revision id of the page's html (0 if unknown)
+        """
 
-            for _, writer in self.writers.items():
-                writer.close()
+        doc_counter = Counter(filtered)
 
-            sys.exit()
+        # add page data
+        self.docids.append(docid)
+        self.titles.append(title)
+        self.urls.append(url)
+        self.doc_lens.append(len(filtered))
+        self.revisions.append(revision)
+        self.out_links.append(out_links)
 
-        signal.signal(signal.SIGTERM, cleanup)
+        self.postings.add(docid, doc_counter)
 
         return
 
     def save_data(self) -> None:
-        """Save the worker's data to disk"""
+        """Save the worker's data to disk
+
+        Each batch is sorted (by docid, and the postings by term and
+        docid), so the saved batches can be merged
+        """
+
+        order = np.argsort(self.docids, kind='stable')
 
-        doc_info = pd.DataFrame({'docid': self.docids, 'title': self.titles, 'url': self.urls, 'len': self.doc_lens})
-        doc_info = doc_info.astype({'docid': int, 'title': str, 'url': str, 'len': int}).set_index('docid')
+        doc_batch = pa.RecordBatch.from_pydict({'docid': self.docids, 'title': self.titles, 'url': self.urls,
+                                                'len': self.doc_lens, 'revision': self.revisions}, schema=DOC_INFO_SCHEMA)
+        ii_batch  = self.postings.to_batch()
+        adj_batch = pa.RecordBatch.from_pydict({'docid': self.docids, 'out_links': self.out_links},
+                                               schema=ADJ_LIST_SCHEMA)
+
+        self._write_batches(doc_batch.take(order), ii_batch, adj_batch.take(order))
+
+        self.docids.clear()
+        self.urls.clear()
+        self.titles.clear()
+        self.doc_lens.clear()
+        self.revisions.clear()
+        self.out_links.clear()
 
-        inv_idx = pd.DataFrame(self.inv_idx, columns=['term', 'docid', 'frequency'])
-        inv_idx = inv_idx.astype({'term': str, 'docid': int, 'frequency': int}).set_index(['term', 'docid'])
+        self.postings.clear()
 
-        adj_list = pd.DataFrame({'docid': self.docids, 'out_links': self.out_links})
-        adj_list = adj_list.astype({'docid': int}).set_index('docid')
+        return
 
-        doc_table = pa.Table.from_pandas(doc_info)
-        ii_table  = pa.Table.from_pandas(inv_idx)
-        adj_table = pa.Table.from_pandas(adj_list)
+    def _write_batches(self, doc_batch: pa.RecordBatch, ii_batch: pa.RecordBatch, adj_batch: pa.RecordBatch) -> None:
+        """Append a batch of pages to the files"""
 
         if self.writers.get('doc_info', None) is None:
-            self.writers['doc_info'] = pq.ParquetWriter(self.doc_info_file, doc_table.schema)
-        self.writers['doc_info'].write_table(doc_table)
+            self.writers['doc_info'] = pq.ParquetWriter(self.doc_info_file, DOC_INFO_SCHEMA)
+        self.writers['doc_info'].write_batch(doc_batch)
 
         if self.writers.get('ii', None) is None:
-            self.writers['ii'] = pq.ParquetWriter(self.inv_idx_file, ii_table.schema)
-        self.writers['ii'].write_table(ii_table)
+            self.writers['ii'] = pq.ParquetWriter(self.inv_idx_file, INV_IDX_SCHEMA)
+        self.writers['ii'].write_batch(ii_batch)
 
         if self.writers.get('adj_list', None) is None:
-            self.writers['adj_list'] = pq.ParquetWriter(self.adj_list_file, adj_table.schema)
-        self.writers['adj_list'].write_table(adj_table)
+            self.writers['adj_list'] = pq.ParquetWriter(self.adj_list_file, ADJ_LIST_SCHEMA)
+        self.writers['adj_list'].write_batch(adj_batch)
 
-        self.docids.clear()
-        self.urls.clear()
-        self.titles.clear()
-        self.doc_lens.clear()
-        self.out_links.clear()
+        return
+
+    def close(self) -> None:
+        """Save any buffered pages and close the files"""
+
+        if len(self.docids) > 0:
+            self.save_data()
+
+        for _, writer in self.writers.items():
+            writer.close()
+
+        self.writers.clear()
+
+        return
+
+
+class Worker(PageWriter):
+    def __init__(self, raw_queue: Queue, cache_file: str | None = None, offline: bool = False,
+                 seen_filter: BloomFilter | None = None) -> None:
+        """Initialize worker
+
+        :param cache_file: response cache to replay and record pages w/ (no cache if None)
+        :param offline: only replay pages from the response cache
+        :param seen_filter: filter of the slugs that have been seen, shared w/ the organizers
+        """
+
+        self.request_session = requests.Session()
+
+        self.response_cache = ResponseCache(cache_file, offline) if cache_file is not None else None
+
+        self.raw_queue = raw_queue
+        self.seen_filter = seen_filter
+
+        # unique across runs, so a resumed crawl never overwrites saved batches
+        self.part_id = uuid4().hex[:12]
+        self.num_parts = 0
+
+        super().__init__(part_file(self.part_id, DOC_INFO_FILE),
+                         part_file(self.part_id, INV_IDX_FILE),
+                         part_file(self.part_id, ADJ_LIST_FILE))
+
+        def cleanup(num, frame):
+            """Cleanup worker"""
+
+            self.raw_queue.close()
+
+            self.request_session.close()
+
+            self.close()
+
+            if self.response_cache is not None:
+                self.response_cache.close()
+
+            sys.exit()
+
+        signal.signal(signal.SIGTERM, cleanup)
+
+        return
+
+    def _write_batches(self, doc_batch: pa.RecordBatch, ii_batch: pa.RecordBatch, adj_batch: pa.RecordBatch) -> None:
+        """Save a batch of pages to its own part files
+
+        Each file is written whole and renamed into place, so the saved
+        batches survive the worker being killed. The doc info is written
+        last and marks the batch as saved.
+        """
+
+        part = f'{self.part_id}-{self.num_parts:05d}'
+
+        for batch, file in ((ii_batch, INV_IDX_FILE), (adj_batch, ADJ_LIST_FILE), (doc_batch, DOC_INFO_FILE)):
+            pq.write_table(pa.Table.from_batches([batch]), f'{part_file(part, file)}.tmp')
+            os.replace(f'{part_file(part, file)}.tmp', part_file(part, file))
 
-        self.inv_idx = None
+        self.num_parts += 1
 
         return
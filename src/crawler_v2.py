@@ -1,29 +1,29 @@
-from helper import ALIAS_FILE, NUM_DOCS, ADJ_LIST_FILE, DOC_INFO_FILE, INV_IDX_FILE, parse_text
-from crawlerWorker import OUTPUT_DIR, Worker
+from helper import ALIAS_FILE, NUM_DOCS, ADJ_LIST_FILE, ADJ_LIST_SCHEMA, DOC_INFO_FILE, DOC_INFO_SCHEMA, INDEX_DIR, INV_IDX_FILE, parse_text
+from crawl_state import CrawlState, Task
+from crawlerWorker import OUTPUT_DIR, PART_OUTPUTS, Worker, part_file, saved_parts
+from external_merge import merge_docs, merge_postings
+from page_parser import extract_page
+from resolver import ACTION_API_URL, RESOLVE_BATCH_SIZE, CachedBackend, MediaWikiBackend, SummaryBackend, apply_resolutions
+from response_cache import ResponseCache, revision_of
+from seen_set import BloomFilter
 
-import numpy as np
 import pandas as pd
-import pyarrow as pa
 import pyarrow.parquet as pq
 import requests
 import os
+import shutil
 
-from collections import Counter
-from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
-from multiprocessing import Queue, active_children, set_start_method
+from multiprocessing import Queue, set_start_method
+from multiprocessing.util import Finalize
 from multiprocessing.pool import AsyncResult, Pool
-from queue import Queue as ThreadQueue
-from threading import Lock, Thread
+from queue import Empty, Queue as ThreadQueue
+from threading import Event, Semaphore, Thread
 from tqdm import tqdm
 
-# disable specific warning form bs4
-from warnings import filterwarnings
-filterwarnings("ignore", category=MarkupResemblesLocatorWarning)
-
 set_start_method('spawn', force=True)
 
 ### Declare constants
-NUM_ORG_THREADS = 2     # Num threads in main process to queue pages for workers
+NUM_ORG_THREADS = 4     # Num threads in main process to queue pages for workers
 NUM_WORKERS     = 12    # Num processes to do work
 
 BATCH_SIZE = 128        # How often to save file
@@ -39,319 +39,419 @@ NUM_RAND_SEEDS = 2
 
 MAX_RAW_QUEUE_SIZE = 2 * NUM_DOCS
 MAX_READY_QUEUE_SIZE = 5 * NUM_WORKERS
+MAX_IN_FLIGHT        = 3 * NUM_WORKERS   # Max num of tasks handed to the workers that haven't finished
+
+RESOLVER_BACKEND = 'mediawiki'   # How the organizers find the canonical page of each slug
+
+CHECKPOINT_FILE     = f'{OUTPUT_DIR}/checkpoint.pkl'
+TASK_LOG_FILE       = f'{OUTPUT_DIR}/tasks.jsonl'
+FRONTIER_FILE       = f'{OUTPUT_DIR}/frontier.sqlite'
 
-CALLBACK_TIMEOUT = 3
+FRONTIER_WAIT       = 0.1   # Seconds an idle thread waits on the frontier
+FEED_BATCH_SIZE     = 1024  # Max num of links moved from the raw queue to the frontier at once
+CHECKPOINT_INTERVAL = 60    # Seconds between checkpoints of the crawl state
 
 
 ### Declare worker class
-def _init_worker(raw_queue: Queue) -> None:
+def _init_worker(raw_queue: Queue, cache_file: str | None, offline: bool, seen_filter: BloomFilter, api_url: str) -> None:
     """Initialize the worker thread"""
 
-    global _worker
-    _worker = Worker(raw_queue)
+    global _worker, _api_url
+    _worker = Worker(raw_queue, cache_file, offline, seen_filter)
+    _api_url = api_url
+
+    # save the buffered pages when the pool is closed
+    Finalize(_worker, _worker.close, exitpriority=0)
 
     return
 
 
-def _worker_task(docid: int, slug: str, title: str, url: str) -> None:
-    """The task of each worker process"""
+def parse_page(html: str) -> tuple[list[str], list[str]]:
+    """Parse the html of a page
+
+    :returns:
+        slugs of the wiki pages the page links to
+        terms of the page's paragraph text
+    """
+
+    out_links, text = extract_page(html)
+    filtered = parse_text(text)
+
+    return out_links, filtered
+
+def _worker_task(docid: int, slug: str, title: str, url: str) -> int:
+    """The task of each worker process
+
+    :returns: the num of links queued
+    """
 
     # get the html of the page
-    res = _worker.request_session.get(f'{API_URL}/html/{slug}')
+    url_html = f'{_api_url}/html/{slug}'
+    if _worker.response_cache is not None:
+        cached = _worker.response_cache.fetch(_worker.request_session, 'html', slug, url_html)
+    else:
+        res = _worker.request_session.get(url_html)
+        cached = (res.text, None, revision_of(res.headers.get('ETag', None)))
     # TODO: error checking
-    # if not res.ok:
-
-    page = BeautifulSoup(res.text, 'lxml')
-
-    # find outbound links
-    out_links: set[str] = set()
-    for sub_link in page.find_all('a'):
-        if not sub_link.has_attr('href'): continue
-
-        # get the link and remove any markers
-        sub_link = str(sub_link['href']).split('#', 1)[0]
-        sub_link = sub_link.split('?', 1)[0]
-
-        # filter out bad links
-        if (not sub_link.startswith('./')
-            or sub_link.startswith('./File:')
-            or sub_link.startswith('./Help:')
-            or sub_link.startswith('./Special:')
-            or sub_link.startswith('./Template:')
-            or sub_link.startswith('./Template_talk:')
-            or sub_link.startswith('./Wikipedia:')):
-            continue
 
-        out_links.add(sub_link[2:])
+    # the docid is already assigned, so keep the page even w/o its html
+    html, _, revision = cached if cached is not None else ('', None, None)
+
+    out_links, filtered = parse_page(html)
 
-    # queue new titles
-    for sub_link in out_links:
+    # queue new titles (skipping the ones that have been seen)
+    if _worker.seen_filter is not None:
+        seen = _worker.seen_filter.contains(out_links)
+        new_links = [ sub_link for sub_link, was_seen in zip(out_links, seen) if not was_seen ]
+    else:
+        new_links = out_links
+
+    num_queued = 0
+    for sub_link in new_links:
         try:
             _worker.raw_queue.put_nowait(sub_link)
         except:
             break
 
-    # build, parse, and count text
-    text = ' '.join([ par.text for par in page.find_all('p') ])
-    filtered = parse_text(text)
-
-    doc_counter = Counter(filtered)
-
-    # add page data
-    _worker.docids.append(docid)
-    _worker.titles.append(title)
-    _worker.urls.append(url)
-    _worker.doc_lens.append(len(filtered))
-    _worker.out_links.append(list(out_links))
+        num_queued += 1
 
-    # append inv idx
-    doc_ii = np.array([(str(term), docid, cnt) for term, cnt in doc_counter.items()])
-    doc_ii = np.reshape(doc_ii, (len(doc_ii), 3))
-
-    if _worker.inv_idx is None:
-        _worker.inv_idx = doc_ii.copy()
-    else:
-        _worker.inv_idx = np.vstack((_worker.inv_idx, doc_ii))
+    _worker.add_page(docid, title, url, filtered, out_links, revision or 0)
 
     # save docs to files every BATCH_SIZE iterations
     if len(_worker.urls) >= BATCH_SIZE:
         _worker.save_data()
 
-    return
+    return num_queued
 
-def _prepare_tasks(raw_queue: Queue, ready_queue: ThreadQueue,
-                   visited: set[str], aliased: set[str], omitted: set[str],
-                   lock: Lock) -> None:
-    """The job for the organizer thread"""
+def _feed_frontier(raw_queue: Queue, state: CrawlState, stop: Event) -> None:
+    """The job for the frontier thread
 
-    request_session = requests.Session()
+    Moves the links the workers queue into the frontier (counting the
+    in-links of each unseen slug)
+    """
 
-    curr_aliases: dict[str, str] = {}
+    while not stop.is_set():
+        links: list[str] = list()
+        try:
+            links.append(raw_queue.get(timeout=FRONTIER_WAIT))
+            while len(links) < FEED_BATCH_SIZE:
+                links.append(raw_queue.get_nowait())
+        except Empty:
+            pass
 
-    global writer
-    writer = None
+        if len(links) == 0:
+            continue
 
-    def save_aliases() -> None:
-        if len(curr_aliases) == 0:
-            return
+        state.push_links(links)
+        state.num_links_fed += len(links)
 
-        aliases_df = pd.DataFrame({'from': curr_aliases.keys(), 'to': curr_aliases.values()})
-        aliases_df = aliases_df.astype({'from': str, 'to': str}).set_index('from')
+    return
 
-        aliases_table = pa.Table.from_pandas(aliases_df)
+def _prepare_tasks(ready_queue: ThreadQueue, state: CrawlState, stop: Event, resolver_backend: str,
+                   cache_file: str | None, offline: bool, num_docs: int, api_url: str, action_api_url: str) -> None:
+    """The job for the organizer thread
 
-        global writer
-        with lock:
-            if writer is None:
-                writer = pq.ParquetWriter(ALIAS_FILE, aliases_table.schema)
-            writer.write_table(aliases_table)
+    Runs until num_docs pages are assigned, or stop is set (once the frontier has run out)
+    """
 
-        curr_aliases.clear()
+    request_session = requests.Session()
 
-        return
+    match resolver_backend:
+        case 'mediawiki':
+            backend = MediaWikiBackend(request_session, action_api_url)
+        case 'summary':
+            backend = SummaryBackend(request_session, api_url)
+        case _:
+            raise ValueError(f'Unknown resolver backend {resolver_backend}')
+
+    cache = None
+    if cache_file is not None:
+        cache = ResponseCache(cache_file, offline)
+        backend = CachedBackend(backend, cache)
+
+    batch_lock = state.batch_lock()
+
+    while state.num_assigned < num_docs and not stop.is_set():
+        # wait for the highest scored slugs w/o holding any lock
+        slugs = state.pop_batch(RESOLVE_BATCH_SIZE, FRONTIER_WAIT)
+        if len(slugs) == 0:
+            continue
 
-    while True:
-        with lock:
-            if len(visited) >= NUM_DOCS:
-                break
+        try:
+            with batch_lock:
+                batch = state.claim(slugs)
+                if len(batch) == 0:
+                    continue
 
-            docid = len(visited)
+                # resolve the batch to canonical pages and filter out aliases
+                resolved = backend.resolve(batch)
 
-            slug = raw_queue.get()
-            while slug in visited or slug in aliased or slug in omitted:
-                slug = raw_queue.get()
+                pages, failed = apply_resolutions(resolved, state.visited, state.aliased, state.omitted, state.aliases)
 
-            visited.add(slug)
+                # retry the slugs whose request failed later
+                state.requeue(failed)
 
-        # get the summary of a page and filter out aliases
-        summary = None
-        while slug is None or summary is None or slug != summary['titles']['canonical']:
-            if slug is not None and summary is not None:
-                if summary.get('titles', None) is None or summary['titles'].get('canonical', None) is None:
-                    with lock:
-                        omitted.add(slug)
-                        visited.add(slug)
+                tasks = state.assign(pages, num_docs)
 
-                    slug = None
-                    continue
+                retried = set(failed)
+                state.seen_filter.add([ slug for slug in batch if slug not in retried ] + [ page[0] for page in pages ])
 
+            # add to queue
+            for task in tasks:
+                ready_queue.put(task)
+        finally:
+            # the batch is in flight until its tasks are queued
+            state.finish_batch()
 
-                new_slug = summary['titles']['canonical']
+    # cleanup
+    if cache is not None:
+        cache.close()
 
-                curr_aliases[slug] = new_slug
+    return
 
-                with lock:
-                    aliased.add(slug)
-                    visited.remove(slug)
+def _save_checkpoints(state: CrawlState, stop: Event) -> None:
+    """The job for the checkpoint thread"""
 
-                    if new_slug not in visited:
-                        visited.add(new_slug)
-                        slug = new_slug
+    while not stop.wait(CHECKPOINT_INTERVAL):
+        state.save(CHECKPOINT_FILE)
 
-                        break
+    return
 
-                    slug = None
+def _resume_state() -> tuple[CrawlState, list[Task], list[str]]:
+    """Load the last checkpoint and task log, and find what is left of the crawl
 
-            # get new slug
-            if slug is None:
-                with lock:
-                    slug = raw_queue.get()
-                    while slug in visited or slug in aliased or slug in omitted:
-                        slug = raw_queue.get()
+    :returns:
+        the crawl state
+        tasks that were assigned, but whose page wasn't saved by a worker
+        slugs to push to the frontier (out links of the saved pages that aren't in the checkpointed frontier)
+    """
 
-                    visited.add(slug)
+    if not os.path.exists(CHECKPOINT_FILE) or not os.path.exists(TASK_LOG_FILE):
+        raise FileNotFoundError(f'There is no checkpoint to resume from in {OUTPUT_DIR}')
 
-            try:
-                res = request_session.get(f'{API_URL}/summary/{slug}', timeout=(1,3))
-            except requests.Timeout:
-                with lock:
-                    omitted.add(slug)
-                    visited.remove(slug)
+    state, tasks = CrawlState.load(CHECKPOINT_FILE, TASK_LOG_FILE, FRONTIER_FILE)
 
-                slug = None
-                continue
+    # remove the files of batches a worker didn't finish saving
+    parts = saved_parts()
+    keep = { os.path.basename(part_file(part, file)) for part in parts for file in PART_OUTPUTS }
+    keep |= { os.path.basename(CHECKPOINT_FILE), os.path.basename(TASK_LOG_FILE), os.path.basename(FRONTIER_FILE) }
+    for file in os.listdir(OUTPUT_DIR):
+        if file not in keep:
+            os.remove(f'{OUTPUT_DIR}/{file}')
 
-            if not res.ok:
-                with lock:
-                    omitted.add(slug)
-                    visited.remove(slug)
+    saved: set[int] = set()
+    frontier: list[str] = list(state.seeds)
+    for part in parts:
+        saved.update(pq.read_table(part_file(part, DOC_INFO_FILE), columns=['docid'])['docid'].to_pylist())
 
-                slug = None
-                continue
+        for out_links in pq.read_table(part_file(part, ADJ_LIST_FILE), columns=['out_links'])['out_links'].to_pylist():
+            frontier.extend(out_links)
 
-            summary = res.json()
+    pending = [ task for docid, task in sorted(tasks.items()) if docid not in saved ]
 
-        # add to queue
-        task = (docid, slug, summary['title'], summary['content_urls']['desktop']['page'])
-        ready_queue.put(task)
+    # keep the duplicates, they are the in-links of each slug (only the slugs found after the checkpoint are pushed)
+    checkpointed = state.frontier.slugs()
+    frontier = [ slug for slug in frontier if not state.is_seen(slug) and slug not in checkpointed ]
 
-        # save curr_aliases ever so often
-        if len(curr_aliases) >= BATCH_SIZE:
-            save_aliases()
+    return state, pending, frontier
 
-    # cleanup
-    if len(curr_aliases) > 0:
-        save_aliases()
+def start_crawler(resolver_backend: str = RESOLVER_BACKEND, cache_file: str | None = None, offline: bool = False,
+                  resume: bool = False, num_docs: int = NUM_DOCS, api_url: str = API_URL,
+                  action_api_url: str = ACTION_API_URL, seeds: tuple[str, ...] = SEEDS,
+                  num_rand_seeds: int = NUM_RAND_SEEDS, num_organizers: int = NUM_ORG_THREADS) -> pd.DataFrame:
+    """Start crawling web pages and building inverted index
 
-    return
+    The crawl state is checkpointed every CHECKPOINT_INTERVAL seconds, and
+    the workers save each batch of pages to its own part file, so a crawl
+    that died can be resumed w/o losing or duplicating docids.
+
+    :param resolver_backend: 'mediawiki' to resolve slugs in bulk action API queries, or 'summary' for a REST summary request per slug
+    :param cache_file: response cache to replay and record the resolved slugs and html w/ (no cache if None)
+    :param offline: only replay from the response cache (pages that aren't cached are omitted)
+    :param resume: continue from the last checkpoint in OUTPUT_DIR instead of starting over
+    :param api_url: base url of the Wikipedia REST page API
+    :param action_api_url: url of the Wikipedia action API
+    :param num_organizers: num of threads resolving slugs and assigning docids
+    :returns: vocab counted while the workers' postings were merged (see build_vocab_and_index)
+    """
 
-def start_crawler() -> None:
-    """Start crawling web pages and building inverted index"""
+    if offline and cache_file is None:
+        raise ValueError('Crawling offline needs a response cache')
 
     # del old files
     for file in (ALIAS_FILE, ADJ_LIST_FILE, DOC_INFO_FILE, INV_IDX_FILE):
         if os.path.exists(file):
             os.remove(file)
 
-    # create output path for the workers
-    if not os.path.exists(OUTPUT_DIR):
+    if os.path.exists(INDEX_DIR):
+        shutil.rmtree(INDEX_DIR)
+
+    raw_queue: Queue[str] = Queue()
+
+    if resume:
+        print('Resuming from the last checkpoint...')
+        state, pending, frontier = _resume_state()
+
+        state.push_links(frontier)
+
+        print(f'\t{state.num_assigned - len(pending)} saved pages, {len(pending)} pages to redo, '
+              f'{len(state.frontier)} slugs in the frontier\n')
+    else:
+        # create an empty output path for the workers
+        if os.path.exists(OUTPUT_DIR):
+            shutil.rmtree(OUTPUT_DIR)
         os.mkdir(OUTPUT_DIR)
 
+        seeds = list(seeds)
 
-    # init queues
-    raw_queue: Queue[str] = Queue()
-    for title in SEEDS:
-        raw_queue.put(title)
+        # add random seeds (random pages can't be replayed)
+        print('Adding some random seed pages...')
+        for i in range(0 if offline else num_rand_seeds):
+            res = requests.get(f'{api_url}/random/summary', timeout=1)
 
-    # add random seeds
-    print('Adding some random seed pages...')
-    for i in range(NUM_RAND_SEEDS):
-        res = requests.get(f'{API_URL}/random/summary', timeout=1)
+            summary = res.json()
+            title = summary['titles']['canonical']
 
-        summary = res.json()
-        title = summary['titles']['canonical']
+            print(f'\t{i+1}) {title}')
 
-        print(f'\t{i+1}) {title}')
+            seeds.append(title)
 
-        raw_queue.put(title)
+        print()
 
-    print()
+        state = CrawlState(seeds, TASK_LOG_FILE, FRONTIER_FILE)
+        pending = list()
+
+        state.push_links(seeds)
+
+        # so there is always a checkpoint to resume from
+        state.save(CHECKPOINT_FILE)
+
+    num_saved = state.num_assigned - len(pending)
 
     ready_queue = ThreadQueue(maxsize=MAX_READY_QUEUE_SIZE)
-    results: ThreadQueue[AsyncResult] = ThreadQueue(maxsize=NUM_DOCS)
 
-    # start organizer
-    print(f'Starting {NUM_ORG_THREADS} organizer threads...')
-    visited = set()
-    aliased = set()
-    omitted = set()
+    # start checkpointing
+    stop_checkpoints = Event()
+    checkpointer = Thread(target=_save_checkpoints, args=(state, stop_checkpoints))
+    checkpointer.start()
+
+    # start moving the links the workers queue into the frontier
+    stop_feeder = Event()
+    feeder = Thread(target=_feed_frontier, args=(raw_queue, state, stop_feeder))
+    feeder.start()
 
-    lock = Lock()
+    # start organizer
+    print(f'Starting {num_organizers} organizer threads...')
+    num_new_tasks = num_docs - state.num_assigned
 
+    stop_organizers = Event()
     organizers = list()
-    for _ in range(NUM_ORG_THREADS):
-        task_organizer = Thread(target=_prepare_tasks, args=(raw_queue, ready_queue, visited, aliased, omitted, lock))
+    for _ in range(num_organizers):
+        task_organizer = Thread(target=_prepare_tasks,
+                                args=(ready_queue, state, stop_organizers, resolver_backend, cache_file, offline,
+                                      num_docs, api_url, action_api_url))
         task_organizer.start()
         organizers.append(task_organizer)
 
     # create process pool
     print(f'Starting {NUM_WORKERS} workers...')
-    worker_pool = Pool(processes=NUM_WORKERS, initializer=_init_worker, initargs=(raw_queue,))
-
-    # collect pids for joining files
-    pids = set()
-    children = active_children()
-    for child in children:
-        pids.add(child.pid)
+    worker_pool = Pool(processes=NUM_WORKERS, initializer=_init_worker, initargs=(raw_queue, cache_file, offline, state.seen_filter, api_url))
 
     print('\nScrapping pages:')
 
-    # create callback for progress bar and dynamic assigning
-    pbar = tqdm(total=NUM_DOCS)
-    def task_callback(_) -> None:
+    # hand the tasks to the workers as they are queued, w/ at most MAX_IN_FLIGHT unfinished
+    pbar = tqdm(total=num_docs, initial=num_saved)
+    in_flight = Semaphore(MAX_IN_FLIGHT)
+
+    # the links queued by a task are counted before the task is
+    num_finished, num_links_queued = 0, 0
+    def task_callback(num_links: int | BaseException) -> None:
+        nonlocal num_finished, num_links_queued
+
+        if isinstance(num_links, int):
+            num_links_queued += num_links
+        num_finished += 1
+
         pbar.update(1)
+        in_flight.release()
 
-        try:
-            task = ready_queue.get(timeout=CALLBACK_TIMEOUT)
-            results.put(worker_pool.apply_async(_worker_task, args=task, callback=task_callback))
-        except:
-            return
+        return
+
+    results: list[AsyncResult] = list()
+    def dispatch(task: Task) -> None:
+        in_flight.acquire()
+        results.append(worker_pool.apply_async(_worker_task, args=task, callback=task_callback,
+                                               error_callback=task_callback))
 
         return
 
-    # assign first few docs
-    for _ in range(min(NUM_DOCS, 3 * NUM_WORKERS)):
-        task = ready_queue.get()
-        results.put(worker_pool.apply_async(_worker_task, args=task, callback=task_callback))
+    def crawl_exhausted() -> bool:
+        """Check if no slug is left to crawl, and no task, link, or batch in flight can add one"""
+
+        # each check can only be undone by the work the checks before it wait for
+        return (num_finished == len(results) and state.num_links_fed == num_links_queued
+                and state.is_idle() and ready_queue.empty())
+
+    # redo the pages that weren't saved before the crawl died
+    for task in pending:
+        dispatch(task)
+
+    while len(results) - len(pending) < num_new_tasks:
+        try:
+            task = ready_queue.get(timeout=FRONTIER_WAIT)
+        except Empty:
+            if crawl_exhausted():
+                break
+
+            continue
+
+        dispatch(task)
 
     # wait for organizer to finish creating tasks
+    stop_organizers.set()
     for task_organizer in organizers:
         task_organizer.join()
 
-    global writer
-    if writer is not None:
-        writer.close()
-
-    # add remainder of tasks
-    while not ready_queue.empty():
-        try:
-            task = ready_queue.get_nowait()
-            results.put(worker_pool.apply_async(_worker_task, args=task, callback=task_callback))
-        except:
-            break
+    stop_feeder.set()
+    feeder.join()
 
     # get each task -> won't join otherwise
-    for _ in range(NUM_DOCS):
-        res = results.get()
+    for res in results:
         res.get()
 
-    # close and join pool
-    worker_pool.terminate()
+    stop_checkpoints.set()
+    checkpointer.join()
+
+    state.close()
+
+    # close and join pool (each worker saves its buffered pages on exit)
+    worker_pool.close()
     worker_pool.join()
 
     pbar.close()
     print()
 
-    print(f'\tThere were {len(aliased)} aliased pages and {len(omitted)} omitted pages\n')
+    print(f'\tThere were {len(state.aliased)} aliased pages and {len(state.omitted)} omitted pages\n')
+
+    if state.num_assigned < num_docs:
+        print(f'\tWarning: the frontier ran out, so only {state.num_assigned} of {num_docs} pages were crawled\n')
 
     print('Joining files from each worker ...')
-    for file in (ADJ_LIST_FILE, DOC_INFO_FILE, INV_IDX_FILE):
-        data = list()
-        for pid in pids:
-            data.append(pd.read_parquet(f'{OUTPUT_DIR}/{pid}-{file[7:]}', engine='pyarrow'))
+    parts = saved_parts()
+
+    # each part is sorted, so they are merged w/o loading them all at once
+    for file, schema in ((DOC_INFO_FILE, DOC_INFO_SCHEMA), (ADJ_LIST_FILE, ADJ_LIST_SCHEMA)):
+        merge_docs([ part_file(part, file) for part in parts ], file, OUTPUT_DIR, schema)
+
+    vocab = merge_postings([ part_file(part, INV_IDX_FILE) for part in parts ], INV_IDX_FILE, OUTPUT_DIR)
 
-        pd.concat(data).to_parquet(file, engine='pyarrow')
+    aliases = pd.DataFrame({'from': state.aliases.keys(), 'to': state.aliases.values()})
+    aliases = aliases.astype({'from': str, 'to': str}).set_index('from')
+    aliases.to_parquet(ALIAS_FILE, engine='pyarrow')
+
+    # the crawl is done, so there is nothing to resume
+    os.remove(CHECKPOINT_FILE)
 
     print('Finished\n')
 
-    return
+    return vocab
@@ -0,0 +1,288 @@
+from helper import INV_IDX_SCHEMA, VOCAB_SIZE, postings_batch
+from inverted_index import Postings, sort_postings, table_postings
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import os
+
+from bisect import bisect_left
+
+### Declare constants
+MERGE_BATCH_SIZE = 2**15    # Rows read from each run at a time
+MERGE_FAN_IN     = 16       # Max num of runs merged at once (more are merged in passes)
+ROW_GROUP_SIZE   = 2**18    # Min num of postings in each row group of a merged file (but the last)
+
+class _Run:
+    def __init__(self, file: str) -> None:
+        """Open a sorted run (a parquet file) to read in batches
+
+        The rows of the run read so far, but not yet merged, are kept in
+        buffer. Unless the run is exhausted, its buffer is never empty.
+        """
+
+        self.batches = pq.ParquetFile(file).iter_batches(batch_size=MERGE_BATCH_SIZE)
+        self.buffer = pa.Table.from_batches([], pq.read_schema(file))
+        self.exhausted = False
+
+        self.refill()
+
+        return
+
+    def refill(self) -> None:
+        """Read the next (non-empty) batch of the run into its buffer"""
+
+        for batch in self.batches:
+            if batch.num_rows > 0:
+                self.buffer = pa.concat_tables([self.buffer, pa.Table.from_batches([batch])])
+                return
+
+        self.exhausted = True
+
+        return
+
+    def take(self, num_rows: int) -> pa.Table:
+        """Remove the first rows from the buffer (refilling it if it is empty)"""
+
+        rows = self.buffer.slice(0, num_rows)
+        self.buffer = self.buffer.slice(num_rows)
+
+        if self.buffer.num_rows == 0:
+            self.refill()
+
+        return rows
+
+class _TermKey:
+    """Orders postings by (term, docid)"""
+
+    @staticmethod
+    def last(table: pa.Table) -> str:
+        chunk = [ chunk for chunk in table['term'].chunks if len(chunk) > 0 ][-1]
+
+        return chunk[len(chunk) - 1].as_py()
+
+    @staticmethod
+    def num_below(table: pa.Table, bound: str) -> int:
+        # the table is sorted, so only a few terms are looked up
+        terms = table['term']
+
+        return bisect_left(range(len(terms)), bound, key=lambda i: terms[i].as_py())
+
+    @staticmethod
+    def postings(table: pa.Table) -> Postings:
+        """Get the postings of a merged chunk, sorted"""
+
+        # the chunk is made of slices of the runs' batches, so only the terms in the slices are encoded
+        term_col = pa.chunked_array([ chunk.cast(pa.string()) for chunk in table['term'].chunks ], pa.string())
+        table = table.set_column(table.schema.get_field_index('term'), 'term',
+                                 term_col.combine_chunks().dictionary_encode())
+
+        return sort_postings(table_postings(table))
+
+class _DocKey:
+    """Orders rows by docid"""
+
+    @staticmethod
+    def last(table: pa.Table) -> int:
+        return table['docid'][table.num_rows - 1].as_py()
+
+    @staticmethod
+    def num_below(table: pa.Table, bound: int) -> int:
+        return int(np.searchsorted(table['docid'].to_numpy(), bound))
+
+def _merge_runs(files: list[str], key: type[_TermKey] | type[_DocKey]):
+    """Merge sorted runs in chunks
+
+    Each run is read a batch at a time. The rows below the smallest last
+    key of the buffers can't be followed by smaller rows in any run, so
+    they are merged. Equal keys (e.g. the postings of a term) are only
+    merged once they are all read, so a chunk never splits them.
+
+    :param files: sorted runs (at most MERGE_FAN_IN)
+    :param key: the order of the runs
+    :returns: generator of the merged chunks as tables (in order, but each chunk unsorted)
+    """
+
+    runs = [ _Run(file) for file in files ]
+
+    while True:
+        runs = [ run for run in runs if run.buffer.num_rows > 0 ]
+        if len(runs) == 0:
+            return
+
+        open_runs = [ run for run in runs if not run.exhausted ]
+
+        # every run is exhausted, so the rest are merged
+        if len(open_runs) == 0:
+            yield pa.concat_tables([ run.take(run.buffer.num_rows) for run in runs ])
+            continue
+
+        bound = min( key.last(run.buffer) for run in open_runs )
+
+        chunk = list()
+        for run in runs:
+            num_rows = key.num_below(run.buffer, bound)
+            if num_rows > 0:
+                chunk.append(run.take(num_rows))
+
+        if len(chunk) > 0:
+            yield pa.concat_tables(chunk)
+            continue
+
+        # nothing is below the bound, so read on in the runs whose buffers end at it
+        for run in open_runs:
+            if key.last(run.buffer) == bound:
+                run.refill()
+
+def _merge_passes(files: list[str], tmp_dir: str, merge_into) -> None:
+    """Merge runs in passes of at most MERGE_FAN_IN runs, the last into the final output
+
+    :param merge_into: function that merges some runs into a file (or the final output if the file is None)
+    """
+
+    runs = list(files)
+    num_passes = 0
+    while len(runs) > MERGE_FAN_IN:
+        merged = list()
+        for i in range(0, len(runs), MERGE_FAN_IN):
+            file = f'{tmp_dir}/merge-{num_passes}-{len(merged)}.parquet'
+            merge_into(runs[i:i+MERGE_FAN_IN], file)
+            merged.append(file)
+
+        # only remove the runs of earlier passes, not the inputs
+        if num_passes > 0:
+            for file in runs:
+                os.remove(file)
+
+        runs = merged
+        num_passes += 1
+
+    merge_into(runs, None)
+
+    if num_passes > 0:
+        for file in runs:
+            os.remove(file)
+
+    return
+
+class _PostingsWriter:
+    def __init__(self, file: str) -> None:
+        """Initialize a writer of postings in (term, docid) order
+
+        Chunks of postings are buffered until there are ROW_GROUP_SIZE
+        postings, then written as a row group w/ one term dictionary
+        """
+
+        self.writer = pq.ParquetWriter(file, INV_IDX_SCHEMA)
+        self.chunks: list[Postings] = list()
+        self.num_postings = 0
+
+        return
+
+    def write(self, postings: Postings) -> None:
+        """Write a chunk of sorted postings, whose terms all come after the terms written so far"""
+
+        self.chunks.append(postings)
+        self.num_postings += len(postings[1])
+
+        if self.num_postings >= ROW_GROUP_SIZE:
+            self._flush()
+
+        return
+
+    def _flush(self) -> None:
+        # the terms of each chunk come after the last, so their dictionaries are just concatenated
+        offsets = np.cumsum([0] + [ len(terms) for terms, _, _, _ in self.chunks ])
+
+        terms    = np.concatenate([ terms for terms, _, _, _ in self.chunks ])
+        term_ids = np.concatenate([ term_ids + offset for (_, term_ids, _, _), offset in zip(self.chunks, offsets) ])
+        docids   = np.concatenate([ docids for _, _, docids, _ in self.chunks ])
+        freqs    = np.concatenate([ freqs for _, _, _, freqs in self.chunks ])
+
+        self.writer.write_batch(postings_batch(terms, term_ids.astype(np.int32), docids, freqs),
+                                row_group_size=max(self.num_postings, 1))
+
+        self.chunks.clear()
+        self.num_postings = 0
+
+        return
+
+    def close(self) -> None:
+        if len(self.chunks) > 0:
+            self._flush()
+
+        self.writer.close()
+
+        return
+
+def merge_postings(files: list[str], out_file: str, tmp_dir: str, vocab_size: int = VOCAB_SIZE) -> pd.DataFrame:
+    """Merge sorted postings files into one, in bounded memory
+
+    The files are merged a chunk at a time (in passes of at most
+    MERGE_FAN_IN files), and written in row groups sorted by (term, docid).
+    The frequency of each term is counted on the last pass, so only the
+    most frequent terms are ever kept in memory.
+
+    :param files: postings files, each sorted by (term, docid) (an empty file is written if there are none)
+    :param out_file: file to write the merged postings to
+    :param tmp_dir: directory for the runs of earlier passes
+    :param vocab_size: num of terms in the vocab
+    :returns: vocab (the most frequent terms, w/ ties in term order) as a DataFrame
+        (term -> frequency)
+    """
+
+    vocab_terms = np.zeros(0, dtype=object)
+    vocab_freqs = np.zeros(0, dtype=np.int64)
+
+    def merge_into(runs: list[str], file: str | None) -> None:
+        nonlocal vocab_terms, vocab_freqs
+
+        writer = _PostingsWriter(out_file if file is None else file)
+
+        for chunk in _merge_runs(runs, _TermKey):
+            postings = _TermKey.postings(chunk)
+            writer.write(postings)
+
+            if file is not None:
+                continue
+
+            # the chunk has all the postings of its terms, which come after the terms so far
+            terms, term_ids, _, freqs = postings
+            col_freqs = np.bincount(term_ids, weights=freqs, minlength=len(terms)).astype(np.int64)
+
+            vocab_terms = np.concatenate([vocab_terms, terms])
+            vocab_freqs = np.concatenate([vocab_freqs, col_freqs])
+
+            top = np.argsort(-vocab_freqs, kind='stable')[:vocab_size]
+            vocab_terms, vocab_freqs = vocab_terms[np.sort(top)], vocab_freqs[np.sort(top)]
+
+        writer.close()
+
+        return
+
+    _merge_passes(files, tmp_dir, merge_into)
+
+    top = np.argsort(-vocab_freqs, kind='stable')
+
+    return pd.DataFrame({'frequency': vocab_freqs[top]}, index=pd.Index(vocab_terms[top], name='term'))
+
+def merge_docs(files: list[str], out_file: str, tmp_dir: str, schema: pa.Schema) -> None:
+    """Merge files sorted by docid (e.g. doc info parts) into one, in bounded memory
+
+    :param files: files w/ the same schema, each sorted by docid (an empty file is written if there are none)
+    :param out_file: file to write the merged rows to
+    :param tmp_dir: directory for the runs of earlier passes
+    :param schema: schema of the files (e.g. DOC_INFO_SCHEMA)
+    """
+
+    def merge_into(runs: list[str], file: str | None) -> None:
+        with pq.ParquetWriter(out_file if file is None else file, schema) as writer:
+            for chunk in _merge_runs(runs, _DocKey):
+                writer.write_table(chunk.take(np.argsort(chunk['docid'].to_numpy(), kind='stable')))
+
+        return
+
+    _merge_passes(files, tmp_dir, merge_into)
+
+    return
@@ -0,0 +1,282 @@
+from crawler_v2 import BATCH_SIZE
+from crawlerWorker import PageWriter
+from helper import ALIAS_FILE, ADJ_LIST_FILE, DOC_INFO_FILE, INV_IDX_FILE, parse_text
+
+import asyncio
+import numpy as np
+import os
+import pandas as pd
+import random
+import tempfile
+
+from aiohttp import web
+from collections import Counter
+from contextlib import contextmanager
+from threading import Event, Thread
+from typing import Iterator
+
+### Declare constants
+NUM_FAKE_PAGES  = 600
+NUM_LINKS       = 12
+NUM_TEST_DOCS   = 400
+
+FAKE_LATENCY    = 0.05  # Seconds the fake server waits before each response
+FAKE_PORT       = 8410
+
+API_URL        = f'http://127.0.0.1:{FAKE_PORT}/page'
+ACTION_API_URL = f'http://127.0.0.1:{FAKE_PORT}/w/api.php'
+
+DOC_VOCAB   = 20000  # Num of distinct terms in the docs made by make_docs
+DOC_LEN     = 1500
+
+# letters of the doc terms (w/o vowels, s, or y, so the stemmer leaves the terms as they are)
+TERM_LETTERS = 'bcdfghjklmnpqrtvwxz'
+
+WORDS = ('cake', 'running', 'dogs', 'cannot', 'history', 'energy', 'the', 'and', 'solar',
+         'gonna', 'painting', 'renaissance', 'chess', "it's", 'U.S.', 'café', 'x2', 'snake_case')
+
+
+### Declare the fake Wikipedia REST API
+def make_pages(seed: int = 0) -> dict[str, dict]:
+    """Generate a link graph of canned pages
+
+    Page_i are canonical pages, Alias_i redirect to Page_i, and Missing_i don't exist
+    """
+
+    rng = random.Random(seed)
+
+    pages = dict()
+    for i in range(NUM_FAKE_PAGES):
+        links = list()
+        for _ in range(NUM_LINKS):
+            j = rng.randrange(NUM_FAKE_PAGES)
+            links.append(rng.choice((f'Page_{j}', f'Page_{j}', f'Alias_{j}', f'Missing_{j}')))
+
+        pars = [ ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 30))) for _ in range(3) ]
+
+        pages[f'Page_{i}'] = {'links': links, 'pars': pars, 'revision': 1000 + i}
+
+    return pages
+
+def page_html(page: dict) -> str:
+    """Render the html of a page the way the REST API does"""
+
+    anchors = [ f'<a href="./{link}#section" rel="mw:WikiLink">{link}</a>' for link in page['links'] ]
+    anchors += [ '<a href="./File:Image.png">file</a>', '<a href="https://example.org/">ext</a>', '<a>no href</a>' ]
+
+    pars = [ f'<p>{par} {anchor}</p>' for par, anchor in zip(page['pars'], anchors) ]
+    pars.append(f'<p>{" ".join(anchors[len(pars):])}</p>')
+
+    return f'<html><head><style>p {{}}</style></head><body>{"".join(pars)}</body></html>'
+
+def page_text(page: dict) -> str:
+    """The paragraph text of the html of a page"""
+
+    anchors = page['links'] + ['file', 'ext', 'no href']
+
+    pars = [ f'{par} {anchor}' for par, anchor in zip(page['pars'], anchors) ]
+    pars.append(' '.join(anchors[len(pars):]))
+
+    return ' '.join(pars)
+
+def _summary(slug: str) -> dict:
+    return {
+        'title': slug.replace('_', ' '),
+        'titles': {'canonical': slug},
+        'content_urls': {'desktop': {'page': f'https://en.wikipedia.org/wiki/{slug}'}}
+    }
+
+def make_app(pages: dict[str, dict]) -> web.Application:
+    """Serve the summary, html, and random summary endpoints"""
+
+    async def summary(request: web.Request) -> web.Response:
+        await asyncio.sleep(FAKE_LATENCY)
+
+        slug = request.match_info['slug']
+        if slug.startswith('Alias_'):
+            slug = f'Page_{slug[6:]}'
+
+        if slug not in pages:
+            raise web.HTTPNotFound()
+
+        return web.json_response(_summary(slug) | {'revision': str(pages[slug]['revision'])})
+
+    async def html(request: web.Request) -> web.Response:
+        await asyncio.sleep(FAKE_LATENCY)
+
+        slug = request.match_info['slug']
+        if slug not in pages:
+            raise web.HTTPNotFound()
+
+        return web.Response(text=page_html(pages[slug]), content_type='text/html')
+
+    async def random_summary(_: web.Request) -> web.Response:
+        return web.json_response(_summary(f'Page_{NUM_FAKE_PAGES - 1}'))
+
+    async def action_query(request: web.Request) -> web.Response:
+        """A titles + redirects query of the action API (formatversion=2)"""
+
+        await asyncio.sleep(FAKE_LATENCY)
+
+        query = {'normalized': list(), 'redirects': list(), 'pages': list()}
+        for title in request.query['titles'].split('|'):
+            if title[0].islower():
+                query['normalized'].append({'from': title, 'to': title[0].upper() + title[1:]})
+                title = title[0].upper() + title[1:]
+
+            if title.startswith('Alias '):
+                query['redirects'].append({'from': title, 'to': f'Page {title[6:]}'})
+                title = f'Page {title[6:]}'
+
+            if title.replace(' ', '_') in pages:
+                canonicalurl = f'https://en.wikipedia.org/wiki/{title.replace(" ", "_")}'
+                query['pages'].append({'ns': 0, 'title': title, 'canonicalurl': canonicalurl,
+                                       'lastrevid': pages[title.replace(' ', '_')]['revision']})
+            else:
+                query['pages'].append({'ns': 0, 'title': title, 'missing': True})
+
+        return web.json_response({'batchcomplete': True, 'query': query})
+
+    app = web.Application()
+    app.add_routes([
+        web.get('/page/random/summary', random_summary),
+        web.get('/page/summary/{slug}', summary),
+        web.get('/page/html/{slug}', html),
+        web.get('/w/api.php', action_query)
+    ])
+
+    return app
+
+def _serve(app: web.Application, started: Event, stop: Event) -> None:
+    """Run the fake server on its own event loop"""
+
+    async def run() -> None:
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', FAKE_PORT).start()
+        started.set()
+
+        while not stop.is_set():
+            await asyncio.sleep(0.1)
+
+        await runner.cleanup()
+
+    asyncio.run(run())
+
+    return
+
+@contextmanager
+def fake_server(pages: dict[str, dict]) -> Iterator[None]:
+    """Serve the canned pages at API_URL and ACTION_API_URL while in the context
+
+    The pages are served as they are at each request, so they can be edited in the context
+    """
+
+    started, stop = Event(), Event()
+    server = Thread(target=_serve, args=(make_app(pages), started, stop))
+    server.start()
+    started.wait()
+
+    try:
+        yield
+    finally:
+        stop.set()
+        server.join()
+
+    return
+
+@contextmanager
+def scratch_dir() -> Iterator[str]:
+    """Work in a temporary directory (w/ an empty ./data directory for the crawl files) while in the context"""
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        os.mkdir('./data')
+
+        try:
+            yield tmp_dir
+        finally:
+            os.chdir(cwd)
+
+    return
+
+
+### Declare the crawl files
+def check_output(pages: dict[str, dict], num_docs: int = NUM_TEST_DOCS) -> None:
+    """Assert the crawled files match the canned pages"""
+
+    doc_info = pd.read_parquet(DOC_INFO_FILE)
+    inv_idx  = pd.read_parquet(INV_IDX_FILE).reset_index()
+    adj_list = pd.read_parquet(ADJ_LIST_FILE)
+    aliases  = pd.read_parquet(ALIAS_FILE)
+
+    assert list(doc_info.index) == list(range(num_docs)), 'Docids are not 0 ... num docs - 1 in order'
+
+    slugs = doc_info['title'].str.replace(' ', '_')
+    assert slugs.is_unique, 'A page was saved more than once'
+
+    terms_by_doc = { docid: dict(zip(group['term'], group['frequency'])) for docid, group in inv_idx.groupby('docid') }
+
+    for docid, slug in slugs.items():
+        page = pages[slug]
+
+        expected_terms = Counter(parse_text(page_text(page)))
+
+        assert terms_by_doc.get(docid, dict()) == dict(expected_terms), f'Terms of {slug} do not match'
+        assert doc_info.loc[docid, 'len'] == expected_terms.total(), f'Doc len of {slug} does not match'
+        assert set(adj_list.loc[docid, 'out_links']) == set(page['links']), f'Out links of {slug} do not match'
+
+    for alias, slug in aliases['to'].items():
+        assert slug == f'Page_{alias[6:]}', f'Alias {alias} -> {slug} is wrong'
+
+    return
+
+def doc_term(i: int) -> str:
+    """The ith term of the docs made by make_docs (parse_text of the term is the term itself)"""
+
+    term = ''
+    while True:
+        term = TERM_LETTERS[i % len(TERM_LETTERS)] + term
+        i //= len(TERM_LETTERS)
+        if i == 0:
+            return f'zq{term}'
+
+def make_docs(num_docs: int, seed: int) -> list[tuple[int, Counter]]:
+    """Make the term counts of docs w/ zipf-like term frequencies, like text"""
+
+    rng = np.random.default_rng(seed)
+    terms = [ doc_term(i) for i in range(DOC_VOCAB) ]
+
+    weights = 1 / np.arange(1, DOC_VOCAB + 1)
+    weights /= weights.sum()
+
+    return [ (docid, Counter( terms[i] for i in rng.choice(DOC_VOCAB, DOC_LEN, p=weights) ))
+             for docid in range(num_docs) ]
+
+def write_docs(docs: list[tuple[int, Counter]]) -> None:
+    """Save the term counts of docs to the crawl files (in ./data) in batches, the way a worker does"""
+
+    writer = PageWriter(DOC_INFO_FILE, INV_IDX_FILE, ADJ_LIST_FILE)
+    for docid, doc_counter in docs:
+        writer.add_page(docid, '', '', list(doc_counter.elements()), [])
+        if len(writer.docids) >= BATCH_SIZE:
+            writer.save_data()
+    writer.close()
+
+    return
+
+def write_pages(pages: dict[str, dict]) -> None:
+    """Save the canned pages to the crawl files (in ./data) as if all of them were crawled in order"""
+
+    writer = PageWriter(DOC_INFO_FILE, INV_IDX_FILE, ADJ_LIST_FILE)
+    for docid, (slug, page) in enumerate(pages.items()):
+        writer.add_page(docid, slug.replace('_', ' '), f'https://en.wikipedia.org/wiki/{slug}',
+                        parse_text(page_text(page)), page['links'], page['revision'])
+    writer.close()
+
+    aliases = pd.DataFrame({'from': [ f'Alias_{slug[5:]}' for slug in pages ], 'to': list(pages)})
+    aliases = aliases.astype({'from': str, 'to': str}).set_index('from')
+    aliases.to_parquet(ALIAS_FILE, engine='pyarrow')
+
+    return
@@ -0,0 +1,204 @@
+import heapq
+import itertools
+import sqlite3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spilled (
+    slug    TEXT PRIMARY KEY,
+    count   INTEGER NOT NULL,
+    seq     INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS spilled_order ON spilled (count DESC, seq);
+"""
+
+class PriorityFrontier:
+    def __init__(self, spill_file: str, max_size: int) -> None:
+        """Initialize an empty frontier of slugs ordered by their in-link count
+
+        Each push of a slug counts as an in-link, and the slug w/ the most
+        in-links seen so far is popped first (ties in the order they were
+        first pushed, so closer to the seeds first). At most max_size slugs
+        are kept in memory, the lower scored half is spilled to a SQLite
+        file. In-links pushed to a spilled slug are added to its row, and
+        the spilled slugs are read back once the best of them outranks the
+        slugs in memory.
+
+        Not thread safe, the caller must hold a lock.
+
+        :param spill_file: file the spilled slugs are stored in (created on the first spill)
+        :param max_size: max num of slugs kept in memory
+        """
+
+        self.spill_file = spill_file
+        self.max_size = max_size
+
+        # slug -> in-link count and the order it was first pushed
+        self.entries: dict[str, tuple[int, int]] = dict()
+
+        # (-count, seq, slug), w/ stale entries of slugs whose count went up
+        self.heap: list[tuple[int, int, str]] = list()
+
+        self.seq = itertools.count()
+
+        self.conn: sqlite3.Connection | None = None
+        self.num_spilled = 0
+
+        # (-count, seq) of the best spilled slug, or None if it has to be read again
+        self.spilled_top: tuple[int, int] | None = None
+
+        return
+
+    def __len__(self) -> int:
+        return len(self.entries) + self.num_spilled
+
+    def push(self, slug: str, count: int = 1) -> None:
+        """Add in-links to a slug (adding it to the frontier if it's new)"""
+
+        old_count, seq = self.entries.get(slug, (0, -1))
+
+        # a spilled slug only has its row updated (committed w/ the next spill or refill, the file is only scratch space)
+        if seq < 0 and self.num_spilled > 0:
+            if self.conn.execute('UPDATE spilled SET count = count + ? WHERE slug = ?', (count, slug)).rowcount > 0:
+                self.spilled_top = None
+                return
+
+        if seq < 0:
+            seq = next(self.seq)
+
+        self.entries[slug] = (old_count + count, seq)
+        heapq.heappush(self.heap, (-(old_count + count), seq, slug))
+
+        if len(self.entries) > self.max_size:
+            self._spill()
+        elif len(self.heap) > 4 * self.max_size:
+            self._rebuild_heap()
+
+        return
+
+    def pop(self) -> str | None:
+        """Remove the slug w/ the most in-links
+
+        :returns: the slug, or None if the frontier is empty
+        """
+
+        while True:
+            # drop the stale entries on top of the heap
+            while len(self.heap) > 0 and self.entries.get(self.heap[0][2], (0, -1))[0] != -self.heap[0][0]:
+                heapq.heappop(self.heap)
+
+            # read the spilled slugs back if the best of them outranks the heap
+            if self.num_spilled > 0 and (len(self.heap) == 0 or self._spilled_top() < self.heap[0][:2]):
+                self._refill()
+                continue
+
+            if len(self.heap) == 0:
+                return None
+
+            slug = heapq.heappop(self.heap)[2]
+            del self.entries[slug]
+
+            return slug
+
+    def snapshot(self) -> list[tuple[str, int, int]]:
+        """Get every slug in memory and spilled w/ its count and the order it was first pushed
+
+        :returns: (slug, count, seq) of each slug, to restore the frontier w/
+        """
+
+        rows = [ (slug, count, seq) for slug, (count, seq) in self.entries.items() ]
+
+        if self.conn is not None:
+            rows += self.conn.execute('SELECT slug, count, seq FROM spilled').fetchall()
+
+        return rows
+
+    def restore(self, rows: list[tuple[str, int, int]]) -> None:
+        """Fill an empty frontier w/ a snapshot (spilling if it doesn't fit in memory)"""
+
+        self.entries = { slug: (count, seq) for slug, count, seq in rows }
+        self.seq = itertools.count(max(( seq for _, _, seq in rows ), default=-1) + 1)
+
+        if len(self.entries) > self.max_size:
+            self._spill()
+        else:
+            self._rebuild_heap()
+
+        return
+
+    def slugs(self) -> set[str]:
+        """Get every slug in memory and spilled"""
+
+        return { row[0] for row in self.snapshot() }
+
+    def _spilled_top(self) -> tuple[int, int]:
+        """Get the (-count, seq) of the best spilled slug"""
+
+        if self.spilled_top is None:
+            self.spilled_top = self.conn.execute('SELECT -count, seq FROM spilled ORDER BY count DESC, seq LIMIT 1').fetchone()
+
+        return self.spilled_top
+
+    def _rebuild_heap(self) -> None:
+        """Drop the stale heap entries"""
+
+        self.heap = [ (-count, seq, slug) for slug, (count, seq) in self.entries.items() ]
+        heapq.heapify(self.heap)
+
+        return
+
+    def _spill(self) -> None:
+        """Move the lower scored half of the slugs in memory to the spill file"""
+
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.spill_file, check_same_thread=False)
+            self.conn.executescript(_SCHEMA)
+
+        ranked = sorted(self.entries.items(), key=lambda entry: (-entry[1][0], entry[1][1]))
+        spilled = ranked[self.max_size // 2:]
+
+        with self.conn:
+            self.conn.executemany('INSERT INTO spilled VALUES (?, ?, ?) ON CONFLICT (slug) DO UPDATE '
+                                  'SET count = count + excluded.count, seq = min(seq, excluded.seq)',
+                                  ( (slug, count, seq) for slug, (count, seq) in spilled ))
+
+        for slug, _ in spilled:
+            del self.entries[slug]
+
+        self.num_spilled = self.conn.execute('SELECT COUNT(*) FROM spilled').fetchone()[0]
+        self.spilled_top = None
+
+        self._rebuild_heap()
+
+        return
+
+    def _refill(self) -> None:
+        """Move the higher scored slugs of the spill file back into memory"""
+
+        if self.conn is None:
+            self.num_spilled = 0
+            return
+
+        rows = self.conn.execute('SELECT slug, count, seq FROM spilled ORDER BY count DESC, seq LIMIT ?',
+                                 (self.max_size // 2,)).fetchall()
+
+        with self.conn:
+            self.conn.executemany('DELETE FROM spilled WHERE slug = ?', ( (row[0],) for row in rows ))
+
+        self.num_spilled -= len(rows)
+        self.spilled_top = None
+
+        # a slug is never in memory and spilled at once, so the rows are moved as they are
+        for slug, count, seq in rows:
+            self.entries[slug] = (count, seq)
+
+        self._rebuild_heap()
+
+        return
+
+    def close(self) -> None:
+        """Close the spill file"""
+
+        if self.conn is not None:
+            self.conn.close()
+
+        return
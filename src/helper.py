@@ -1,17 +1,32 @@
 import nltk
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import os
 import re
+import time
+import tracemalloc
 
+from inverted_index import InvertedIndex, Postings, sort_postings
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import lru_cache
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+from nltk.tokenize import NLTKWordTokenizer
 from nltk.stem.snowball import EnglishStemmer
 
 # import nltk libs and stopwords
-nltk.download('punkt', quiet=True)
 nltk.download('stopwords', quiet=True)
 stop_words = set(stopwords.words('english'))
 
 _stemmer = EnglishStemmer()
+_word_tokenizer = NLTKWordTokenizer()
+
+# Matches (in order) apostrophe suffixes, punctuation, underscores, and words
+# starting w/ a digit, all of which are dropped, otherwise a run of letters
+_TOKEN_RE = re.compile(r"'\w*|[^\w\s]+|_+|\d[^\W_]*|([^\W\d_]+)")
 
 # Define global constants
 NUM_DOCS    = 100000
@@ -23,6 +38,119 @@ DOC_INFO_FILE   = './data/doc_info.parquet'
 INV_IDX_FILE    = './data/inv_idx.parquet'
 VOCAB_FILE      = './data/vocab.parquet'
 
+RESPONSE_CACHE_FILE = './data/responses.sqlite'
+
+INDEX_DIR       = './data/index'
+
+STEM_CACHE_SIZE = 2**18 # Num of distinct words w/ memoized terms
+
+PRIOR_TOP_SIZE  = 100   # Num of docs w/ the highest link prior kept for pruning queries
+
+def calc_link_prior(doc_info: pd.DataFrame) -> np.ndarray:
+    """Calculate the static link ranking prior of each document
+
+    :returns: (PageRank + 2*hub_score + auth_score) / 4 as float32
+    """
+
+    prior = np.array(doc_info['PageRank'] + 2*doc_info['hub_score'] + doc_info['auth_score'])
+    prior /= 4
+
+    return prior.astype(np.float32)
+
+def calc_prior_top(prior: np.ndarray) -> np.ndarray:
+    """Find the docs w/ the highest link prior
+
+    :returns: the PRIOR_TOP_SIZE docids w/ the highest prior in decreasing order of prior
+    """
+
+    return np.argsort(-prior, kind='stable')[:PRIOR_TOP_SIZE]
+
+def calc_doc_stats(doc_info: pd.DataFrame) -> dict[str, float]:
+    """Calculate the collection stats used by the ranking models
+
+    :returns: num_docs, col_len (total doc len), and avg_doc_len
+    """
+
+    num_docs = len(doc_info)
+    col_len  = int(doc_info['len'].sum())
+
+    return {'num_docs': num_docs, 'col_len': col_len, 'avg_doc_len': col_len / num_docs}
+
+# peaks of the blocks being measured (innermost last), so nested blocks don't hide each others' peaks
+_measured_peaks: list[int] = list()
+_arrow_peaks: list[int] = list()
+
+def _arrow_allocated() -> tuple[int, int]:
+    """Get the bytes allocated by the default Arrow pool now, and at its peak so far"""
+
+    pool = pa.default_memory_pool()
+
+    return pool.bytes_allocated(), pool.max_memory()
+
+@contextmanager
+def measure() -> Iterator[dict[str, float]]:
+    """Measure the time and peak memory (of Python objects, NumPy, and Arrow) of a block
+
+    Python objects and NumPy arrays are traced w/ tracemalloc, and Arrow
+    buffers by the bytes allocated by the default Arrow pool. The Arrow
+    pool's peak can't be reset, so a block's Arrow peak is only exact if it
+    sets a new peak for the process, otherwise it's the bytes the block
+    still holds (or held when a nested block exited). Blocks can be nested.
+
+    :returns: dict that is filled in w/ the 'seconds' and 'peak' (bytes) of the block when it exits
+    """
+
+    stats: dict[str, float] = dict()
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    elif len(_measured_peaks) > 0:
+        _measured_peaks[-1] = max(_measured_peaks[-1], tracemalloc.get_traced_memory()[1])
+    tracemalloc.reset_peak()
+
+    arrow_start, arrow_max = _arrow_allocated()
+    if len(_arrow_peaks) > 0:
+        _arrow_peaks[-1] = max(_arrow_peaks[-1], arrow_start)
+
+    _measured_peaks.append(0)
+    _arrow_peaks.append(arrow_start)
+    start = time.time()
+    try:
+        yield stats
+    finally:
+        stats['seconds'] = time.time() - start
+
+        traced_peak = max(_measured_peaks.pop(), tracemalloc.get_traced_memory()[1])
+
+        arrow_end, arrow_end_max = _arrow_allocated()
+        arrow_peak = max(_arrow_peaks.pop(), arrow_end, arrow_end_max if arrow_end_max > arrow_max else 0)
+
+        stats['peak'] = traced_peak + arrow_peak - arrow_start
+
+        if len(_measured_peaks) > 0:
+            _measured_peaks[-1] = max(_measured_peaks[-1], traced_peak)
+            _arrow_peaks[-1] = max(_arrow_peaks[-1], arrow_peak)
+
+        if started:
+            tracemalloc.stop()
+
+    return
+
+def _pandas_schema(sample: dict[str, list], index: list[str]) -> pa.Schema:
+    """Get the schema of a DataFrame like the sample, w/ the pandas metadata read_parquet gets its index from"""
+
+    return pa.Schema.from_pandas(pd.DataFrame(sample).set_index(index))
+
+DOC_INFO_SCHEMA = _pandas_schema({'docid': [0], 'title': [''], 'url': [''], 'len': [0], 'revision': [0]}, ['docid'])
+ADJ_LIST_SCHEMA = _pandas_schema({'docid': [0], 'out_links': [['']]}, ['docid'])
+
+# the terms are stored dictionary encoded (int32 term ids into the distinct terms), and read back as a categorical
+INV_IDX_SCHEMA = _pandas_schema({'term': pd.Categorical(['']), 'docid': np.zeros(1, np.int32),
+                                 'frequency': np.zeros(1, np.int32)}, ['term', 'docid'])
+INV_IDX_SCHEMA = INV_IDX_SCHEMA.set(INV_IDX_SCHEMA.get_field_index('term'),
+                                    pa.field('term', pa.dictionary(pa.int32(), pa.string())))
+
 def load_aliases(silence: bool = False) -> pd.DataFrame:
     """Loads the stored aliases
 
@@ -61,7 +189,8 @@ def load_doc_info(silence: bool = False) -> pd.DataFrame:
     """Loads the stored document info
 
     :returns: document info as a DataFrame
-        (docid -> title, url, len, PageRank, auth_score, hub_score)
+        (docid -> title, url, len, PageRank, auth_score, hub_score, prior)
+        w/ the collection stats in doc_info.attrs['stats']
     """
 
     if not silence:
@@ -69,6 +198,12 @@ def load_doc_info(silence: bool = False) -> pd.DataFrame:
 
     doc_info = pd.read_parquet(DOC_INFO_FILE, engine='pyarrow')
 
+    # doc info stored before the link prior was precomputed
+    if 'prior' not in doc_info.columns and 'PageRank' in doc_info.columns:
+        doc_info['prior'] = calc_link_prior(doc_info)
+
+    doc_info.attrs['stats'] = calc_doc_stats(doc_info)
+
     if not silence:
         print('Finished loading\n')
 
@@ -78,13 +213,70 @@ def load_inv_idx(silence: bool = False) -> pd.DataFrame:
     """Loads the stored inveted index
 
     :returns: inveted index as a DataFrame
-        (term -> docid -> frequency)
+        (term -> docid -> frequency) w/ the terms as a categorical
     """
 
     if not silence:
         print('Loading inverted index ...')
 
-        inv_idx = pd.read_parquet(INV_IDX_FILE, engine='pyarrow')
+    inv_idx = pd.read_parquet(INV_IDX_FILE, engine='pyarrow')
+
+    if not silence:
+        print('Finished loading\n')
+
+    return inv_idx
+
+def postings_batch(terms: np.ndarray | pa.Array, term_ids: np.ndarray | pa.Array, docids: np.ndarray,
+                   freqs: np.ndarray) -> pa.RecordBatch:
+    """Get postings as a record batch w/ INV_IDX_SCHEMA
+
+    :param terms: the distinct terms (the dictionary the term ids index)
+    """
+
+    term_col = pa.DictionaryArray.from_arrays(pa.array(term_ids, pa.int32()), pa.array(terms, pa.string()))
+
+    return pa.RecordBatch.from_pydict({'term': term_col, 'docid': docids, 'frequency': freqs}, schema=INV_IDX_SCHEMA)
+
+def store_postings(postings: Postings, file: str = INV_IDX_FILE) -> None:
+    """Sort postings by (term, docid) and store them
+
+    :param postings: postings w/ sorted terms (as returned by read_postings)
+    """
+
+    batch = postings_batch(*sort_postings(postings))
+
+    pq.write_table(pa.Table.from_batches([batch]), file)
+
+    return
+
+def postings_of(inv_idx: pd.DataFrame) -> Postings:
+    """Get the postings of an inverted index DataFrame as arrays (like read_postings)"""
+
+    terms = inv_idx.index.levels[0].to_numpy(dtype=object)
+    term_ids = inv_idx.index.codes[0].astype(np.int32)
+
+    docids = inv_idx.index.get_level_values('docid').to_numpy().astype(np.int32, copy=False)
+    freqs = inv_idx['frequency'].to_numpy().astype(np.int32, copy=False)
+
+    return terms, term_ids, docids, freqs
+
+def load_index(silence: bool = False) -> InvertedIndex:
+    """Loads the stored inveted index into a CSR style index
+
+    Memory maps the index in INDEX_DIR if it has been built, otherwise
+    builds the index from the inverted index parquet file
+
+    :returns: inveted index as an InvertedIndex
+        (term -> docids, frequencies)
+    """
+
+    if not silence:
+        print('Loading inverted index ...')
+
+    if os.path.exists(INDEX_DIR):
+        inv_idx = InvertedIndex.load(INDEX_DIR)
+    else:
+        inv_idx = InvertedIndex.from_parquet(INV_IDX_FILE)
 
     if not silence:
         print('Finished loading\n')
@@ -108,41 +300,94 @@ def load_vocab(silence: bool = False) -> pd.DataFrame:
 
     return vocab
 
-def load_data(silence: bool = False) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+def load_data(silence: bool = False) -> tuple[pd.DataFrame, InvertedIndex, pd.DataFrame]:
     """Loads the stored data files
 
     :returns:
-        doc info: (docid -> title, url, len, PageRank, auth_score, hub_score)
-        inv idx: (term -> docid -> frequency)
+        doc info: (docid -> title, url, len, PageRank, auth_score, hub_score, prior)
+        inv idx: (term -> docids, frequencies)
         vocab: (term -> frequency)
     """
 
-    doc_info = load_doc_info(silence)
-    inv_idx  = load_inv_idx(silence)
+    doc_info = load_doc_info(silence) if not os.path.exists(INDEX_DIR) else _load_indexed_doc_info(silence)
+    inv_idx  = load_index(silence)
     vocab    = load_vocab(silence)
 
     return (doc_info, inv_idx, vocab)
 
+def _load_indexed_doc_info(silence: bool = False) -> pd.DataFrame:
+    """Loads the doc info the ranking models need, w/ the doc lens and link prior memory mapped from INDEX_DIR
+
+    Only the titles and urls are read from the stored doc info, so the link
+    prior isn't recomputed. The copy-on-write mode keeps feedback in memory.
+
+    :returns: document info as a DataFrame
+        (docid -> title, url, len, prior)
+        w/ the collection stats in doc_info.attrs['stats']
+    """
+
+    if not silence:
+        print('Loading doc info ...')
+
+    titles = pd.read_parquet(DOC_INFO_FILE, engine='pyarrow', columns=['title', 'url'])
+
+    doc_info = pd.DataFrame({
+        'title': titles['title'],
+        'url':   titles['url'],
+        'len':   np.load(f'{INDEX_DIR}/doc_lens.npy', mmap_mode='c'),
+        'prior': np.load(f'{INDEX_DIR}/prior.npy', mmap_mode='c')
+    }, index=titles.index, copy=False)
+
+    doc_info.attrs['stats'] = calc_doc_stats(doc_info)
+
+    if not silence:
+        print('Finished loading\n')
+
+    return doc_info
+
+def load_prior_top(doc_info: pd.DataFrame) -> np.ndarray:
+    """Loads the docs w/ the highest link prior, which MaxScore starts from
+
+    Memory maps the ones stored in INDEX_DIR if it has been built, otherwise
+    calculates them from the doc info
+
+    :returns: the PRIOR_TOP_SIZE docids w/ the highest prior in decreasing order of prior
+    """
+
+    if os.path.exists(f'{INDEX_DIR}/prior_top.npy'):
+        return np.load(f'{INDEX_DIR}/prior_top.npy', mmap_mode='r')
+
+    return calc_prior_top(doc_info['prior'].to_numpy())
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def _parse_word(word: str) -> tuple[str, ...]:
+    """Parse a single word into its terms (memoized)
+
+    :param word: a run of letters, as matched by _TOKEN_RE
+    :returns: stemmed tokens of the lowercased word that aren't stopwords
+    """
+
+    # the tokenizer still splits some words (e.g. cannot -> can not)
+    word_tokens = _word_tokenizer.tokenize(word.lower())
+
+    return tuple( _stemmer.stem(w) for w in word_tokens if w not in stop_words )
+
 def parse_text(text: str) -> list[str]:
     """Parse text into a list of terms
 
+    Produces the same terms as removing apostrophe suffixes, punctuation,
+    underscores, and words starting w/ a digit, then lowercasing, word
+    tokenizing, removing stopwords, and stemming, but in a single regex pass
+    w/ the rest memoized per distinct word.
+
     :param text: text to be parsed
     :returns: list of terms in text
     """
 
-    # remove new line chars, non-alphanumeric chars, and nums
-    text = re.sub(r'\n|\r', ' ', text)
-    text = re.sub(r"'[\w]*|[^\w\s]+|_+", ' ', text)
-    text = re.sub(r'\d+[\w]*', ' ', text)
-
-    # remove extra whitespace and strip
-    text = re.sub(r'\s+', ' ', text)
-    text = text.strip()
-
-    text = text.lower()
-
-    # tokenize and remove stopwords
-    word_tokens = word_tokenize(text)
-    filtered = [ _stemmer.stem(w) for w in word_tokens if w not in stop_words ]
+    filtered: list[str] = []
+    for match in _TOKEN_RE.finditer(text):
+        word = match.group(1)
+        if word is not None:
+            filtered.extend(_parse_word(word))
 
     return filtered
@@ -0,0 +1,228 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import os
+
+# arrays of the memory mapped index format (stored as INDEX_DIR/<name>.npy)
+INDEX_ARRAYS = ('terms', 'offsets', 'docids', 'freqs')
+
+# distinct terms, and the term id (index into the terms), docid, and frequency of each posting
+Postings = tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+def table_postings(table: pa.Table) -> Postings:
+    """Get the postings of a table as integer arrays
+
+    The dictionaries of the dictionary encoded term column are unified and
+    sorted, so a term's id is its rank among the terms and no string is
+    built per posting. Only the terms that have postings are kept.
+
+    :param table: table w/ dictionary encoded term, docid, and frequency columns
+    :returns:
+        the distinct terms, sorted
+        term ids (int32)
+        docids (int32)
+        frequencies (int32)
+    """
+
+    table = table.unify_dictionaries()
+
+    term_col = table['term']
+    dictionary = term_col.chunk(0).dictionary if term_col.num_chunks > 0 else pa.array([], pa.string())
+    indices = np.concatenate([ chunk.indices.to_numpy() for chunk in term_col.chunks ] + [np.zeros(0, dtype=np.int32)])
+
+    used = np.flatnonzero(np.bincount(indices, minlength=len(dictionary)))
+    order = used[pc.sort_indices(dictionary.take(used)).to_numpy()]
+
+    ranks = np.zeros(len(dictionary), dtype=np.int32)
+    ranks[order] = np.arange(len(order), dtype=np.int32)
+
+    terms    = dictionary.take(order).to_numpy(zero_copy_only=False)
+    term_ids = ranks[indices]
+    docids   = table['docid'].to_numpy().astype(np.int32, copy=False)
+    freqs    = table['frequency'].to_numpy().astype(np.int32, copy=False)
+
+    return terms, term_ids, docids, freqs
+
+def read_postings(files: str | list[str]) -> Postings:
+    """Read stored postings as integer arrays (see table_postings)
+
+    :param files: parquet file(s) w/ term, docid, and frequency columns
+    """
+
+    if isinstance(files, str):
+        files = [files]
+
+    tables = [ pq.read_table(file, columns=['term', 'docid', 'frequency'], read_dictionary=['term']) for file in files ]
+
+    return table_postings(pa.concat_tables(tables))
+
+def sort_postings(postings: Postings) -> Postings:
+    """Sort postings by (term, docid), unless they are sorted already
+
+    :param postings: postings w/ sorted terms (as returned by table_postings)
+    """
+
+    terms, term_ids, docids, freqs = postings
+
+    keys = (term_ids.astype(np.int64) << 32) | docids
+    if len(keys) > 1 and not (np.diff(keys) > 0).all():
+        order = np.argsort(keys, kind='stable')
+        term_ids, docids, freqs = term_ids[order], docids[order], freqs[order]
+
+    return terms, term_ids, docids, freqs
+
+def lookup_sorted(doc_ids: np.ndarray, doc_cnts: np.ndarray, docids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Look up the given (sorted) docs in a posting list w/o scanning it
+
+    :returns:
+        mask of the docs that are in the posting list
+        frequency in each of those docs
+    """
+
+    if len(doc_ids) == 0:
+        return np.zeros(len(docids), dtype=bool), doc_cnts
+
+    pos = np.searchsorted(doc_ids, docids)
+    pos[pos == len(doc_ids)] = 0
+
+    found = doc_ids[pos] == docids
+
+    return found, doc_cnts[pos[found]]
+
+class InvertedIndex:
+    def __init__(self, terms: np.ndarray, offsets: np.ndarray, docids: np.ndarray, freqs: np.ndarray) -> None:
+        """Initialize the index from CSR style arrays
+
+        The postings of the term terms[i] are docids[offsets[i]:offsets[i+1]]
+        (sorted by docid) w/ the matching frequencies in freqs
+        """
+
+        self.terms: np.ndarray   = terms
+        self.offsets: np.ndarray = offsets.astype(np.int64, copy=False)
+        self.docids: np.ndarray  = docids.astype(np.int32, copy=False)
+        self.freqs: np.ndarray   = freqs.astype(np.int32, copy=False)
+
+        self.term_ids: dict[str, int] = { str(term): i for i, term in enumerate(terms) }
+
+        return
+
+    @classmethod
+    def from_parquet(cls, file: str) -> 'InvertedIndex':
+        """Build the index from a stored inverted index
+
+        :param file: parquet file w/ term, docid, and frequency columns
+        :returns: the index
+        """
+
+        terms, term_ids, docids, freqs = sort_postings(read_postings(file))
+
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(terms)), out=offsets[1:])
+
+        return cls(terms, offsets, docids, freqs)
+
+    @classmethod
+    def load(cls, index_dir: str, mmap_mode: str = 'c') -> 'InvertedIndex':
+        """Open an index stored w/ save as memory mapped arrays
+
+        Pages are only read from disk as postings are accessed, and are
+        shared w/ any other process that maps the same files. The default
+        copy-on-write mode keeps updates (e.g. feedback) in memory.
+
+        :param index_dir: directory the index was saved to
+        :param mmap_mode: mode passed to numpy.load
+        :returns: the index
+        """
+
+        arrays = { name: np.load(f'{index_dir}/{name}.npy', mmap_mode=mmap_mode) for name in INDEX_ARRAYS }
+
+        return cls(arrays['terms'], arrays['offsets'], arrays['docids'], arrays['freqs'])
+
+    def save(self, index_dir: str) -> None:
+        """Store the index as flat binary arrays that can be memory mapped"""
+
+        if not os.path.exists(index_dir):
+            os.mkdir(index_dir)
+
+        arrays = {
+            'terms':    np.asarray(self.terms, dtype=str),
+            'offsets':  self.offsets,
+            'docids':   self.docids,
+            'freqs':    self.freqs
+        }
+
+        for name, array in arrays.items():
+            np.save(f'{index_dir}/{name}.npy', array)
+
+        return
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.term_ids
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def postings(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        """Get the posting list of a term
+
+        :returns:
+            docids of the docs containing the term
+            frequency of the term in each doc
+        """
+
+        term_id = self.term_ids[term]
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+
+        return self.docids[start:end], self.freqs[start:end]
+
+    def doc_freq(self, term: str) -> int:
+        """Get the number of docs containing the term"""
+
+        term_id = self.term_ids[term]
+
+        return int(self.offsets[term_id + 1] - self.offsets[term_id])
+
+    def lookup(self, term: str, docids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Look up the frequency of a term in the given (sorted) docs
+
+        :returns:
+            mask of the docs that contain the term
+            frequency of the term in each of those docs
+        """
+
+        return lookup_sorted(*self.postings(term), docids)
+
+    def add_postings(self, term: str, docids: list[int], cnt: int) -> None:
+        """Add cnt to the frequency of the term in each doc
+
+        Docs that don't contain the term yet are inserted into its posting list
+        """
+
+        # the arrays of an index read from parquet can be read only views of the arrow buffers
+        if not self.freqs.flags.writeable:
+            self.freqs = self.freqs.copy()
+        if not self.offsets.flags.writeable:
+            self.offsets = self.offsets.copy()
+
+        term_id = self.term_ids[term]
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+
+        new_docids, counts = np.unique(np.asarray(docids, dtype=np.int32), return_counts=True)
+
+        term_docids = self.docids[start:end]
+        pos = np.searchsorted(term_docids, new_docids)
+
+        found = pos < len(term_docids)
+        found[found] = term_docids[pos[found]] == new_docids[found]
+
+        self.freqs[start + pos[found]] += cnt * counts[found]
+
+        missing = ~found
+        if missing.any():
+            self.docids = np.insert(self.docids, start + pos[missing], new_docids[missing])
+            self.freqs  = np.insert(self.freqs,  start + pos[missing], (cnt * counts[missing]).astype(np.int32))
+
+            self.offsets[term_id + 1:] += missing.sum()
+
+        return
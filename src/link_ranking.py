@@ -1,4 +1,4 @@
-from helper import DOC_INFO_FILE, NUM_DOCS, load_adj_list, load_aliases, load_doc_info
+from helper import DOC_INFO_FILE, calc_link_prior, load_adj_list, load_aliases, load_doc_info
 
 import numpy as np
 import pandas as pd
@@ -28,6 +28,8 @@ def _create_adj_matrix(doc_info: pd.DataFrame) -> sp.csr_matrix:
     aliases  = load_aliases()
     adj_list = load_adj_list()
 
+    num_docs = len(doc_info)
+
     subs = { str(row['title']).replace(' ', '_'): docid for docid, row in doc_info.iterrows() }
 
     aliases = { str(from_title): subs[str(row['to'])] for from_title, row in aliases.iterrows() if str(row['to']) in subs }
@@ -37,7 +39,7 @@ def _create_adj_matrix(doc_info: pd.DataFrame) -> sp.csr_matrix:
     # https://stackoverflow.com/questions/60894395/quickly-creating-scipy-sparse-matrix-from-adjacency-list
     row, col, data = [], [], []
     print('Constructing the adjacency matrix ...')
-    for docid, adj_list in tqdm(adj_list.iterrows(), total=NUM_DOCS):
+    for docid, adj_list in tqdm(adj_list.iterrows(), total=num_docs):
         out_links = list(adj_list['out_links'])
 
         # reduce and replace uls w/ ids
@@ -55,7 +57,7 @@ def _create_adj_matrix(doc_info: pd.DataFrame) -> sp.csr_matrix:
     row = np.hstack(row)
     col = np.hstack(col)
 
-    M = sp.coo_matrix((data, (row, col)), (NUM_DOCS, NUM_DOCS)).tocsr()
+    M = sp.coo_matrix((data, (row, col)), (num_docs, num_docs)).tocsr()
 
     print('Finished\n')
 
@@ -73,8 +75,8 @@ def _calc_HITS_scores(doc_info: pd.DataFrame, M: sp.csr_matrix) -> None:
 
     M_T = M.transpose()
 
-    hubs  = np.ones(NUM_DOCS)
-    auths = np.ones(NUM_DOCS)
+    hubs  = np.ones(len(doc_info))
+    auths = np.ones(len(doc_info))
     for _ in tqdm(range(NUM_ITER)):
         hubs  = M.dot(auths)
         auths = M_T.dot(hubs)
@@ -116,7 +118,7 @@ def _calc_PageRanks(doc_info: pd.DataFrame, M: sp.csr_matrix) -> None:
 
     M_hat: sp.coo_matrix = d * M
 
-    b_k = np.ones(NUM_DOCS) # don't normalize until after first multiplication
+    b_k = np.ones(len(doc_info)) # don't normalize until after first multiplication
     for _ in tqdm(range(NUM_ITER)):
         b_k = M_hat.dot(b_k) + (MAX_RANK * (1 - d))
 
@@ -146,4 +148,8 @@ def calc_link_ranks() -> None:
 
     _calc_PageRanks(doc_info, M)
 
+    # precompute the static prior the ranking models start from
+    doc_info['prior'] = calc_link_prior(doc_info)
+    doc_info.to_parquet(DOC_INFO_FILE, engine='pyarrow')
+
     return
@@ -1,32 +1,106 @@
 from helper import NUM_DOCS, parse_text
+from inverted_index import InvertedIndex, lookup_sorted
 
 import numpy as np
 import pandas as pd
+import os
+import scipy.sparse as sp
 
-def prob_ranking(doc_info: pd.DataFrame, inv_idx: pd.DataFrame, vocab: pd.DataFrame, query: str, silence: bool = False) -> np.ndarray:
+# BM25 smoothing params
+BM25_K: int   = 10
+BM25_B: float = 0.25
+
+# Jelinek-Mercer smoothing param
+JM_LAMBDA: float = 0.15
+
+# slack for float rounding when comparing score bounds
+_BOUND_EPS = 1e-9
+
+# MaxScore scores every doc once its essential postings are over this fraction of the docs
+MAXSCORE_MAX_POSTINGS: float = 0.2
+
+def bm25_weights(doc_cnts: np.ndarray, doc_lens: np.ndarray, avg_doc_len: float, idf: float | np.ndarray) -> np.ndarray:
+    """Calculate the BM25 weight of a term in each doc"""
+
+    numerators = (BM25_K + 1) * doc_cnts
+    divisors = doc_cnts + BM25_K * (1 - BM25_B + BM25_B * (doc_lens / avg_doc_len))
+
+    return (numerators / divisors) * idf
+
+def jm_weights(doc_cnts: np.ndarray, doc_lens: np.ndarray, col_prob: float | np.ndarray) -> np.ndarray:
+    """Calculate the Jelinek-Mercer smoothed log weight of a term in each doc"""
+
+    jm_smoothing = (1 - JM_LAMBDA) / JM_LAMBDA
+
+    doc_probs = doc_cnts / doc_lens
+
+    return np.log(1 + jm_smoothing * (doc_probs / col_prob))
+
+def _term_weights(inv_idx: InvertedIndex, vocab: pd.DataFrame, term: str, model: str,
+                  doc_lens: np.ndarray, stats: dict[str, float]) -> tuple[np.ndarray, np.ndarray]:
+    """Get the docs containing a term and the model's weight of the term in each
+
+    :param model: 'tf_idf' or 'prob'
+    :param stats: the collection stats from doc_info.attrs
+    """
+
+    doc_ids, doc_cnts = inv_idx.postings(term)
+
+    match model:
+        case 'tf_idf':
+            idf = np.log((NUM_DOCS + 1) / len(doc_ids))
+            weights = bm25_weights(doc_cnts, doc_lens[doc_ids], stats['avg_doc_len'], idf)
+        case 'prob':
+            col_prob = vocab.loc[term].iloc[0] / stats['col_len']
+            weights = jm_weights(doc_cnts, doc_lens[doc_ids], col_prob)
+        case _:
+            raise ValueError(f'{model} is not a model')
+
+    return doc_ids, weights
+
+def _top_k(doc_rel: np.ndarray, top_k: int | None) -> tuple[np.ndarray, np.ndarray]:
+    """Select the top k docs w/o sorting the entire array
+
+    :returns:
+        the top k docids in decreasing order of relevance
+        the relevance of each of those docs
+    """
+
+    if top_k is not None and top_k < 1:
+        raise ValueError(f'top_k must be at least 1, not {top_k}')
+
+    if top_k is None or top_k >= len(doc_rel):
+        rankings = doc_rel.argsort()[::-1]
+    else:
+        top = np.argpartition(doc_rel, -top_k)[-top_k:]
+        rankings = top[doc_rel[top].argsort()[::-1]]
+
+    return rankings, doc_rel[rankings]
+
+def prob_ranking(doc_info: pd.DataFrame, inv_idx: InvertedIndex, vocab: pd.DataFrame, query: str,
+                 top_k: int | None = None, silence: bool = False) -> tuple[np.ndarray, np.ndarray]:
     """Rank the query using a probabilistic model
 
     :param doc_info:    DataFrame of document info
-    :param inv_idx:     DataFrame of the inverted index
+    :param inv_idx:     InvertedIndex of the postings
     :param vocab:       DataFrame of the vocab
     :param query:       Query to be ranked with the model
+    :param top_k:       Number of docs to return (all docs if None)
 
-    :returns:   The document indecies in decreasing order of ranking
+    :returns:
+        The document indecies in decreasing order of ranking
+        The relevance score of each of those documents
     """
 
     if not silence:
         print('Ranking query: "%s" ...' % query)
 
-    # set smoothing params
-    lam = 0.15
-    jm_smoothing = (1 - lam) / lam
-
-    col_len = doc_info['len'].sum()
+    doc_lens = doc_info['len'].to_numpy()
+    col_len = doc_info.attrs['stats']['col_len']
 
     # init doc relivance
     # doc_rel = np.zeros(NUM_DOCS)
-    doc_rel = np.array(doc_info['PageRank'] + 2*doc_info['hub_score'] + doc_info['auth_score'])
-    doc_rel /= 4
+    doc_rel = doc_info['prior'].to_numpy(dtype=np.float64)
 
     filtered = parse_text(query)
     for term in filtered:
@@ -35,71 +109,414 @@ def prob_ranking(doc_info: pd.DataFrame, inv_idx: pd.DataFrame, vocab: pd.DataFr
 
         col_prob = vocab.loc[term].iloc[0] / col_len
 
-        term_data = inv_idx.loc[term]
-        doc_ids = set(term_data.index)  # docs containing term
-        for id in doc_ids:
-            doc_len = doc_info.loc[id]['len']
-            doc_cnt = term_data.loc[id].iloc[0]
-
-            doc_prob = doc_cnt / doc_len
+        doc_ids, doc_cnts = inv_idx.postings(term)  # docs containing term
 
-            doc_rel[id] += np.log(1 + jm_smoothing * (doc_prob / col_prob))
+        doc_rel[doc_ids] += jm_weights(doc_cnts, doc_lens[doc_ids], col_prob)
 
-    rankings = doc_rel.argsort()[::-1]
-    # print(doc_rel[rankings[:10]])
+    rankings, scores = _top_k(doc_rel, top_k)
 
     if not silence:
         print('Finished ranking query\n')
 
-    return rankings
+    return rankings, scores
 
-def tf_idf_ranking(doc_info: pd.DataFrame, inv_idx: pd.DataFrame, vocab: pd.DataFrame, query: str, silence: bool = False) -> np.ndarray:
+def tf_idf_ranking(doc_info: pd.DataFrame, inv_idx: InvertedIndex, vocab: pd.DataFrame, query: str,
+                   top_k: int | None = None, silence: bool = False) -> tuple[np.ndarray, np.ndarray]:
     """Rank the query using a TF-IDF model
 
     :param doc_info:    DataFrame of document info
-    :param inv_idx:     DataFrame of the inverted index
+    :param inv_idx:     InvertedIndex of the postings
     :param vocab:       DataFrame of the vocab
     :param query:       Query to be ranked with the model
+    :param top_k:       Number of docs to return (all docs if None)
 
-    :returns:   The document indecies in decreasing order of ranking
+    :returns:
+        The document indecies in decreasing order of ranking
+        The relevance score of each of those documents
     """
 
     if not silence:
         print('Ranking query: "%s" ...' % query)
 
-    # set smoothing params
-    k: int = 10
-    b: float = 0.25
-
-    avg_doc_len = doc_info['len'].mean()
+    doc_lens = doc_info['len'].to_numpy()
+    avg_doc_len = doc_info.attrs['stats']['avg_doc_len']
 
     # init doc relivance with link rankings
     # doc_rel = np.zeros(NUM_DOCS)
-    doc_rel = np.array(doc_info['PageRank'] + 2*doc_info['hub_score'] + doc_info['auth_score'])
-    doc_rel /= 4
+    doc_rel = doc_info['prior'].to_numpy(dtype=np.float64)
 
     filtered = parse_text(query)
     for term in filtered:
         if term not in vocab.index:
             continue
 
-        term_data = inv_idx.loc[term]
-        doc_ids = set(term_data.index)  # docs containing term
-        for id in doc_ids:
-            doc_cnt = term_data.loc[id].iloc[0]
-            doc_len = doc_info.loc[id]['len']
+        doc_ids, doc_cnts = inv_idx.postings(term)  # docs containing term
 
-            numerator = (k + 1) * doc_cnt
-            divisor = doc_cnt + k * (1 - b + b * (doc_len / avg_doc_len))
+        idf = np.log((NUM_DOCS + 1) / len(doc_ids))
 
-            idf = np.log((NUM_DOCS + 1) / len(doc_ids))
+        doc_rel[doc_ids] += bm25_weights(doc_cnts, doc_lens[doc_ids], avg_doc_len, idf)
+
+    rankings, scores = _top_k(doc_rel, top_k)
+
+    if not silence:
+        print('Finished ranking query\n')
+
+    return rankings, scores
+
+def tf_idf_maxscore_ranking(doc_info: pd.DataFrame, inv_idx: InvertedIndex, vocab: pd.DataFrame, query: str,
+                            top_k: int = 10, silence: bool = False,
+                            prior_top: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """Rank the query using a TF-IDF model w/ MaxScore dynamic pruning
+
+    Returns the same top k docs as tf_idf_ranking, but only fully scans the
+    posting lists of the "essential" terms. The upper bound of each term is
+    built from the max_weight and avg_len columns of the vocab, so the long
+    posting lists of common (low idf) terms are only probed for the docs
+    that can still reach the top k. Only the docs in the posting lists are
+    touched, so queries whose essential terms are in a large share of the
+    docs are scored exhaustively instead.
+
+    :param doc_info:    DataFrame of document info
+    :param inv_idx:     InvertedIndex of the postings
+    :param vocab:       DataFrame of the vocab (w/ term bounds)
+    :param query:       Query to be ranked with the model
+    :param top_k:       Number of docs to return
+    :param prior_top:   Docids w/ the highest link prior in decreasing order (see load_prior_top)
 
-            doc_rel[id] += (numerator / divisor) * idf
+    :returns:
+        The document indecies in decreasing order of ranking
+        The relevance score of each of those documents
+    """
 
-    rankings = doc_rel.argsort()[::-1]
-    # print(doc_rel[rankings[:10]])
+    # fall back to exhaustive scoring for vocabs w/o the term bounds (or a top k past the top prior docs)
+    if 'max_weight' not in vocab.columns or prior_top is None or not 1 <= top_k <= len(prior_top):
+        return tf_idf_ranking(doc_info, inv_idx, vocab, query, top_k=top_k, silence=silence)
+
+    if not silence:
+        print('Ranking query: "%s" ...' % query)
+
+    doc_lens = doc_info['len'].to_numpy()
+    avg_doc_len = doc_info.attrs['stats']['avg_doc_len']
+
+    # link rankings are the score of docs w/o any query terms
+    prior = doc_info['prior'].to_numpy()
+
+    filtered = [ term for term in parse_text(query) if term in vocab.index ]
+    terms = list(dict.fromkeys(filtered))
+
+    # each posting list is read once, and probed for the docs being exactly scored
+    postings = { term: inv_idx.postings(term) for term in terms }
+    idfs = { term: np.log((NUM_DOCS + 1) / len(postings[term][0])) for term in terms }
+
+    # upper bound of each term's contribution to a doc's score
+    # (a longer avg doc len can only raise the stored max weight by that ratio)
+    rows = vocab.index.get_indexer(terms)
+    max_weights = vocab['max_weight'].to_numpy()[rows] * np.maximum(1.0, avg_doc_len / vocab['avg_len'].to_numpy()[rows])
+    bounds = { term: filtered.count(term) * max_weight * idfs[term] * (1 + _BOUND_EPS)
+               for term, max_weight in zip(terms, max_weights) }
+
+    def score(docids: np.ndarray) -> np.ndarray:
+        """Exactly score the (sorted) docs, adding terms in the same order as tf_idf_ranking"""
+
+        doc_rel = prior[docids].astype(np.float64)
+        for term in filtered:
+            found, doc_cnts = lookup_sorted(*postings[term], docids)
+            doc_rel[found] += bm25_weights(doc_cnts, doc_lens[docids[found]], avg_doc_len, idfs[term])
+
+        return doc_rel
+
+    terms.sort(key=bounds.get)
+
+    # merging long essential posting lists is slower than scoring every doc
+    # (the highest bound term is essential unless no doc outside of the seeds can reach the top k)
+    max_postings = len(prior) * MAXSCORE_MAX_POSTINGS
+    if len(terms) > 0 and len(postings[terms[-1]][0]) > max_postings:
+        return tf_idf_ranking(doc_info, inv_idx, vocab, query, top_k=top_k, silence=silence)
+
+    # the top link ranked docs, and the best docs of the highest bound term, give the starting threshold
+    seeds = np.sort(prior_top[:top_k])
+    prior_kth = prior[prior_top[top_k - 1]]
+
+    if len(terms) > 0:
+        doc_ids, doc_cnts = postings[terms[-1]]
+        top_weights = bm25_weights(doc_cnts, doc_lens[doc_ids], avg_doc_len, idfs[terms[-1]])
+
+        if len(doc_ids) > top_k:
+            doc_ids = doc_ids[np.argpartition(prior[doc_ids] + top_weights, -top_k)[-top_k:]]
+        seeds = np.union1d(seeds, doc_ids)
+
+    threshold = np.partition(score(seeds), -top_k)[-top_k] * (1 - _BOUND_EPS)
+
+    # the terms w/ the smallest bounds can't lift a doc into the top k on their own
+    cum_bound = 0.0
+    num_non_essential = 0
+    for term in terms:
+        if prior_kth + cum_bound + bounds[term] >= threshold:
+            break
+
+        cum_bound += bounds[term]
+        num_non_essential += 1
+
+    essential = terms[num_non_essential:]
+
+    if sum([ len(postings[term][0]) for term in essential ]) > max_postings:
+        return tf_idf_ranking(doc_info, inv_idx, vocab, query, top_k=top_k, silence=silence)
+
+    # any doc outside of the seeds needs an essential term to reach the top k
+    if len(essential) > 0:
+        docids = np.concatenate([ postings[term][0] for term in essential ])
+        weights = np.concatenate([ filtered.count(term) * (top_weights if term == terms[-1] else
+                                   bm25_weights(postings[term][1], doc_lens[postings[term][0]], avg_doc_len, idfs[term]))
+                                   for term in essential ])
+
+        # sum the partial scores of docs w/ more than one essential term
+        if len(essential) > 1:
+            order = np.argsort(docids, kind='stable')
+            docids, weights = docids[order], weights[order]
+
+            starts = np.flatnonzero(np.diff(docids, prepend=-1))
+            docids, weights = docids[starts], np.add.reduceat(weights, starts)
+
+        partial = prior[docids] + weights
+
+        # the docs w/ the best partial scores can raise the threshold
+        if len(docids) > top_k:
+            best = np.union1d(seeds, docids[np.argpartition(partial, -top_k)[-top_k:]])
+            threshold = max(threshold, np.partition(score(best), -top_k)[-top_k] * (1 - _BOUND_EPS))
+
+        # only fully score the docs that can still beat the threshold
+        seeds = np.union1d(seeds, docids[partial + cum_bound >= threshold])
+
+    rankings, scores = _top_k(score(seeds), top_k)
+    rankings = seeds[rankings]
 
     if not silence:
         print('Finished ranking query\n')
 
-    return rankings
+    return rankings, scores
+
+def rank_batch(doc_info: pd.DataFrame, inv_idx: InvertedIndex, vocab: pd.DataFrame, queries: list[str],
+               model: str, top_k: int = 10, silence: bool = False) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Rank many queries at once w/ a single sparse matmul
+
+    The postings of each distinct term are only fetched and weighted once,
+    no matter how many of the queries contain it. The scores can differ
+    from the single query models in the last few bits, as the terms of a
+    query are summed in a different order.
+
+    :param doc_info:    DataFrame of document info
+    :param inv_idx:     InvertedIndex of the postings
+    :param vocab:       DataFrame of the vocab
+    :param queries:     Queries to be ranked with the model
+    :param model:       'tf_idf' or 'prob'
+    :param top_k:       Number of docs to return per query
+
+    :returns: for each query,
+        The document indecies in decreasing order of ranking
+        The relevance score of each of those documents
+    """
+
+    if not silence:
+        print(f'Ranking {len(queries)} queries ...')
+
+    doc_lens = doc_info['len'].to_numpy()
+    stats = doc_info.attrs['stats']
+
+    num_docs = len(doc_info)
+    top_k = min(top_k, num_docs)
+
+    # build the (query x term) matrix of term counts
+    term_cols: dict[str, int] = {}
+    rows, cols = list(), list()
+    for row, query in enumerate(queries):
+        for term in parse_text(query):
+            if term not in vocab.index:
+                continue
+
+            rows.append(row)
+            cols.append(term_cols.setdefault(term, len(term_cols)))
+
+    Q = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(queries), len(term_cols)))
+
+    # build the (term x doc) matrix of weights from each term's postings
+    indptr = np.zeros(len(term_cols) + 1, dtype=np.int64)
+    doc_ids, weights = [np.empty(0, dtype=np.int32)], [np.empty(0)]
+    for term, col in term_cols.items():
+        term_ids, term_weights = _term_weights(inv_idx, vocab, term, model, doc_lens, stats)
+
+        doc_ids.append(term_ids)
+        weights.append(term_weights)
+        indptr[col + 1] = indptr[col] + len(term_ids)
+
+    W = sp.csr_matrix((np.concatenate(weights), np.concatenate(doc_ids), indptr), shape=(len(term_cols), num_docs))
+
+    doc_rels: sp.csr_matrix = (Q @ W).tocsr()
+
+    # docs w/o any of a query's terms only score their link prior
+    prior = doc_info['prior'].to_numpy()
+    prior_top = np.argpartition(prior, -top_k)[-top_k:]
+
+    is_prior_top = np.zeros(num_docs, dtype=bool)
+    is_prior_top[prior_top] = True
+
+    results: list[tuple[np.ndarray, np.ndarray]] = []
+    for row in range(len(queries)):
+        start, end = doc_rels.indptr[row], doc_rels.indptr[row + 1]
+
+        doc_ids = doc_rels.indices[start:end]
+        doc_rel = doc_rels.data[start:end] + prior[doc_ids]
+
+        # so only the top link ranked docs need to be added as candidates
+        prior_ids = prior_top[~np.isin(prior_top, doc_ids[is_prior_top[doc_ids]])]
+
+        doc_ids = np.concatenate((doc_ids, prior_ids))
+        doc_rel = np.concatenate((doc_rel, prior[prior_ids]))
+
+        rankings, scores = _top_k(doc_rel, top_k)
+        results.append((doc_ids[rankings], scores))
+
+    if not silence:
+        print('Finished ranking queries\n')
+
+    return results
+
+class WeightMatrix:
+    def __init__(self, terms: np.ndarray, matrix: sp.csc_matrix) -> None:
+        """Initialize a (doc x term) matrix of a model's weights
+
+        The column of the term terms[i] has the weight of the term in each
+        doc that contains it, so a query only adds up the columns of its
+        terms to the link prior.
+        """
+
+        self.terms: np.ndarray      = terms
+        self.matrix: sp.csc_matrix = matrix
+
+        self.term_ids: dict[str, int] = { str(term): i for i, term in enumerate(terms) }
+
+        return
+
+    @classmethod
+    def build(cls, doc_info: pd.DataFrame, inv_idx: InvertedIndex, vocab: pd.DataFrame, model: str) -> 'WeightMatrix':
+        """Weight every posting of an index w/ a model
+
+        The weights are calculated w/ the same operations as the single
+        query models, so the scores are the same to the last bit
+
+        :param model: 'tf_idf' or 'prob'
+        """
+
+        doc_lens = doc_info['len'].to_numpy()
+        stats = doc_info.attrs['stats']
+
+        doc_freqs = np.diff(inv_idx.offsets)
+
+        match model:
+            case 'tf_idf':
+                # the idf of each term is a scalar log, like in tf_idf_ranking
+                idfs = np.array([ np.log((NUM_DOCS + 1) / doc_freq) if doc_freq > 0 else 0.0
+                                  for doc_freq in doc_freqs.tolist() ])
+                weights = bm25_weights(inv_idx.freqs, doc_lens[inv_idx.docids], stats['avg_doc_len'],
+                                       np.repeat(idfs, doc_freqs))
+            case 'prob':
+                col_probs = vocab['frequency'].reindex(inv_idx.terms).to_numpy() / stats['col_len']
+                weights = jm_weights(inv_idx.freqs, doc_lens[inv_idx.docids], np.repeat(col_probs, doc_freqs))
+            case _:
+                raise ValueError(f'{model} is not a model')
+
+        matrix = sp.csc_matrix((weights, inv_idx.docids, inv_idx.offsets), shape=(len(doc_info), len(inv_idx.terms)))
+
+        return cls(inv_idx.terms, matrix)
+
+    @classmethod
+    def load(cls, index_dir: str, model: str, mmap_mode: str = 'r') -> 'WeightMatrix':
+        """Open a model's weights stored w/ save in the directory of a memory mapped index
+
+        :param index_dir: directory the InvertedIndex (and doc lens) were saved to
+        :param model: 'tf_idf' or 'prob'
+        """
+
+        arrays = { name: np.load(f'{index_dir}/{name}.npy', mmap_mode=mmap_mode)
+                   for name in ('terms', 'offsets', 'docids', 'doc_lens', f'{model}_weights') }
+
+        matrix = sp.csc_matrix((arrays[f'{model}_weights'], arrays['docids'], arrays['offsets']),
+                               shape=(len(arrays['doc_lens']), len(arrays['terms'])))
+
+        return cls(arrays['terms'], matrix)
+
+    def save(self, index_dir: str, model: str) -> None:
+        """Store the weights next to the (memory mapped) index they were built from"""
+
+        if not os.path.exists(index_dir):
+            os.mkdir(index_dir)
+
+        np.save(f'{index_dir}/{model}_weights.npy', self.matrix.data)
+
+        return
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.term_ids
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def postings(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        """Get the column of a term
+
+        :returns:
+            docids of the docs containing the term
+            weight of the term in each doc
+        """
+
+        term_id = self.term_ids[term]
+        start, end = self.matrix.indptr[term_id], self.matrix.indptr[term_id + 1]
+
+        return self.matrix.indices[start:end], self.matrix.data[start:end]
+
+def weighted_ranking(doc_info: pd.DataFrame, weights: WeightMatrix, vocab: pd.DataFrame, query: str,
+                     top_k: int | None = None, silence: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    """Rank the query w/ a model's precomputed weights
+
+    Returns the same rankings and scores as the single query model the
+    weights were built w/ (tf_idf_ranking or prob_ranking), as the columns
+    of the query terms are added to the link prior in the same order
+
+    :param doc_info:    DataFrame of document info
+    :param weights:     WeightMatrix of the model
+    :param vocab:       DataFrame of the vocab
+    :param query:       Query to be ranked with the model
+    :param top_k:       Number of docs to return (all docs if None)
+
+    :returns:
+        The document indecies in decreasing order of ranking
+        The relevance score of each of those documents
+    """
+
+    if not silence:
+        print('Ranking query: "%s" ...' % query)
+
+    doc_rel = doc_info['prior'].to_numpy(dtype=np.float64)
+
+    for term in parse_text(query):
+        if term not in vocab.index:
+            continue
+
+        doc_ids, term_weights = weights.postings(term)
+
+        doc_rel[doc_ids] += term_weights
+
+    rankings, scores = _top_k(doc_rel, top_k)
+
+    if not silence:
+        print('Finished ranking query\n')
+
+    return rankings, scores
+
+# models whose weights are precomputed in WeightMatrix
+WEIGHT_MODELS = ('tf_idf', 'prob')
+
+# the single query models by name
+RANKING_MODELS = {
+    'tf_idf':   tf_idf_ranking,
+    'prob':     prob_ranking
+}
@@ -0,0 +1,121 @@
+from lxml import etree
+
+# links to pages that aren't articles
+_SKIPPED_PREFIXES = ('./File:', './Help:', './Special:', './Template:', './Template_talk:', './Wikipedia:')
+
+# tags whose text isn't part of the text of a paragraph (as in BeautifulSoup's get_text)
+_HIDDEN_TAGS = frozenset(('script', 'style', 'template', 'rt', 'rp'))
+
+# tags whose whitespace is kept as is
+_PRESERVE_TAGS = frozenset(('pre', 'textarea'))
+
+_ASCII_SPACES = str.maketrans('', '', '\x20\x0a\x09\x0c\x0d')
+
+class _PageTarget:
+    def __init__(self) -> None:
+        """Initialize a parser target that collects the out links and paragraphs of a page
+
+        lxml calls it for each tag and string as it parses, so no tree is
+        built. The text of each <p> is the same as its text in a
+        BeautifulSoup tree (w/ the same parser).
+        """
+
+        self.out_links: dict[str, None] = dict()
+
+        # text of each <p> in document order, and the index and strings of the open ones
+        self.pars: list[str] = list()
+        self.open_pars: list[tuple[int, list[str]]] = list()
+
+        self.num_hidden = 0
+        self.num_preserve = 0
+
+        # consecutive strings not yet added to the open paragraphs
+        self.strings: list[str] = list()
+
+        return
+
+    def _end_strings(self) -> None:
+        """Add the strings since the last tag to the open paragraphs"""
+
+        if len(self.strings) == 0:
+            return
+
+        text = ''.join(self.strings)
+        self.strings.clear()
+
+        # collapse whitespace between tags like BeautifulSoup does
+        if self.num_preserve == 0 and len(text.translate(_ASCII_SPACES)) == 0:
+            text = '\n' if '\n' in text else ' '
+
+        for _, strings in self.open_pars:
+            strings.append(text)
+
+        return
+
+    def start(self, tag: str, attrib: dict) -> None:
+        self._end_strings()
+
+        if tag == 'a':
+            href = attrib.get('href', None)
+            if href is not None:
+                # remove any markers
+                link = href.split('#', 1)[0].split('?', 1)[0]
+
+                if link.startswith('./') and not link.startswith(_SKIPPED_PREFIXES):
+                    self.out_links[link[2:]] = None
+        elif tag == 'p':
+            self.open_pars.append((len(self.pars), list()))
+            self.pars.append('')
+
+        if tag in _HIDDEN_TAGS:
+            self.num_hidden += 1
+        if tag in _PRESERVE_TAGS:
+            self.num_preserve += 1
+
+        return
+
+    def end(self, tag: str) -> None:
+        self._end_strings()
+
+        if tag == 'p' and len(self.open_pars) > 0:
+            i, strings = self.open_pars.pop()
+            self.pars[i] = ''.join(strings)
+
+        if tag in _HIDDEN_TAGS:
+            self.num_hidden -= 1
+        if tag in _PRESERVE_TAGS:
+            self.num_preserve -= 1
+
+        return
+
+    def data(self, data: str) -> None:
+        if self.num_hidden == 0 and len(self.open_pars) > 0:
+            self.strings.append(data)
+
+        return
+
+    def comment(self, _: str) -> None:
+        self._end_strings()
+
+        return
+
+    def close(self) -> tuple[list[str], str]:
+        return list(self.out_links), ' '.join(self.pars)
+
+def extract_page(html: str) -> tuple[list[str], str]:
+    """Extract the out links and paragraph text of a page in one streaming pass
+
+    :returns:
+        slugs of the wiki pages the page links to (in the order they are first linked)
+        text of the page's paragraphs (joined by spaces)
+    """
+
+    if len(html) == 0:
+        return list(), ''
+
+    target = _PageTarget()
+
+    parser = etree.HTMLParser(target=target, recover=True, strip_cdata=False)
+    parser.feed(html)
+
+    return parser.close()
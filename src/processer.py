@@ -1,49 +1,215 @@
-from helper import DOC_INFO_FILE, INV_IDX_FILE, VOCAB_FILE, VOCAB_SIZE, load_doc_info, load_inv_idx
+from helper import DOC_INFO_FILE, INDEX_DIR, INV_IDX_FILE, VOCAB_FILE, VOCAB_SIZE, calc_prior_top, load_doc_info, load_vocab, measure, store_postings
+from inverted_index import InvertedIndex, Postings, sort_postings
+from models import WEIGHT_MODELS, WeightMatrix, bm25_weights
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import os
 
-def create_vocab() -> tuple[pd.DataFrame, pd.DataFrame]:
-    """Create the vocab
+### Declare constants
+BUILD_BATCH_SIZE = 2**18    # Postings read at a time
+COUNT_MERGE_SIZE = 2**21    # Num of term counts buffered before they are summed by term
 
+def _count_terms(file: str) -> pd.DataFrame:
+    """Count the frequency of each term in a stream over the postings, and pick the vocab
+
+    Each batch's postings are counted by term id (in the batch's term
+    dictionary), and the counts are summed by term every COUNT_MERGE_SIZE
+    terms, so only the counts are kept in memory
+
+    :returns: vocab (the VOCAB_SIZE most frequent terms, w/ ties in term order) as a DataFrame
+        (term -> frequency)
+    """
+
+    counts = pa.table({'term': pa.array([], pa.string()), 'frequency': pa.array([], pa.int64())})
+    pending: list[pa.Table] = list()
+    num_pending = 0
+
+    for batch in pq.ParquetFile(file, read_dictionary=['term']).iter_batches(BUILD_BATCH_SIZE, columns=['term', 'frequency']):
+        term_col = batch['term']
+        col_freqs = np.bincount(term_col.indices.to_numpy(), weights=batch['frequency'].to_numpy(),
+                                minlength=len(term_col.dictionary)).astype(np.int64)
+
+        has_postings = col_freqs > 0
+        pending.append(pa.table({'term': term_col.dictionary.filter(pa.array(has_postings)),
+                                 'frequency': col_freqs[has_postings]}))
+        num_pending += int(has_postings.sum())
+
+        if num_pending >= COUNT_MERGE_SIZE:
+            counts = _sum_counts([counts] + pending)
+            pending.clear()
+            num_pending = 0
+
+    counts = _sum_counts([counts] + pending)
+
+    top = pc.sort_indices(counts, sort_keys=[('frequency', 'descending'), ('term', 'ascending')])[:VOCAB_SIZE]
+    counts = counts.take(top)
+
+    return pd.DataFrame({'frequency': counts['frequency'].to_numpy()},
+                        index=pd.Index(counts['term'].to_numpy(zero_copy_only=False), name='term'))
+
+def _sum_counts(counts: list[pa.Table]) -> pa.Table:
+    counts = pa.concat_tables(counts).group_by('term').aggregate([('frequency', 'sum')])
+
+    return counts.rename_columns(['term', 'frequency'])
+
+def _update_term_bounds(max_weights: np.ndarray, term_ids: np.ndarray, freqs: np.ndarray, doc_lens: np.ndarray,
+                        avg_doc_len: float) -> None:
+    """Raise the max BM25 weight (w/o idf) of each term to its weight in the given postings"""
+
+    np.maximum.at(max_weights, term_ids, bm25_weights(freqs, doc_lens, avg_doc_len, 1.0))
+
+    return
+
+def _calc_term_bounds(postings: Postings, doc_info: pd.DataFrame) -> pd.DataFrame:
+    """Calculate the max BM25 weight (w/o idf) of each term
+
+    :returns: term bounds as a DataFrame
+        (term -> max_weight, avg_len)
+    """
+
+    terms, term_ids, docids, freqs = postings
+
+    avg_doc_len = doc_info['len'].mean()
+
+    max_weights = np.zeros(len(terms))
+    _update_term_bounds(max_weights, term_ids, freqs, doc_info['len'].reindex(docids).to_numpy(), avg_doc_len)
+
+    # only the terms w/ postings
+    has_postings = np.bincount(term_ids, minlength=len(terms)) > 0
+
+    bounds = pd.DataFrame({'max_weight': max_weights[has_postings]}, index=pd.Index(terms[has_postings], name='term'))
+    bounds['avg_len'] = avg_doc_len
+
+    return bounds
+
+def _reduce_postings(file: str, vocab: pd.DataFrame, doc_info: pd.DataFrame) -> tuple[Postings, pd.DataFrame]:
+    """Keep the postings of the vocab terms in a stream over the postings, and bound each term's weight
+
+    Only the kept postings are held (as int32 term ids, docids, and
+    frequencies), and they are only sorted if the stream wasn't sorted
+
+    :param doc_info: doc info, sorted by docid
     :returns:
-        inv idx
-        vocab
+        the reduced postings, sorted by (term, docid)
+        term bounds as a DataFrame (term -> max_weight, avg_len)
     """
 
-    print('Creating vocab ...')
+    # vocab term ids are the terms' ranks, so sorting by term id sorts by term
+    terms = np.sort(vocab.index.to_numpy(dtype=object))
+    value_set = pa.array(terms, pa.string())
+
+    doc_index = doc_info.index.to_numpy()
+    doc_lens = doc_info['len'].to_numpy()
+    avg_doc_len = doc_lens.mean()
+
+    max_weights = np.zeros(len(terms))
+    kept: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = list()
+
+    for batch in pq.ParquetFile(file, read_dictionary=['term']).iter_batches(BUILD_BATCH_SIZE):
+        docids = batch['docid'].to_numpy().astype(np.int32, copy=False)
+        freqs  = batch['frequency'].to_numpy().astype(np.int32, copy=False)
+
+        # the vocab term id of each term in the batch's dictionary (-1 if it isn't a vocab term)
+        term_col = batch['term']
+        dict_ids = pc.index_in(term_col.dictionary, value_set=value_set).fill_null(-1).to_numpy()
+        term_ids = dict_ids[term_col.indices.to_numpy()].astype(np.int32)
+
+        is_kept = term_ids >= 0
+        term_ids, docids, freqs = term_ids[is_kept], docids[is_kept], freqs[is_kept]
+
+        _update_term_bounds(max_weights, term_ids, freqs, doc_lens[np.searchsorted(doc_index, docids)], avg_doc_len)
+
+        kept.append((term_ids, docids, freqs))
+
+    postings = sort_postings((terms,
+                              np.concatenate([ term_ids for term_ids, _, _ in kept ] + [np.zeros(0, np.int32)]),
+                              np.concatenate([ docids for _, docids, _ in kept ] + [np.zeros(0, np.int32)]),
+                              np.concatenate([ freqs for _, _, freqs in kept ] + [np.zeros(0, np.int32)])))
+
+    # only the terms w/ postings
+    has_postings = np.bincount(postings[1], minlength=len(terms)) > 0
+
+    bounds = pd.DataFrame({'max_weight': max_weights[has_postings]}, index=pd.Index(terms[has_postings], name='term'))
+    bounds['avg_len'] = avg_doc_len
+
+    return postings, bounds
+
+def build_vocab_and_index(vocab: pd.DataFrame | None = None) -> dict[str, dict[str, float]]:
+    """Create the vocab, and reduce and sort the inverted index and doc info
+
+    The doc info is loaded and sorted once. The postings are streamed
+    through at most twice: once to count the terms (skipped if the vocab
+    was counted already), and once to keep the postings of the vocab terms
+    and bound their weights. The time and peak memory of each stage are
+    reported.
+
+    :param vocab: vocab already counted (e.g. while the crawl's postings were merged), or None to count it
+    :returns: the 'seconds' and 'peak' memory (bytes) of each stage
+    """
+
+    print('Building vocab and index ...')
     if os.path.exists(VOCAB_FILE):
         os.remove(VOCAB_FILE)
 
-    inv_idx = load_inv_idx()
+    stats: dict[str, dict[str, float]] = dict()
 
-    vocab = inv_idx.groupby('term').sum()
-    vocab = vocab.sort_values(by='frequency', ascending=False).head(VOCAB_SIZE)
+    with measure() as stats['sort doc info']:
+        doc_info = load_doc_info(silence=True)
+        if not doc_info.index.is_monotonic_increasing:
+            doc_info = doc_info.sort_index()
+            doc_info.to_parquet(DOC_INFO_FILE, engine='pyarrow')
 
-    vocab.to_parquet(VOCAB_FILE, engine='pyarrow')
+    if vocab is None:
+        with measure() as stats['count terms']:
+            vocab = _count_terms(INV_IDX_FILE)
 
-    print('Finished creating vocab\n')
+    with measure() as stats['reduce index']:
+        postings, bounds = _reduce_postings(INV_IDX_FILE, vocab, doc_info)
 
-    return inv_idx, vocab
+        # the index is streamed from the file being replaced
+        store_postings(postings, f'{INV_IDX_FILE}.tmp')
+        os.replace(f'{INV_IDX_FILE}.tmp', INV_IDX_FILE)
 
-def reduce_and_sort(inv_idx: pd.DataFrame, vocab: pd.DataFrame) -> None:
-    """Load, reduce, and store the inverted index and doc info"""
+        vocab[['frequency']].join(bounds).to_parquet(VOCAB_FILE, engine='pyarrow')
 
-    print('Reducing and sorting ...')
+    for stage, stage_stats in stats.items():
+        print(f'\t{stage}: {stage_stats["seconds"]:.2f} seconds, {stage_stats["peak"] / 1e6:.1f} MB peak')
 
-    terms = set(vocab.index)
+    print('Finished building vocab and index\n')
 
-    # reduce and sort inverted index
-    inv_idx = inv_idx.query('term in @terms').sort_index()
-    inv_idx.to_parquet(INV_IDX_FILE, engine='pyarrow')
+    return stats
+
+def store_vocab(vocab: pd.DataFrame, postings: Postings, doc_info: pd.DataFrame) -> None:
+    """Store the vocab w/ the per term score bounds used for pruning"""
+
+    vocab = vocab[['frequency']].join(_calc_term_bounds(postings, doc_info))
+    vocab.to_parquet(VOCAB_FILE, engine='pyarrow')
 
-    print('Finished reducing and sorting inv idx\n')
+    print('Finished adding term bounds to vocab\n')
+
+    return
+
+def store_index() -> None:
+    """Store the inverted index, doc lens, link prior (and its top docs), and model weights as memory mappable arrays"""
+
+    print('Storing memory mapped index ...')
+
+    inv_idx = InvertedIndex.from_parquet(INV_IDX_FILE)
+    inv_idx.save(INDEX_DIR)
 
-    # load, reduce, and sort doc labels
     doc_info = load_doc_info()
-    doc_info = doc_info.sort_index()
-    doc_info.to_parquet(DOC_INFO_FILE, engine='pyarrow')
+    np.save(f'{INDEX_DIR}/doc_lens.npy', doc_info['len'].to_numpy())
+    np.save(f'{INDEX_DIR}/prior.npy', doc_info['prior'].to_numpy())
+    np.save(f'{INDEX_DIR}/prior_top.npy', calc_prior_top(doc_info['prior'].to_numpy()))
+
+    vocab = load_vocab(silence=True)
+    for model in WEIGHT_MODELS:
+        WeightMatrix.build(doc_info, inv_idx, vocab, model).save(INDEX_DIR, model)
 
-    print('Finished sorting doc info\n')
+    print('Finished storing index\n')
 
     return
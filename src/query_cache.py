@@ -0,0 +1,121 @@
+import numpy as np
+import time
+
+from collections import OrderedDict
+
+CACHE_SIZE = 1024   # Max num of cached rankings
+CACHE_TTL  = 600    # Seconds before a cached ranking expires
+
+CacheKey = tuple[str, tuple[str, ...], int | None]
+
+class QueryCache:
+    def __init__(self, max_size: int = CACHE_SIZE, ttl: float | None = CACHE_TTL) -> None:
+        """Initialize a bounded LRU cache of query rankings
+
+        Entries are keyed on the model and the sorted, stemmed terms of the
+        query, so queries that parse to the same terms share an entry.
+        Feedback invalidates the entries that contain an updated term. Other
+        entries are kept (feedback also shifts the doc lens a little), so
+        the TTL bounds how stale they can get.
+
+        :param max_size: max num of entries before the least recently used is evicted
+        :param ttl: seconds an entry stays valid (never expires if None)
+        """
+
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self.entries: OrderedDict[CacheKey, tuple[float, tuple[np.ndarray, np.ndarray]]] = OrderedDict()
+        self.keys_by_term: dict[str, set[CacheKey]] = {}
+
+        self.hits          = 0
+        self.misses        = 0
+        self.evictions     = 0
+        self.invalidations = 0
+
+        return
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def _key(model: str, terms: list[str], top_k: int | None) -> CacheKey:
+        return (model, tuple(sorted(terms)), top_k)
+
+    def _remove(self, key: CacheKey) -> None:
+        """Remove an entry and its term references"""
+
+        del self.entries[key]
+
+        for term in set(key[1]):
+            keys = self.keys_by_term[term]
+            keys.discard(key)
+            if len(keys) == 0:
+                del self.keys_by_term[term]
+
+        return
+
+    def get(self, model: str, terms: list[str], top_k: int | None) -> tuple[np.ndarray, np.ndarray] | None:
+        """Get the cached rankings and scores of a query
+
+        :param terms: the parsed terms of the query
+        :returns: the cached result, or None on a miss
+        """
+
+        key = self._key(model, terms, top_k)
+
+        entry = self.entries.get(key, None)
+        if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+            self._remove(key)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+
+        return entry[1]
+
+    def put(self, model: str, terms: list[str], top_k: int | None, result: tuple[np.ndarray, np.ndarray]) -> None:
+        """Cache the rankings and scores of a query"""
+
+        key = self._key(model, terms, top_k)
+
+        if key in self.entries:
+            self._remove(key)
+
+        self.entries[key] = (time.monotonic(), result)
+        for term in set(key[1]):
+            self.keys_by_term.setdefault(term, set()).add(key)
+
+        while len(self.entries) > self.max_size:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+        return
+
+    def invalidate(self, terms: list[str]) -> None:
+        """Drop the entries of every query containing one of the terms"""
+
+        for term in set(terms):
+            for key in list(self.keys_by_term.get(term, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+        return
+
+    def stats(self) -> dict[str, int | float]:
+        """Get the counters used to size the cache"""
+
+        lookups = self.hits + self.misses
+
+        return {
+            'size':          len(self.entries),
+            'hits':          self.hits,
+            'misses':        self.misses,
+            'hit_rate':      self.hits / lookups if lookups > 0 else 0.0,
+            'evictions':     self.evictions,
+            'invalidations': self.invalidations
+        }
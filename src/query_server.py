@@ -0,0 +1,157 @@
+from inverted_index import InvertedIndex
+from models import RANKING_MODELS
+
+import numpy as np
+import pandas as pd
+
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+NUM_SERVER_WORKERS = 4  # Num processes to score queries
+CHUNK_SIZE         = 8  # Num queries sent to a worker at a time
+
+
+### Declare worker functions
+def _attach_array(name: str, dtype: str, shape: tuple[int, ...]) -> tuple[SharedMemory, np.ndarray]:
+    """Attach to an array in shared memory w/o copying it"""
+
+    shm = SharedMemory(name=name)
+
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+def _set_worker_data(inv_idx: InvertedIndex, doc_lens: np.ndarray, prior: np.ndarray,
+                     vocab: pd.DataFrame, stats: dict[str, float]) -> None:
+    """Set the data the worker ranks queries against"""
+
+    global _doc_info, _inv_idx, _vocab
+
+    _inv_idx = inv_idx
+
+    _doc_info = pd.DataFrame({'len': doc_lens, 'prior': prior}, copy=False)
+    _doc_info.attrs['stats'] = stats
+
+    _vocab = vocab
+
+    return
+
+def _init_worker(layout: dict[str, tuple[str, str, tuple[int, ...]]], terms: np.ndarray,
+                 vocab: pd.DataFrame, stats: dict[str, float]) -> None:
+    """Initialize the worker process w/ views of the shared index"""
+
+    global _shms
+
+    _shms = dict()
+    arrays: dict[str, np.ndarray] = dict()
+    for key, (name, dtype, shape) in layout.items():
+        _shms[key], arrays[key] = _attach_array(name, dtype, shape)
+
+    inv_idx = InvertedIndex(terms, arrays['offsets'], arrays['docids'], arrays['freqs'])
+
+    _set_worker_data(inv_idx, arrays['doc_lens'], arrays['prior'], vocab, stats)
+
+    return
+
+def _init_mmap_worker(index_dir: str, vocab: pd.DataFrame, stats: dict[str, float]) -> None:
+    """Initialize the worker process w/ the memory mapped index"""
+
+    inv_idx  = InvertedIndex.load(index_dir, mmap_mode='r')
+    doc_lens = np.load(f'{index_dir}/doc_lens.npy', mmap_mode='r')
+    prior    = np.load(f'{index_dir}/prior.npy', mmap_mode='r')
+
+    _set_worker_data(inv_idx, doc_lens, prior, vocab, stats)
+
+    return
+
+def _worker_task(query: str, model: str, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+    """The task of each worker process"""
+
+    rank_query = RANKING_MODELS[model]
+
+    return rank_query(_doc_info, _inv_idx, _vocab, query, top_k=top_k, silence=True)
+
+
+class QueryServer:
+    def __init__(self, doc_info: pd.DataFrame, inv_idx: InvertedIndex, vocab: pd.DataFrame,
+                 num_workers: int = NUM_SERVER_WORKERS, index_dir: str | None = None) -> None:
+        """Start the worker processes
+
+        The index arrays are copied into shared memory once, and each worker
+        scores queries against views of them. If index_dir is given, the
+        workers memory map the index stored there instead (sharing the page
+        cache). Either way the index is read only, so relevance feedback
+        isn't reflected in the server.
+        """
+
+        self.shms: list[SharedMemory] = []
+
+        stats = dict(doc_info.attrs['stats'])
+
+        if index_dir is not None:
+            self.pool = Pool(processes=num_workers, initializer=_init_mmap_worker,
+                             initargs=(index_dir, vocab, stats))
+
+            return
+
+        arrays = {
+            'offsets':  inv_idx.offsets,
+            'docids':   inv_idx.docids,
+            'freqs':    inv_idx.freqs,
+            'doc_lens': doc_info['len'].to_numpy(),
+            'prior':    doc_info['prior'].to_numpy()
+        }
+
+        layout: dict[str, tuple[str, str, tuple[int, ...]]] = {}
+        for key, array in arrays.items():
+            shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+            self.shms.append(shm)
+
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+
+            layout[key] = (shm.name, array.dtype.str, array.shape)
+
+        self.pool = Pool(processes=num_workers, initializer=_init_worker,
+                         initargs=(layout, inv_idx.terms, vocab, stats))
+
+        return
+
+    def __enter__(self) -> 'QueryServer':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def rank(self, query: str, model: str, top_k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        """Rank a query on one of the workers
+
+        :param model: 'tf_idf' or 'prob'
+        :returns:
+            The document indecies in decreasing order of ranking
+            The relevance score of each of those documents
+        """
+
+        return self.pool.apply(_worker_task, (query, model, top_k))
+
+    def rank_many(self, queries: list[str], model: str, top_k: int = 10) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Rank the queries in parallel across all of the workers
+
+        :param model: 'tf_idf' or 'prob'
+        :returns: the rankings and scores of each query (in order)
+        """
+
+        tasks = [ (query, model, top_k) for query in queries ]
+
+        return self.pool.starmap(_worker_task, tasks, chunksize=CHUNK_SIZE)
+
+    def close(self) -> None:
+        """Stop the workers and free the shared memory"""
+
+        self.pool.close()
+        self.pool.join()
+
+        for shm in self.shms:
+            shm.close()
+            shm.unlink()
+
+        self.shms.clear()
+
+        return
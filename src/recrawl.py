@@ -0,0 +1,203 @@
+from helper import ADJ_LIST_FILE, DOC_INFO_FILE, INV_IDX_FILE, load_adj_list, load_doc_info, load_inv_idx, load_vocab, postings_of
+from crawler_v2 import API_URL, NUM_WORKERS, parse_page
+from link_ranking import calc_link_ranks
+from processer import store_index, store_vocab
+from resolver import ACTION_API_URL, RESOLVE_BATCH_SIZE, MediaWikiBackend
+from response_cache import ResponseCache
+
+import numpy as np
+import pandas as pd
+import requests
+
+from collections import Counter
+from multiprocessing import Pool
+from tqdm import tqdm
+
+HTML_TIMEOUT = (1, 10)
+
+
+### Declare refetch workers
+def _init_refetcher(api_url: str, cache_file: str | None) -> None:
+    """Initialize the refetch worker process"""
+
+    global _api_url, _session, _cache
+    _api_url = api_url
+    _session = requests.Session()
+    _cache   = ResponseCache(cache_file) if cache_file is not None else None
+
+    return
+
+def _refetch_task(docid: int, slug: str) -> tuple[int, list[str], list[str]] | None:
+    """Refetch and parse the html of a page (refreshing its cached response)
+
+    :returns: docid, out links, and terms of the page, or None if the request failed
+    """
+
+    url = f'{_api_url}/html/{slug}'
+    if _cache is not None:
+        cached = _cache.fetch(_session, 'html', slug, url, HTML_TIMEOUT, refresh=True)
+        html = cached[0] if cached is not None else None
+    else:
+        try:
+            res = _session.get(url, timeout=HTML_TIMEOUT)
+            html = res.text if res.ok else None
+        except requests.RequestException:
+            html = None
+
+    if html is None:
+        return None
+
+    out_links, filtered = parse_page(html)
+
+    return docid, out_links, filtered
+
+def _refetch_args(args: tuple[int, str]) -> tuple[int, list[str], list[str]] | None:
+    """Unpack the args of a refetch task (for imap_unordered)"""
+
+    return _refetch_task(*args)
+
+
+### Declare patching
+def _find_changed(doc_info: pd.DataFrame, backend: MediaWikiBackend) -> dict[int, int]:
+    """Find the pages whose latest revision differs from the crawled one
+
+    Pages that were deleted (or whose query failed) are kept as is
+
+    :returns: the latest revision id of each changed page (docid -> revision)
+    """
+
+    # the slug of a page is the end of its canonical url
+    slugs = doc_info['url'].str.split('/wiki/', n=1).str[1]
+
+    stored = doc_info['revision'] if 'revision' in doc_info.columns else pd.Series(0, index=doc_info.index)
+
+    items = list(slugs.items())
+    changed: dict[int, int] = dict()
+    for i in tqdm(range(0, len(items), RESOLVE_BATCH_SIZE)):
+        batch = dict(items[i:i+RESOLVE_BATCH_SIZE])
+
+        latest = backend.revisions(list(batch.values()))
+        for docid, slug in batch.items():
+            revision = latest.get(slug, None)
+            if revision is not None and revision != stored[docid]:
+                changed[docid] = revision
+
+    return changed
+
+def _patch_postings(inv_idx: pd.DataFrame, vocab: pd.DataFrame,
+                    pages: dict[int, tuple[list[str], list[str]]]) -> pd.DataFrame:
+    """Replace the postings of the refetched pages
+
+    The vocab terms are kept (the index only has postings of vocab terms),
+    but their frequencies are updated in place
+
+    :param pages: out links and terms of each refetched page (by docid)
+    :returns: the patched inverted index
+    """
+
+    terms = set(vocab.index)
+
+    is_changed = inv_idx.index.get_level_values('docid').isin(list(pages.keys()))
+    old = inv_idx[is_changed]
+
+    rows = [ (term, docid, cnt) for docid, (_, filtered) in pages.items()
+             for term, cnt in Counter(filtered).items() if term in terms ]
+    new = pd.DataFrame(rows, columns=['term', 'docid', 'frequency'])
+    new = new.astype({'docid': np.int32, 'frequency': np.int32})
+
+    # the stored terms are a categorical of the vocab terms
+    new['term'] = pd.Categorical(new['term'], categories=inv_idx.index.levels[0].to_numpy(dtype=object))
+    new = new.set_index(['term', 'docid'])
+
+    delta = (new.groupby('term', observed=True)['frequency'].sum()
+             .sub(old.groupby('term', observed=True)['frequency'].sum(), fill_value=0))
+    vocab['frequency'] = (vocab['frequency'] + delta.reindex(vocab.index, fill_value=0)).astype(int)
+
+    return pd.concat([inv_idx[~is_changed], new]).sort_index()
+
+def start_recrawl(api_url: str = API_URL, action_api_url: str = ACTION_API_URL, cache_file: str | None = None) -> None:
+    """Refetch the pages that changed since the last build and patch the stored index
+
+    Docids are stable: each page's revision is checked in bulk action API
+    queries, and only pages w/ a new revision are refetched. Their postings,
+    doc lens, and out links are replaced, then only the affected steps are
+    rerun (the link ranks only if any out links changed). The vocab terms
+    are kept, run a full build to pick up new terms. Only the changed pages
+    are refetched and parsed, but the postings and the memory mapped index
+    are still rewritten in full (O(corpus) disk and CPU).
+
+    :param api_url: base url of the Wikipedia REST page API
+    :param action_api_url: url of the Wikipedia action API
+    :param cache_file: response cache to refresh w/ the refetched html (no cache if None)
+    """
+
+    doc_info = load_doc_info()
+    adj_list = load_adj_list()
+
+    print('Checking the revisions of each page ...')
+    session = requests.Session()
+    changed = _find_changed(doc_info, MediaWikiBackend(session, action_api_url))
+    session.close()
+
+    print(f'\t{len(changed)} of {len(doc_info)} pages have changed\n')
+
+    if len(changed) == 0:
+        print('Finished\n')
+        return
+
+    print(f'Refetching pages w/ {min(NUM_WORKERS, len(changed))} workers ...')
+    tasks = [ (docid, doc_info.loc[docid, 'url'].split('/wiki/', 1)[1]) for docid in changed ]
+
+    pages: dict[int, tuple[list[str], list[str]]] = dict()
+    with Pool(processes=min(NUM_WORKERS, len(tasks)), initializer=_init_refetcher, initargs=(api_url, cache_file)) as pool:
+        for page in tqdm(pool.imap_unordered(_refetch_args, tasks), total=len(changed)):
+            if page is None:
+                continue
+
+            docid, out_links, filtered = page
+            pages[docid] = (out_links, filtered)
+
+    print(f'\t{len(changed) - len(pages)} pages failed and will be checked again next time\n')
+
+    # patch the doc info
+    if 'revision' not in doc_info.columns:
+        doc_info['revision'] = 0
+
+    docids = list(pages.keys())
+    doc_info.loc[docids, 'len'] = [ len(filtered) for _, filtered in pages.values() ]
+    doc_info.loc[docids, 'revision'] = [ changed[docid] for docid in docids ]
+    doc_info.to_parquet(DOC_INFO_FILE, engine='pyarrow')
+
+    # patch the out links
+    out_links = adj_list['out_links'].to_dict()
+    links_changed = False
+    for docid, (links, _) in pages.items():
+        if set(out_links[docid]) != set(links):
+            out_links[docid] = links
+            links_changed = True
+
+    if links_changed:
+        adj_list['out_links'] = pd.Series(out_links)
+        adj_list.to_parquet(ADJ_LIST_FILE, engine='pyarrow')
+
+    # patch the postings
+    inv_idx = load_inv_idx()
+    vocab = load_vocab()
+
+    inv_idx = _patch_postings(inv_idx, vocab, pages)
+    inv_idx.to_parquet(INV_IDX_FILE, engine='pyarrow')
+
+    print('Finished patching pages\n')
+
+    # rerun the affected steps
+    if links_changed:
+        calc_link_ranks()
+
+    doc_info = load_doc_info()
+    store_vocab(vocab, postings_of(inv_idx), doc_info)
+
+    del inv_idx, vocab
+
+    store_index()
+
+    return
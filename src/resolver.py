@@ -0,0 +1,283 @@
+from response_cache import ResponseCache
+from seen_set import SeenSet, ShardedSeenSet
+
+import json
+import requests
+
+from typing import Literal
+from urllib.parse import unquote
+
+### Declare constants
+ACTION_API_URL = 'https://en.wikipedia.org/w/api.php'
+WIKI_URL       = 'https://en.wikipedia.org/wiki'
+
+RESOLVE_BATCH_SIZE = 50     # Max titles per bulk request (the action API limit)
+
+MAX_REDIRECTS = 8           # Max redirects followed for a title
+
+# canonical slug, title, and url of a page
+Resolved = tuple[str, str, str]
+
+# result of a slug whose request failed (None is a page that doesn't exist), so it can be retried
+Failed = Literal['failed']
+FAILED: Failed = 'failed'
+
+
+### Declare backends
+class MediaWikiBackend:
+    def __init__(self, session: requests.Session, api_url: str = ACTION_API_URL) -> None:
+        """Resolve slugs w/ one action API query (titles + redirects) per batch"""
+
+        self.session = session
+        self.api_url = api_url
+
+        return
+
+    def _query(self, slugs: list[str]) -> dict[str, dict | Failed | None]:
+        """Query the info of the canonical page of each slug
+
+        :param slugs: at most RESOLVE_BATCH_SIZE slugs
+        :returns: the page info of each slug, None if it doesn't exist, or FAILED if the request failed
+        """
+
+        titles = { slug: unquote(slug).replace('_', ' ') for slug in slugs }
+
+        params = {
+            'action':           'query',
+            'format':           'json',
+            'formatversion':    2,
+            'redirects':        1,
+            'prop':             'info',
+            'inprop':           'url',
+            'titles':           '|'.join(set(titles.values()))
+        }
+
+        try:
+            res = self.session.get(self.api_url, params=params, timeout=(1,3))
+            query = res.json()['query'] if res.ok else None
+        except (requests.RequestException, ValueError, KeyError):
+            query = None
+
+        # an error response (e.g. maxlag) has no query
+        if query is None:
+            return { slug: FAILED for slug in slugs }
+
+        normalized = { entry['from']: entry['to'] for entry in query.get('normalized', list()) }
+        redirects  = { entry['from']: entry['to'] for entry in query.get('redirects', list()) }
+        pages      = { page['title']: page for page in query.get('pages', list()) }
+
+        infos: dict[str, dict | Failed | None] = dict()
+        for slug, title in titles.items():
+            title = normalized.get(title, title)
+            for _ in range(MAX_REDIRECTS):
+                if title not in redirects:
+                    break
+                title = redirects[title]
+
+            page = pages.get(title, None)
+            if page is None or page.get('missing', False) or page.get('invalid', False):
+                infos[slug] = None
+                continue
+
+            infos[slug] = page
+
+        return infos
+
+    def resolve(self, slugs: list[str]) -> dict[str, Resolved | Failed | None]:
+        """Resolve a batch of slugs to their canonical pages
+
+        :param slugs: at most RESOLVE_BATCH_SIZE slugs
+        :returns: the canonical page of each slug, None if it doesn't exist, or FAILED if the request failed
+        """
+
+        resolved: dict[str, Resolved | Failed | None] = dict()
+        for slug, page in self._query(slugs).items():
+            if page is None or page == FAILED:
+                resolved[slug] = page
+                continue
+
+            resolved[slug] = (page['title'].replace(' ', '_'), page['title'], page['canonicalurl'])
+
+        return resolved
+
+    def revisions(self, slugs: list[str]) -> dict[str, int | None]:
+        """Get the latest revision id of the canonical page of each slug
+
+        :param slugs: at most RESOLVE_BATCH_SIZE slugs
+        :returns: the revision id of each slug, or None if it doesn't exist or the request failed
+        """
+
+        return { slug: None if page is None or page == FAILED else page.get('lastrevid', None)
+                 for slug, page in self._query(slugs).items() }
+
+class SummaryBackend:
+    def __init__(self, session: requests.Session, api_url: str) -> None:
+        """Resolve slugs w/ one REST summary request per slug"""
+
+        self.session = session
+        self.api_url = api_url
+
+        return
+
+    def resolve(self, slugs: list[str]) -> dict[str, Resolved | Failed | None]:
+        """Resolve a batch of slugs to their canonical pages
+
+        :returns: the canonical page of each slug, None if it doesn't exist, or FAILED if the request failed
+        """
+
+        resolved: dict[str, Resolved | Failed | None] = dict()
+        for slug in slugs:
+            try:
+                res = self.session.get(f'{self.api_url}/summary/{slug}', timeout=(1,3))
+                summary = res.json() if res.ok else None
+            except (requests.RequestException, ValueError):
+                resolved[slug] = FAILED
+                continue
+
+            if summary is None:
+                resolved[slug] = None if res.status_code == 404 else FAILED
+                continue
+
+            if summary.get('titles', None) is None or summary['titles'].get('canonical', None) is None:
+                resolved[slug] = None
+                continue
+
+            resolved[slug] = (summary['titles']['canonical'], summary['title'], summary['content_urls']['desktop']['page'])
+
+        return resolved
+
+class FakeBackend:
+    def __init__(self, canonical: dict[str, str], num_failures: int = 0) -> None:
+        """Resolve slugs from a local map (for tests)
+
+        :param canonical: slug -> canonical slug (missing pages are left out)
+        :param num_failures: num of requests that fail before any succeeds
+        """
+
+        self.canonical = canonical
+        self.num_failures = num_failures
+
+        self.num_requests = 0
+        self.num_slugs    = 0
+
+        return
+
+    def resolve(self, slugs: list[str]) -> dict[str, Resolved | Failed | None]:
+        """Resolve a batch of slugs to their canonical pages
+
+        :returns: the canonical page of each slug, None if it doesn't exist, or FAILED while failing requests
+        """
+
+        self.num_requests += 1
+        self.num_slugs    += len(slugs)
+
+        if self.num_requests <= self.num_failures:
+            return { slug: FAILED for slug in slugs }
+
+        resolved: dict[str, Resolved | Failed | None] = dict()
+        for slug in slugs:
+            canonical = self.canonical.get(slug, None)
+            if canonical is None:
+                resolved[slug] = None
+                continue
+
+            resolved[slug] = (canonical, canonical.replace('_', ' '), f'{WIKI_URL}/{canonical}')
+
+        return resolved
+
+
+class CachedBackend:
+    def __init__(self, backend: MediaWikiBackend | SummaryBackend | FakeBackend, cache: ResponseCache) -> None:
+        """Resolve slugs from a response cache, only sending the misses to the backend
+
+        Only found pages are cached. While the cache is offline, the misses
+        are left unresolved.
+        """
+
+        self.backend = backend
+        self.cache = cache
+
+        return
+
+    def resolve(self, slugs: list[str]) -> dict[str, Resolved | Failed | None]:
+        """Resolve a batch of slugs to their canonical pages
+
+        :returns: the canonical page of each slug, None if it doesn't exist (or isn't cached while offline), or FAILED if the request failed
+        """
+
+        resolved: dict[str, Resolved | Failed | None] = dict()
+        misses: list[str] = list()
+        for slug in slugs:
+            cached = self.cache.get('resolved', slug)
+            if cached is None:
+                misses.append(slug)
+                continue
+
+            resolved[slug] = tuple(json.loads(cached[0]))
+
+        if len(misses) == 0:
+            return resolved
+
+        if self.cache.offline:
+            resolved.update({ slug: None for slug in misses })
+            return resolved
+
+        for slug, page in self.backend.resolve(misses).items():
+            resolved[slug] = page
+            if page is not None and page != FAILED:
+                self.cache.put('resolved', slug, json.dumps(page))
+
+        return resolved
+
+
+### Declare bookkeeping
+def apply_resolutions(resolved: dict[str, Resolved | Failed | None], visited: SeenSet | ShardedSeenSet,
+                      aliased: SeenSet | ShardedSeenSet, omitted: SeenSet | ShardedSeenSet,
+                      aliases: dict[str, str]) -> tuple[list[Resolved], list[str]]:
+    """Fan the resolved batch back out to the seen sets
+
+    The slugs of the batch must already be in visited. Aliases are recorded
+    (slug -> canonical) and only canonical pages that haven't been visited
+    are kept. Only pages that don't exist are omitted, the slugs whose
+    request failed leave visited so they can be resolved again.
+
+    W/ ShardedSeenSets, many threads can apply their batches at once (a
+    slug is added to its new set before it leaves visited, and only the
+    first batch to add a canonical page keeps it).
+
+    :returns:
+        the canonical pages to crawl
+        the slugs whose request failed
+    """
+
+    # the aliases go last, so a canonical page in the same batch has left visited if it was omitted (or failed)
+    order = sorted(resolved.items(), key=lambda item: item[1] is not None and item[1] != FAILED and item[1][0] != item[0])
+
+    pages: list[Resolved] = list()
+    failed: list[str] = list()
+    for slug, page in order:
+        if page == FAILED:
+            failed.append(slug)
+            visited.discard(slug)
+            continue
+
+        if page is None:
+            omitted.add(slug)
+            visited.discard(slug)
+            continue
+
+        new_slug = page[0]
+        if new_slug == slug:
+            pages.append(page)
+            continue
+
+        aliases[slug] = new_slug
+        aliased.add(slug)
+        visited.discard(slug)
+
+        if not visited.add(new_slug):
+            continue
+
+        pages.append(page)
+
+    return pages, failed
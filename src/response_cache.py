@@ -0,0 +1,142 @@
+import hashlib
+import requests
+import sqlite3
+import time
+import zlib
+
+COMPRESS_LEVEL = 6      # zlib level of the stored bodies
+
+LOCK_TIMEOUT = 30       # Seconds to wait on another process writing to the cache
+
+# body, etag, and revision of a cached response
+Cached = tuple[str, str | None, int | None]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest  TEXT PRIMARY KEY,
+    body    BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS responses (
+    kind        TEXT NOT NULL,
+    slug        TEXT NOT NULL,
+    digest      TEXT NOT NULL,
+    etag        TEXT,
+    revision    INTEGER,
+    fetched     REAL NOT NULL,
+    PRIMARY KEY (kind, slug)
+);
+"""
+
+def revision_of(etag: str | None) -> int | None:
+    """Get the revision id from the ETag of a REST API response
+
+    The ETags look like "<revision>/<render id>" (or W/"<revision>/...")
+
+    :returns: the revision id, or None if the ETag doesn't have one
+    """
+
+    if etag is None:
+        return None
+
+    revision = etag.removeprefix('W/').strip('"').split('/', 1)[0]
+
+    return int(revision) if revision.isdigit() else None
+
+class ResponseCache:
+    def __init__(self, cache_file: str, offline: bool = False) -> None:
+        """Open (or create) an on-disk cache of responses keyed by (kind, slug)
+
+        Bodies are stored zlib compressed and content addressed by their
+        sha1, so pages w/ identical responses share a blob. Each process (or
+        thread) should open its own cache, SQLite handles the locking.
+
+        :param offline: never go over the network, a miss is treated like a failed request
+        """
+
+        self.cache_file = cache_file
+        self.offline = offline
+
+        self.conn = sqlite3.connect(cache_file, timeout=LOCK_TIMEOUT, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+        self.hits   = 0
+        self.misses = 0
+
+        return
+
+    def get(self, kind: str, slug: str) -> Cached | None:
+        """Get a cached response
+
+        :param kind: what the response is (e.g. 'html', 'summary')
+        :returns: the body, etag, and revision, or None if it isn't cached
+        """
+
+        row = self.conn.execute('SELECT b.body, r.etag, r.revision FROM responses r JOIN blobs b USING (digest) '
+                                'WHERE r.kind = ? AND r.slug = ?', (kind, slug)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        return zlib.decompress(row[0]).decode('utf-8'), row[1], row[2]
+
+    def put(self, kind: str, slug: str, body: str, etag: str | None = None, revision: int | None = None) -> None:
+        """Store a response, replacing any older one of the slug"""
+
+        data   = body.encode('utf-8')
+        digest = hashlib.sha1(data).hexdigest()
+
+        if revision is None:
+            revision = revision_of(etag)
+
+        with self.conn:
+            self.conn.execute('INSERT OR IGNORE INTO blobs VALUES (?, ?)',
+                              (digest, zlib.compress(data, COMPRESS_LEVEL)))
+            self.conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                              (kind, slug, digest, etag, revision, time.time()))
+
+        return
+
+    def slugs(self, kind: str) -> list[str]:
+        """Get the slugs of every cached response of a kind"""
+
+        return [ row[0] for row in self.conn.execute('SELECT slug FROM responses WHERE kind = ? ORDER BY slug', (kind,)) ]
+
+    def fetch(self, session: requests.Session, kind: str, slug: str, url: str,
+              timeout: tuple[float, float] | None = None, refresh: bool = False) -> Cached | None:
+        """Get a response from the cache, or fetch and cache it on a miss
+
+        :param refresh: always fetch the response (unless offline) and replace the cached one
+        :returns: the body, etag, and revision, or None if the request failed (or it isn't cached while offline)
+        """
+
+        cached = self.get(kind, slug) if not refresh or self.offline else None
+        if cached is not None:
+            return cached
+
+        if self.offline:
+            return None
+
+        try:
+            res = session.get(url, timeout=timeout)
+        except requests.RequestException:
+            return None
+
+        if not res.ok:
+            return None
+
+        etag = res.headers.get('ETag', None)
+        self.put(kind, slug, res.text, etag)
+
+        return res.text, etag, revision_of(etag)
+
+    def close(self) -> None:
+        """Close the cache"""
+
+        self.conn.close()
+
+        return
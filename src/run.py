@@ -1,10 +1,14 @@
 import re
-from helper import load_data, parse_text
-from models import prob_ranking, tf_idf_ranking
+from helper import INDEX_DIR, calc_doc_stats, load_data, load_prior_top, parse_text
+from inverted_index import InvertedIndex
+from models import WeightMatrix, bm25_weights, prob_ranking, tf_idf_maxscore_ranking, weighted_ranking
+from query_cache import QueryCache
 
 import numpy as np
 import pandas as pd
 
+from functools import partial
+
 TOP_NUM_TO_PRINT = 10
 
 def _print_rankings(doc_info: pd.DataFrame, rankings: np.ndarray) -> None:
@@ -24,22 +28,39 @@ def _print_rankings(doc_info: pd.DataFrame, rankings: np.ndarray) -> None:
 
     return
 
-def _update_with_feedback(doc_info: pd.DataFrame, inv_idx: pd.DataFrame, vocab: pd.DataFrame, query: str, docids: list[int]) -> None:
-    """Updates the documents with the provided feedback"""
+def _update_with_feedback(doc_info: pd.DataFrame, inv_idx: InvertedIndex, vocab: pd.DataFrame, query: str, docids: list[int],
+                          cache: QueryCache | None = None) -> None:
+    """Updates the documents with the provided feedback
+
+    Cached rankings of queries w/ any of the updated terms are invalidated
+    """
 
     print('Updating with feedback...')
 
-    filtered = parse_text(query)
+    filtered = [ term for term in parse_text(query) if term in vocab.index ]
     for term in filtered:
-        if term not in vocab.index:
-            continue
-
         psuedo_term_cnt = 2
+        inv_idx.add_postings(term, docids, psuedo_term_cnt)
+        if cache is not None:
+            cache.invalidate([term])
+
         for id in docids:
-            inv_idx.loc[term, id] += psuedo_term_cnt
             doc_info.loc[id, 'len'] += psuedo_term_cnt
 
-        vocab.loc[term] += psuedo_term_cnt * len(docids)
+        vocab.loc[term, 'frequency'] += psuedo_term_cnt * len(docids)
+
+    doc_info.attrs['stats'] = calc_doc_stats(doc_info)
+
+    # keep the score bounds valid for the updated postings (once every doc len is updated)
+    if 'max_weight' in vocab.columns:
+        doc_lens = doc_info['len'].to_numpy()
+        avg_doc_len = doc_info.attrs['stats']['avg_doc_len']
+
+        for term in set(filtered):
+            doc_ids, doc_cnts = inv_idx.postings(term)
+
+            vocab.loc[term, 'max_weight'] = bm25_weights(doc_cnts, doc_lens[doc_ids], avg_doc_len, 1.0).max()
+            vocab.loc[term, 'avg_len'] = avg_doc_len
 
     print('Finished\n')
 
@@ -47,7 +68,7 @@ def _update_with_feedback(doc_info: pd.DataFrame, inv_idx: pd.DataFrame, vocab:
 
 def main() -> None:
     # have user choose model
-    options = ('0: TF-IDF', '1: Probabilistic')
+    options = ('0: TF-IDF', '1: Probabilistic', '2: TF-IDF w/ precomputed weights', '3: Probabilistic w/ precomputed weights')
     txt = 'Which model would you like to use?'
     for option in options:
         txt += f'\n\t{option}'
@@ -61,13 +82,21 @@ def main() -> None:
         print(f'{model} was not an integer.\nPlease select one of the above options.')
         exit()
 
+    # models w/ precomputed weights rank w/ a WeightMatrix instead of the postings
+    weights_model = None
     match model:
         case 0:
             print('You chose a TF-IDF model\n')
-            rank_query = tf_idf_ranking
+            rank_query = tf_idf_maxscore_ranking
         case 1:
             print('You chose a probabilistic model\n')
             rank_query = prob_ranking
+        case 2:
+            print('You chose a TF-IDF model w/ precomputed weights\n')
+            rank_query, weights_model = weighted_ranking, 'tf_idf'
+        case 3:
+            print('You chose a probabilistic model w/ precomputed weights\n')
+            rank_query, weights_model = weighted_ranking, 'prob'
         case _:
             print(f'{model} was not an opiton.\nPlease select one of the above options.')
             exit()
@@ -75,6 +104,19 @@ def main() -> None:
     # load data
     doc_info, inv_idx, vocab = load_data()
 
+    if weights_model is not None:
+        rank_index = WeightMatrix.load(INDEX_DIR, weights_model)
+        model_name = f'{weights_model}_weights'
+    else:
+        rank_index = inv_idx
+        model_name = rank_query.__name__
+
+    # MaxScore starts from the docs w/ the highest link prior (which feedback doesn't change)
+    if rank_query is tf_idf_maxscore_ranking:
+        rank_query = partial(tf_idf_maxscore_ranking, prior_top=load_prior_top(doc_info))
+
+    cache = QueryCache()
+
     # cli input for query
     while True:
         query = input('\nPlease enter in a query (or "exit" to exit):\n').strip()
@@ -83,9 +125,20 @@ def main() -> None:
 
         print()
 
-        rankings = rank_query(doc_info, inv_idx, vocab, query)
+        # reuse the rankings of queries w/ the same terms
+        terms = parse_text(query)
+        result = cache.get(model_name, terms, TOP_NUM_TO_PRINT)
+        if result is None:
+            result = rank_query(doc_info, rank_index, vocab, query, top_k=TOP_NUM_TO_PRINT)
+            cache.put(model_name, terms, TOP_NUM_TO_PRINT, result)
+
+        rankings, _ = result
         _print_rankings(doc_info, rankings)
 
+        # the precomputed weights can't be updated w/ feedback
+        if weights_model is not None:
+            continue
+
         rel_docs = input('\nWhich docs were relevant?\nPlease enter the numbers seperated with spaces and/or commas:\n').strip()
         rel_docs = re.sub(r',|\s+', ' ', rel_docs)
         rel_docs = rel_docs.split()
@@ -110,7 +163,11 @@ def main() -> None:
             docids.append(rankings[idx])
 
         if not failed and len(docids) > 0:
-            _update_with_feedback(doc_info, inv_idx, vocab, query, docids)
+            _update_with_feedback(doc_info, inv_idx, vocab, query, docids, cache)
+
+    stats = cache.stats()
+    print(f'Query cache: {stats["hits"]} hits, {stats["misses"]} misses ({stats["hit_rate"]:.0%} hit rate), '
+          f'{stats["evictions"]} evictions, {stats["invalidations"]} invalidations\n')
 
     print('Exiting ...')
 
@@ -0,0 +1,320 @@
+import hashlib
+import math
+import numpy as np
+
+from multiprocessing import Lock as ProcessLock, RawArray
+from threading import Lock
+from typing import Iterable
+
+MAX_LOAD = 0.5          # Max fraction of used slots (incl. deleted) before a SeenSet grows
+
+NUM_SEEN_SHARDS = 64    # Num independently locked shards of a ShardedSeenSet
+
+BLOOM_NUM_HASHES = 10   # Num bits set per slug in a BloomFilter
+
+# reserved keys of a SeenSet slot
+_EMPTY   = 0
+_DELETED = 1
+
+def slug_hash(slug: str) -> int:
+    """Hash a slug to 64 bits (the same in every process, unlike hash)
+
+    :returns: the hash, never one of the reserved keys of a SeenSet
+    """
+
+    key = int.from_bytes(hashlib.blake2b(slug.encode('utf-8'), digest_size=8).digest(), 'little')
+
+    return key + 2 if key <= _DELETED else key
+
+def slug_hashes(slugs: Iterable[str]) -> np.ndarray:
+    """Hash slugs to 64 bits
+
+    :returns: the hashes as uint64
+    """
+
+    return np.fromiter(( slug_hash(slug) for slug in slugs ), dtype=np.uint64)
+
+class SeenSet:
+    def __init__(self, capacity: int = 1024) -> None:
+        """Initialize an empty set of slugs stored as 64 bit hashes
+
+        An open addressing hash table (w/ linear probing) of the hashes, so
+        each slug takes ~16 bytes instead of a str and a set entry. It has
+        the add, discard, and in of a set[str], but two slugs w/ the same
+        hash are the same slug (~1e-8 chance of any collision at 1e6 slugs).
+
+        :param capacity: num of slugs to make room for
+        """
+
+        num_slots = 1 << max(4, math.ceil(math.log2(capacity / MAX_LOAD)))
+
+        self.table = np.zeros(num_slots, dtype=np.uint64)
+        self.mask = num_slots - 1
+
+        self.size = 0
+        self.used = 0
+
+        return
+
+    def _find(self, key: int) -> tuple[int, bool]:
+        """Find the slot of a key
+
+        :returns: the slot of the key (or the first free slot if it isn't in the set) and if it was found
+        """
+
+        free = -1
+        i = key & self.mask
+        while True:
+            slot = int(self.table[i])
+            if slot == key:
+                return i, True
+
+            if slot == _EMPTY:
+                return (i if free < 0 else free), False
+
+            if slot == _DELETED and free < 0:
+                free = i
+
+            i = (i + 1) & self.mask
+
+    def _grow(self) -> None:
+        """Rehash the live keys into a table w/ twice the slots (dropping deleted ones)"""
+
+        keys = self.hashes()
+
+        self.table = np.zeros(2 * len(self.table), dtype=np.uint64)
+        self.mask = len(self.table) - 1
+        self.used = 0
+        self.size = 0
+
+        for key in keys.tolist():
+            self._insert(key)
+
+        return
+
+    def _insert(self, key: int) -> bool:
+        i, found = self._find(key)
+        if found:
+            return False
+
+        if int(self.table[i]) == _EMPTY:
+            self.used += 1
+
+        self.table[i] = key
+        self.size += 1
+
+        return True
+
+    def add(self, slug: str) -> bool:
+        """Add a slug
+
+        :returns: if the slug wasn't in the set yet
+        """
+
+        return self._add(slug_hash(slug))
+
+    def _add(self, key: int) -> bool:
+        if self.used + 1 > MAX_LOAD * len(self.table):
+            self._grow()
+
+        return self._insert(key)
+
+    def update(self, slugs: Iterable[str]) -> None:
+        for slug in slugs:
+            self.add(slug)
+
+        return
+
+    def discard(self, slug: str) -> None:
+        self._discard(slug_hash(slug))
+
+        return
+
+    def _discard(self, key: int) -> None:
+        i, found = self._find(key)
+        if not found:
+            return
+
+        self.table[i] = _DELETED
+        self.size -= 1
+
+        return
+
+    def __contains__(self, slug: str) -> bool:
+        return self._find(slug_hash(slug))[1]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def hashes(self) -> np.ndarray:
+        """Get the hashes of the slugs in the set"""
+
+        return self.table[self.table > _DELETED]
+
+    def copy(self) -> 'SeenSet':
+        seen = SeenSet()
+        seen.table = self.table.copy()
+        seen.mask = self.mask
+        seen.size = self.size
+        seen.used = self.used
+
+        return seen
+
+class ShardedSeenSet:
+    def __init__(self, num_shards: int = NUM_SEEN_SHARDS) -> None:
+        """Initialize an empty SeenSet split into shards by hash, each w/ its own lock
+
+        Safe to use from many threads at once, and threads only wait on each
+        other when they touch the same shard. add is a test and set, so only
+        one of the threads adding the same slug gets True.
+
+        :param num_shards: num of shards (a power of 2)
+        """
+
+        self.shards = [ SeenSet() for _ in range(num_shards) ]
+        self.locks  = [ Lock() for _ in range(num_shards) ]
+
+        return
+
+    def _shard(self, slug: str) -> tuple[int, int]:
+        """Find the shard of a slug (by the high bits of its hash, the low ones pick its slot)
+
+        :returns: the hash and the shard index
+        """
+
+        key = slug_hash(slug)
+
+        return key, (key >> 48) & (len(self.shards) - 1)
+
+    def add(self, slug: str) -> bool:
+        """Add a slug
+
+        :returns: if the slug wasn't in the set yet
+        """
+
+        key, i = self._shard(slug)
+        with self.locks[i]:
+            return self.shards[i]._add(key)
+
+    def update(self, slugs: Iterable[str]) -> None:
+        for slug in slugs:
+            self.add(slug)
+
+        return
+
+    def discard(self, slug: str) -> None:
+        key, i = self._shard(slug)
+        with self.locks[i]:
+            self.shards[i]._discard(key)
+
+        return
+
+    def __contains__(self, slug: str) -> bool:
+        key, i = self._shard(slug)
+        with self.locks[i]:
+            return self.shards[i]._find(key)[1]
+
+    def __len__(self) -> int:
+        return sum( len(seen) for seen in self.shards )
+
+    def hashes(self) -> np.ndarray:
+        """Get the hashes of the slugs in the set"""
+
+        return np.concatenate([ seen.hashes() for seen in self.copy().shards ])
+
+    def copy(self) -> 'ShardedSeenSet':
+        """Copy the set (each shard is copied w/ its lock held)"""
+
+        seen = ShardedSeenSet(len(self.shards))
+        for i, lock in enumerate(self.locks):
+            with lock:
+                seen.shards[i] = self.shards[i].copy()
+
+        return seen
+
+    def __getstate__(self) -> dict:
+        return {'shards': self.copy().shards}
+
+    def __setstate__(self, state: dict) -> None:
+        self.shards = state['shards']
+        self.locks  = [ Lock() for _ in range(len(self.shards)) ]
+
+        return
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        """Initialize an empty Bloom filter of slugs in shared memory
+
+        Pass it to other processes (e.g. in the initargs of a Pool) and they
+        see the slugs added to it. Writes hold a lock shared by every process
+        (setting bits is a read-modify-write of each byte), reads don't, so a
+        slug being added may be missed by a reader, but a slug is never
+        missed once it has been added.
+
+        :param capacity: num of slugs it is sized for
+        :param error_rate: chance of a slug that wasn't added being found at capacity
+        """
+
+        num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2)**2)
+        num_bytes = (num_bits + 7) // 8
+
+        self.bits = RawArray('B', num_bytes)
+        self.num_bits = 8 * num_bytes
+
+        self.lock = ProcessLock()
+
+        return
+
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        """The bit positions of each hash (w/ double hashing)
+
+        :returns: (num hashes, BLOOM_NUM_HASHES) positions
+        """
+
+        hashes = hashes.astype(np.uint64, copy=False)
+
+        h1 = hashes & np.uint64(0xffffffff)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+
+        i = np.arange(BLOOM_NUM_HASHES, dtype=np.uint64)
+
+        positions = (h1[:, None] + i[None, :] * h2[:, None]) % np.uint64(self.num_bits)
+
+        return positions.astype(np.int64)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        """Add slugs by their 64 bit hashes"""
+
+        if len(hashes) == 0:
+            return
+
+        positions = self._positions(hashes).ravel()
+
+        masks = np.left_shift(1, positions & 7).astype(np.uint8)
+
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        with self.lock:
+            np.bitwise_or.at(bits, positions >> 3, masks)
+
+        return
+
+    def add(self, slugs: Iterable[str]) -> None:
+        self.add_hashes(slug_hashes(slugs))
+
+        return
+
+    def contains(self, slugs: list[str]) -> np.ndarray:
+        """Check which slugs may have been added (a slug that was added is always found)
+
+        :returns: a bool for each slug
+        """
+
+        if len(slugs) == 0:
+            return np.zeros(0, dtype=bool)
+
+        positions = self._positions(slug_hashes(slugs))
+
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        found = (bits[positions >> 3] >> (positions & 7)) & 1
+
+        return found.all(axis=1)
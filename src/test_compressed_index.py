@@ -0,0 +1,67 @@
+from compressed_index import CompressedIndex
+from fake_wiki import make_docs, scratch_dir, write_docs
+from helper import INV_IDX_FILE
+from inverted_index import InvertedIndex
+from processer import build_vocab_and_index
+
+import io
+import numpy as np
+
+from contextlib import redirect_stdout
+
+### Declare constants
+NUM_BUILD_PAGES  = 1000
+
+NUM_LOOKUP_DOCS  = 200    # Docs looked up in the posting lists of the most frequent terms
+NUM_DECODE_TERMS = 200    # Most frequent terms whose posting lists are decoded
+
+
+### Declare tests
+def compressed_index(num_docs: int) -> tuple[InvertedIndex, CompressedIndex]:
+    """Build the reduced index of synthetic docs, and compress it (saved and loaded back)"""
+
+    with scratch_dir() as tmp_dir:
+        write_docs(make_docs(num_docs, 4))
+        with redirect_stdout(io.StringIO()):
+            build_vocab_and_index()
+
+        inv_idx = InvertedIndex.from_parquet(INV_IDX_FILE)
+
+        CompressedIndex.from_index(inv_idx).save(f'{tmp_dir}/compressed')
+        compressed = CompressedIndex.load(f'{tmp_dir}/compressed', mmap_mode=None)
+
+    return inv_idx, compressed
+
+def decode_terms(inv_idx: InvertedIndex, seed: int) -> list[str]:
+    """The longest posting lists (the ones queries decode the most) and random ones"""
+
+    rng = np.random.default_rng(seed)
+
+    doc_freqs = np.diff(inv_idx.offsets)
+    terms = [ str(inv_idx.terms[i]) for i in np.argsort(-doc_freqs, kind='stable')[:NUM_DECODE_TERMS] ]
+    terms += [ str(term) for term in rng.choice(inv_idx.terms, NUM_DECODE_TERMS) ]
+
+    return terms
+
+def test_compressed_index() -> None:
+    """Compress the reduced index of many docs, and compare its postings and lookups to the raw index"""
+
+    inv_idx, compressed = compressed_index(NUM_BUILD_PAGES)
+
+    docids, freqs = compressed._decode(np.arange(len(compressed.block_firsts)))
+    assert np.array_equal(docids, inv_idx.docids) and np.array_equal(freqs, inv_idx.freqs), 'Decoded postings do not match'
+
+    assert len(compressed) == len(inv_idx), 'The compressed index has a different num of terms'
+
+    rng = np.random.default_rng(6)
+    num_docs = int(inv_idx.docids.max()) + 1
+    lookup_docids = np.sort(rng.choice(num_docs, NUM_LOOKUP_DOCS, replace=False))
+
+    for term in decode_terms(inv_idx, 6):
+        assert compressed.doc_freq(term) == inv_idx.doc_freq(term), f'Doc freq of {term} does not match'
+
+        for raw, compr in ((inv_idx.postings(term), compressed.postings(term)),
+                           (inv_idx.lookup(term, lookup_docids), compressed.lookup(term, lookup_docids))):
+            assert all( np.array_equal(a, b) for a, b in zip(raw, compr) ), f'Postings or lookups of {term} do not match'
+
+    return
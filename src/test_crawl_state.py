@@ -0,0 +1,143 @@
+from crawl_state import MAX_RESOLVE_ATTEMPTS, CrawlState, read_tasks
+from fake_wiki import NUM_TEST_DOCS
+from resolver import RESOLVE_BATCH_SIZE
+
+import random
+import tempfile
+import time
+
+from threading import Thread
+
+### Declare constants
+NUM_CONCURRENT_SLUGS   = 20000
+NUM_CONCURRENT_THREADS = 8
+
+
+### Declare tests
+def test_checkpoints() -> None:
+    """Checkpoint a crawl state, keep crawling, and load it back as if the crawl died"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        checkpoint_file, task_log_file, frontier_file = f'{tmp_dir}/checkpoint.pkl', f'{tmp_dir}/tasks.jsonl', f'{tmp_dir}/frontier.sqlite'
+
+        pages = [ (f'Page_{i}', f'Page {i}', f'https://en.wikipedia.org/wiki/Page_{i}') for i in range(NUM_TEST_DOCS) ]
+
+        state = CrawlState(['Page_0'], task_log_file, frontier_file)
+        state.claim([ page[0] for page in pages[:100] ])
+        state.assign(pages[:100], NUM_TEST_DOCS)
+        state.aliases['Alias_1'] = 'Page_1'
+        state.aliased.add('Alias_1')
+        state.omitted.add('Missing_1')
+        state.push_links(['Link_0', 'Link_1', 'Link_1'])
+
+        # a checkpoint waits for the batch in flight
+        with state.batch_lock():
+            state.claim(['Page_100', 'Page_101'])
+
+            saver = Thread(target=state.save, args=(checkpoint_file,))
+            saver.start()
+            time.sleep(0.1)
+            saved_early = not saver.is_alive()
+
+            state.assign(pages[100:102], NUM_TEST_DOCS)
+        saver.join()
+
+        # links found after the checkpoint
+        state.push_links(['Link_2', 'Link_1'])
+
+        # a docid drawn by an organizer that died before logging it
+        lost_docid = next(state.docids)
+
+        # tasks assigned after the checkpoint, then a crash mid write
+        state.claim([ page[0] for page in pages[lost_docid+1:] ])
+        state.assign(pages[lost_docid+1:], NUM_TEST_DOCS - 10)
+        state.task_log.write('[390, "Page_3')
+        state.close()
+
+        resumed, tasks = CrawlState.load(checkpoint_file, task_log_file, frontier_file)
+
+        assert not saved_early, 'The checkpoint did not wait for the batch in flight'
+
+        assert sorted(tasks.keys()) == [ docid for docid in range(NUM_TEST_DOCS - 10) if docid != lost_docid ], \
+            'Tasks were lost or duplicated'
+        assert resumed.num_assigned == NUM_TEST_DOCS - 11, 'The num of assigned tasks was not restored'
+        assert all( tasks[docid] == (docid, *pages[docid]) for docid in tasks ), 'Tasks were not logged correctly'
+
+        assert resumed.aliases == {'Alias_1': 'Page_1'}, 'Aliases were not checkpointed'
+        assert len(resumed.aliased) == 1 and 'Alias_1' in resumed.aliased, 'Aliased slugs were not checkpointed'
+        assert len(resumed.omitted) == 1 and 'Missing_1' in resumed.omitted, 'Omitted slugs were not checkpointed'
+
+        assert len(resumed.visited) == len(tasks) and all( task[1] in resumed.visited for task in tasks.values() ), \
+            'Visited slugs are not the assigned pages'
+
+        assert resumed.frontier.snapshot() == [ ('Link_0', 1, 0), ('Link_1', 2, 1) ], 'The frontier was not checkpointed'
+
+        assert resumed.seen_filter.contains([ task[1] for task in tasks.values() ] + ['Alias_1', 'Missing_1']).all(), \
+            'The seen filter was not rebuilt'
+
+        resumed.assign([ pages[lost_docid], pages[NUM_TEST_DOCS - 10] ], NUM_TEST_DOCS)
+        resumed.close()
+
+        tasks = CrawlState.load(checkpoint_file, task_log_file, frontier_file)[1]
+        assert sorted(tasks.keys()) == list(range(NUM_TEST_DOCS - 9)), 'The lost docid was not reassigned first after resuming'
+        assert all( tasks[docid] == (docid, *pages[docid]) for docid in tasks ), 'Tasks assigned after resuming were not logged'
+
+    return
+
+def test_concurrent_state() -> None:
+    """Claim and assign the same slugs from many threads at once"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        state = CrawlState([], f'{tmp_dir}/concurrent-tasks.jsonl', f'{tmp_dir}/concurrent-frontier.sqlite')
+
+        slugs = [ f'Page_{i}' for i in range(NUM_CONCURRENT_SLUGS) ]
+        assigned: list[list[tuple]] = [ list() for _ in range(NUM_CONCURRENT_THREADS) ]
+
+        def organize(i: int) -> None:
+            order = slugs.copy()
+            random.Random(i).shuffle(order)
+
+            for j in range(0, len(order), RESOLVE_BATCH_SIZE):
+                batch = state.claim(order[j:j+RESOLVE_BATCH_SIZE])
+                assigned[i] += state.assign([ (slug, slug, slug) for slug in batch ], NUM_CONCURRENT_SLUGS)
+
+            return
+
+        threads = [ Thread(target=organize, args=(i,)) for i in range(NUM_CONCURRENT_THREADS) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        state.close()
+
+        tasks = [ task for thread_tasks in assigned for task in thread_tasks ]
+
+        assert sorted( task[0] for task in tasks ) == list(range(NUM_CONCURRENT_SLUGS)), 'Docids were lost or duplicated'
+        assert state.num_assigned == NUM_CONCURRENT_SLUGS, 'The num of assigned tasks is wrong'
+        assert sorted( task[1] for task in tasks ) == sorted(slugs), 'A slug was claimed more than once'
+        assert sorted(read_tasks(f'{tmp_dir}/concurrent-tasks.jsonl').values()) == sorted(tasks), \
+            'The task log does not match the assigned tasks'
+
+    return
+
+def test_requeue() -> None:
+    """Requeue slugs whose request failed until they are out of attempts"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        state = CrawlState([], f'{tmp_dir}/requeue-tasks.jsonl', f'{tmp_dir}/requeue-frontier.sqlite')
+        state.push_links(['Page_0'])
+
+        for attempt in range(1, MAX_RESOLVE_ATTEMPTS + 1):
+            batch = state.claim(state.pop_batch(RESOLVE_BATCH_SIZE, 0))
+            assert batch == ['Page_0'], f'The slug was not popped for attempt {attempt}'
+
+            state.visited.discard('Page_0')
+            state.requeue(batch)
+
+        assert len(state.frontier) == 0 and 'Page_0' in state.omitted, \
+            f'The slug was not omitted after {MAX_RESOLVE_ATTEMPTS} failed attempts'
+
+        state.close()
+
+    return
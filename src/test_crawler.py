@@ -0,0 +1,154 @@
+from async_crawler import start_async_crawler
+from crawler_v2 import start_crawler
+from fake_wiki import (ACTION_API_URL, API_URL, NUM_FAKE_PAGES, NUM_LINKS, NUM_TEST_DOCS, WORDS,
+                       check_output, fake_server, make_pages, page_text, scratch_dir)
+from helper import ADJ_LIST_FILE, DOC_INFO_FILE, INV_IDX_FILE, VOCAB_FILE, parse_text
+from link_ranking import calc_link_ranks
+from processer import build_vocab_and_index, store_index
+from recrawl import start_recrawl
+from response_cache import ResponseCache
+
+import json
+import pandas as pd
+import random
+
+from collections import Counter
+
+### Declare constants
+NUM_FETCHERS   = 64
+NUM_ORGANIZERS = 4
+
+NUM_CHANGED_PAGES = 20
+
+SEEDS = ('Page_0', 'Alias_1')
+
+
+### Declare tests
+def test_async_crawler() -> None:
+    """Crawl the fake API w/ the async crawler"""
+
+    pages = make_pages()
+
+    with fake_server(pages), scratch_dir():
+        start_async_crawler(NUM_TEST_DOCS, API_URL, SEEDS, num_rand_seeds=1, num_fetchers=NUM_FETCHERS)
+
+        check_output(pages)
+
+    return
+
+def test_threaded_crawler() -> None:
+    """Crawl the fake API w/ the threaded crawler"""
+
+    pages = make_pages()
+
+    with fake_server(pages), scratch_dir():
+        start_crawler('mediawiki', num_docs=NUM_TEST_DOCS, api_url=API_URL, action_api_url=ACTION_API_URL,
+                      seeds=SEEDS, num_rand_seeds=1, num_organizers=NUM_ORGANIZERS)
+
+        check_output(pages)
+
+    return
+
+def test_async_offline_replay() -> None:
+    """Record a crawl in a response cache, then replay it from the cache"""
+
+    pages = make_pages()
+
+    with fake_server(pages), scratch_dir() as tmp_dir:
+        for offline in (False, True):
+            start_async_crawler(NUM_TEST_DOCS, API_URL, SEEDS, num_rand_seeds=1, num_fetchers=NUM_FETCHERS,
+                                cache_file=f'{tmp_dir}/responses.sqlite', offline=offline)
+
+            check_output(pages)
+
+    return
+
+def test_threaded_offline_replay() -> None:
+    """Record part of a crawl, then replay more pages than were recorded from the cache"""
+
+    pages = make_pages()
+    num_recorded = NUM_TEST_DOCS // 2
+
+    with fake_server(pages), scratch_dir() as tmp_dir:
+        cache_file = f'{tmp_dir}/responses.sqlite'
+
+        start_crawler('mediawiki', cache_file=cache_file, num_docs=num_recorded, api_url=API_URL,
+                      action_api_url=ACTION_API_URL, seeds=SEEDS, num_rand_seeds=0)
+        recorded = set(pd.read_parquet(DOC_INFO_FILE)['title'])
+
+        # only keep the resolved slugs of the pages whose html was recorded
+        cache = ResponseCache(cache_file)
+        html_slugs = set(cache.slugs('html'))
+        with cache.conn:
+            for slug in cache.slugs('resolved'):
+                if json.loads(cache.get('resolved', slug)[0])[0] not in html_slugs:
+                    cache.conn.execute("DELETE FROM responses WHERE kind = 'resolved' AND slug = ?", (slug,))
+        cache.close()
+
+        # the frontier runs out after the recorded pages
+        start_crawler('mediawiki', cache_file=cache_file, offline=True, num_docs=NUM_TEST_DOCS, api_url=API_URL,
+                      action_api_url=ACTION_API_URL, seeds=SEEDS, num_rand_seeds=0)
+
+        check_output(pages, num_recorded)
+        assert set(pd.read_parquet(DOC_INFO_FILE)['title']) == recorded, 'The replayed pages are not the recorded pages'
+
+        # nothing can be replayed from an empty cache
+        start_crawler('mediawiki', cache_file=f'{tmp_dir}/empty.sqlite', offline=True, num_docs=5, api_url=API_URL,
+                      action_api_url=ACTION_API_URL, seeds=('Page_0',), num_rand_seeds=0)
+        check_output(pages, 0)
+
+    return
+
+def test_recrawl() -> None:
+    """Crawl and build, edit some pages, and patch the build w/ a recrawl"""
+
+    pages = make_pages()
+
+    with fake_server(pages), scratch_dir():
+        start_async_crawler(NUM_TEST_DOCS, API_URL, SEEDS, num_rand_seeds=1, num_fetchers=NUM_FETCHERS)
+
+        build_vocab_and_index()
+        calc_link_ranks()
+        store_index()
+
+        doc_info = pd.read_parquet(DOC_INFO_FILE)
+        before   = pd.read_parquet(INV_IDX_FILE).reset_index()
+        terms    = set(pd.read_parquet(VOCAB_FILE).index)
+
+        # give some crawled pages new text, links, and revisions
+        rng = random.Random(1)
+        slugs = doc_info['title'].str.replace(' ', '_')
+        changed = rng.sample(list(slugs.index), NUM_CHANGED_PAGES)
+        for docid in changed:
+            page = pages[slugs[docid]]
+            page['pars'] = [ ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 30))) for _ in range(3) ]
+            page['links'] = [ f'Page_{rng.randrange(NUM_FAKE_PAGES)}' for _ in range(NUM_LINKS) ]
+            page['revision'] += NUM_FAKE_PAGES
+
+        start_recrawl(API_URL, ACTION_API_URL)
+
+        after_info = pd.read_parquet(DOC_INFO_FILE)
+        after      = pd.read_parquet(INV_IDX_FILE).reset_index()
+        adj_list   = pd.read_parquet(ADJ_LIST_FILE)
+
+    assert list(after_info.index) == list(doc_info.index) and (after_info['title'] == doc_info['title']).all(), \
+        'Docids are not stable'
+
+    is_changed = after['docid'].isin(changed)
+    assert after[~is_changed].reset_index(drop=True).equals(before[~before['docid'].isin(changed)].reset_index(drop=True)), \
+        'Postings of unchanged pages were changed'
+
+    terms_by_doc = { docid: dict(zip(group['term'], group['frequency'])) for docid, group in after[is_changed].groupby('docid') }
+    for docid in changed:
+        page = pages[slugs[docid]]
+
+        expected_terms = Counter(parse_text(page_text(page)))
+        assert terms_by_doc.get(docid, dict()) == { term: cnt for term, cnt in expected_terms.items() if term in terms }, \
+            f'Terms of {slugs[docid]} were not patched'
+
+        assert after_info.loc[docid, 'len'] == expected_terms.total() and after_info.loc[docid, 'revision'] == page['revision'], \
+            f'Doc info of {slugs[docid]} was not patched'
+
+        assert set(adj_list.loc[docid, 'out_links']) == set(page['links']), f'Out links of {slugs[docid]} were not patched'
+
+    return
@@ -0,0 +1,68 @@
+from crawler_v2 import BATCH_SIZE
+from crawlerWorker import PageWriter
+from fake_wiki import make_docs
+
+import numpy as np
+import pandas as pd
+import tempfile
+
+from collections import Counter
+
+### Declare constants
+NUM_BUFFER_PAGES = 2 * BATCH_SIZE
+
+
+### Declare tests
+def vstack_postings(docs: list[tuple[int, Counter]], file: str) -> None:
+    """Buffer and save postings the way the workers used to (a growing np.vstack of strings and a DataFrame)"""
+
+    inv_idx = None
+    for docid, doc_counter in docs:
+        doc_ii = np.array([(str(term), docid, cnt) for term, cnt in doc_counter.items()])
+        doc_ii = np.reshape(doc_ii, (len(doc_ii), 3))
+
+        if inv_idx is None:
+            inv_idx = doc_ii.copy()
+        else:
+            inv_idx = np.vstack((inv_idx, doc_ii))
+
+    inv_idx = pd.DataFrame(inv_idx, columns=['term', 'docid', 'frequency'])
+    inv_idx = inv_idx.astype({'term': str, 'docid': int, 'frequency': int}).set_index(['term', 'docid'])
+
+    inv_idx.to_parquet(file)
+
+    return
+
+def buffer_postings(docs: list[tuple[int, Counter]], file: str) -> None:
+    """Buffer and save postings w/ a PageWriter"""
+
+    writer = PageWriter(f'{file}.doc_info', file, f'{file}.adj_list')
+    for docid, doc_counter in docs:
+        writer.add_page(docid, '', '', list(doc_counter.elements()), [])
+    writer.close()
+
+    return
+
+def test_postings_buffer() -> None:
+    """Compare the postings the workers buffer to the old np.vstack buffers"""
+
+    docs = make_docs(NUM_BUFFER_PAGES, 3)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for save in (vstack_postings, buffer_postings):
+            for i in range(0, NUM_BUFFER_PAGES, BATCH_SIZE):
+                save(docs[i:i+BATCH_SIZE], f'{tmp_dir}/{save.__name__}.parquet')
+
+        old = pd.read_parquet(f'{tmp_dir}/vstack_postings.parquet')
+        new = pd.read_parquet(f'{tmp_dir}/buffer_postings.parquet')
+
+    # the buffered postings are saved sorted by (term, docid)
+    assert list(new.index.names) == ['term', 'docid'], 'Buffered postings are not indexed by (term, docid)'
+
+    old = old.sort_index().reset_index().astype({'docid': 'int32', 'frequency': 'int32'})
+    new = new.reset_index()
+
+    assert new['term'].dtype == 'category' and new['docid'].dtype == 'int32', 'Buffered postings have the wrong dtypes'
+    assert old.equals(new.astype({'term': str})), 'Buffered postings do not match'
+
+    return
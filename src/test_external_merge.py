@@ -0,0 +1,95 @@
+from crawlerWorker import PageWriter
+from external_merge import MERGE_FAN_IN, merge_docs, merge_postings
+from fake_wiki import make_docs
+from helper import ADJ_LIST_SCHEMA, DOC_INFO_SCHEMA, VOCAB_SIZE, store_postings
+from inverted_index import read_postings
+
+import numpy as np
+import os
+import pandas as pd
+import tempfile
+
+### Declare constants
+NUM_MERGE_PARTS = MERGE_FAN_IN + 8   # More parts than are merged at once, so the runs of a first pass are merged again
+MERGE_PART_SIZE = 64
+
+
+### Declare tests
+def write_parts(merge_dir: str, num_parts: int) -> dict[str, list[str]]:
+    """Save part files w/ every num_parts-th doc each, like the workers' batches
+
+    :returns: the doc info, inverted index, and adj list part files
+    """
+
+    docs = make_docs(num_parts * MERGE_PART_SIZE, 5)
+    files = { name: [ f'{merge_dir}/{i}-{name}.parquet' for i in range(num_parts) ] for name in ('doc_info', 'inv_idx', 'adj_list') }
+    for i in range(num_parts):
+        writer = PageWriter(files['doc_info'][i], files['inv_idx'][i], files['adj_list'][i])
+        for docid, doc_counter in reversed(docs[i::num_parts]):
+            writer.add_page(docid, f'Page {docid}', '', list(doc_counter.elements()), [f'Page_{docid + 1}'])
+        writer.close()
+
+    return files
+
+def merge_in_memory(files: list[str], out_file: str) -> pd.DataFrame:
+    """Merge the postings of part files in memory and count the vocab (how the build used to)"""
+
+    postings = read_postings(files)
+    store_postings(postings, out_file)
+
+    terms, term_ids, _, freqs = postings
+    col_freqs = np.bincount(term_ids, weights=freqs, minlength=len(terms)).astype(np.int64)
+    top = np.argsort(-col_freqs, kind='stable')[:VOCAB_SIZE]
+
+    return pd.DataFrame({'frequency': col_freqs[top]}, index=pd.Index(terms[top], name='term'))
+
+def test_external_merge() -> None:
+    """Merge part files in passes and in memory"""
+
+    with tempfile.TemporaryDirectory() as merge_dir:
+        files = write_parts(merge_dir, NUM_MERGE_PARTS)
+
+        expected_vocab = merge_in_memory(files['inv_idx'], f'{merge_dir}/in-memory.parquet')
+        vocab = merge_postings(files['inv_idx'], f'{merge_dir}/merged.parquet', merge_dir)
+
+        merge_docs(files['doc_info'], f'{merge_dir}/doc_info.parquet', merge_dir, DOC_INFO_SCHEMA)
+        merge_docs(files['adj_list'], f'{merge_dir}/adj_list.parquet', merge_dir, ADJ_LIST_SCHEMA)
+
+        merged = pd.read_parquet(f'{merge_dir}/merged.parquet')
+        assert merged.equals(pd.read_parquet(f'{merge_dir}/in-memory.parquet')), 'Merged postings do not match'
+        assert merged.index.is_monotonic_increasing, 'Merged postings are not sorted'
+
+        assert vocab.equals(expected_vocab), 'Vocab counted while merging does not match'
+
+        for name in ('doc_info', 'adj_list'):
+            expected = pd.concat([ pd.read_parquet(file) for file in files[name] ]).sort_index()
+            assert pd.read_parquet(f'{merge_dir}/{name}.parquet').equals(expected), f'Merged {name} does not match'
+
+        outputs = ['in-memory.parquet', 'merged.parquet', 'doc_info.parquet', 'adj_list.parquet']
+        assert sorted(os.listdir(merge_dir)) == sorted([ os.path.basename(file) for name in files for file in files[name] ] + outputs), \
+            'The runs of earlier passes were not removed'
+
+    return
+
+def test_empty_merge() -> None:
+    """Merge no part files (e.g. a crawl that saved no pages)"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        writer = PageWriter(f'{tmp_dir}/part-doc_info.parquet', f'{tmp_dir}/part-inv_idx.parquet', f'{tmp_dir}/part-adj_list.parquet')
+        writer.add_page(0, 'Page 0', '', ['term'], ['Page_1'])
+        writer.close()
+
+        vocab = merge_postings([], f'{tmp_dir}/inv_idx.parquet', tmp_dir)
+        merge_docs([], f'{tmp_dir}/doc_info.parquet', tmp_dir, DOC_INFO_SCHEMA)
+        merge_docs([], f'{tmp_dir}/adj_list.parquet', tmp_dir, ADJ_LIST_SCHEMA)
+
+        assert len(vocab) == 0 and list(vocab.columns) == ['frequency'], 'The vocab of no postings is not empty'
+
+        for name in ('inv_idx', 'doc_info', 'adj_list'):
+            merged = pd.read_parquet(f'{tmp_dir}/{name}.parquet')
+            part = pd.read_parquet(f'{tmp_dir}/part-{name}.parquet')
+
+            assert len(merged) == 0 and merged.dtypes.equals(part.dtypes) and merged.index.names == part.index.names, \
+                f'The merged {name} of no parts is not empty w/ the schema of the parts'
+
+    return
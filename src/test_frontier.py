@@ -0,0 +1,111 @@
+from frontier import PriorityFrontier
+
+import random
+import tempfile
+
+from collections import Counter
+
+### Declare constants
+NUM_FRONTIER_LINKS = 50000
+NUM_FRONTIER_SLUGS = 10000
+FRONTIER_SIZES     = (NUM_FRONTIER_LINKS, 500)
+
+
+### Declare tests
+def frontier_links(num_links: int, num_slugs: int) -> list[str]:
+    """Links to slugs w/ zipf like in-link counts, in a random order"""
+
+    rng = random.Random(3)
+    slugs = [ f'Page_{i}' for i in range(num_slugs) ]
+    rng.shuffle(slugs)
+
+    return rng.choices(slugs, weights=[ 1 / (i + 1) for i in range(num_slugs) ], k=num_links)
+
+def test_frontier() -> None:
+    """Push links w/ skewed in-link counts and pop them by in-link count (in memory and spilled)"""
+
+    links = frontier_links(NUM_FRONTIER_LINKS, NUM_FRONTIER_SLUGS)
+    in_links = Counter(links)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for max_size in FRONTIER_SIZES:
+            frontier = PriorityFrontier(f'{tmp_dir}/frontier-{max_size}.sqlite', max_size)
+            for link in links:
+                frontier.push(link)
+
+            popped = list()
+            while (slug := frontier.pop()) is not None:
+                popped.append(slug)
+            frontier.close()
+
+            assert set(popped) == set(in_links), f'Slugs were lost (max size {max_size})'
+            assert len(popped) == len(in_links), f'Slugs were popped more than once (max size {max_size})'
+
+            # the spilled slugs are read back as soon as they outrank the slugs in memory
+            expected = sorted(in_links, key=lambda slug: -in_links[slug])
+            assert [ in_links[slug] for slug in popped ] == [ in_links[slug] for slug in expected ], \
+                f'Slugs were not popped by in-link count (max size {max_size})'
+
+    return
+
+def test_spilled_slugs() -> None:
+    """Push in-links to a spilled slug until it outranks the slugs in memory"""
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        frontier = PriorityFrontier(f'{tmp_dir}/frontier-spilled.sqlite', 4)
+
+        # the last slugs are spilled when the 5th is pushed
+        for i in range(5):
+            frontier.push(f'Page_{i}', 5 - i)
+
+        assert frontier.num_spilled > 0, 'No slugs were spilled'
+
+        frontier.push('Page_4', 10)
+        frontier.push('Page_5')
+        assert len(frontier) == 6, f'The frontier has {len(frontier)} slugs after spilling, not 6'
+
+        popped = list()
+        while (slug := frontier.pop()) is not None:
+            popped.append(slug)
+
+        frontier.close()
+
+    assert popped == [ 'Page_4', 'Page_0', 'Page_1', 'Page_2', 'Page_3', 'Page_5' ], f'Slugs were popped in the order {popped}'
+
+    return
+
+def test_restore() -> None:
+    """Snapshot a spilled frontier and pop the same slugs from a frontier restored w/ it"""
+
+    rng = random.Random(5)
+    links = rng.choices([ f'Page_{i}' for i in range(1000) ], weights=[ 1 / (i + 1) for i in range(1000) ], k=5000)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        frontier = PriorityFrontier(f'{tmp_dir}/frontier-snapshot.sqlite', 100)
+        for link in links:
+            frontier.push(link)
+
+        snapshot = frontier.snapshot()
+
+        restored = PriorityFrontier(f'{tmp_dir}/frontier-restored.sqlite', 100)
+        restored.restore(snapshot)
+
+        assert frontier.num_spilled > 0, 'No slugs were spilled'
+        assert len(snapshot) == len(frontier) and len(restored) == len(frontier), \
+            f'The snapshot has {len(snapshot)} slugs, not {len(frontier)}'
+
+        # slugs pushed after restoring are ordered after the restored slugs w/ the same count
+        popped = list()
+        for each in (frontier, restored):
+            each.push('Page_0')
+            each.push('New_0')
+
+            popped.append(list())
+            while (slug := each.pop()) is not None:
+                popped[-1].append(slug)
+
+            each.close()
+
+    assert popped[0] == popped[1], 'The restored frontier popped slugs in a different order'
+
+    return
@@ -0,0 +1,226 @@
+from fake_wiki import DOC_VOCAB, WORDS, doc_term, make_docs, make_pages, scratch_dir, write_docs, write_pages
+from helper import DOC_INFO_FILE, INDEX_DIR, INV_IDX_FILE, calc_doc_stats, calc_prior_top, load_data, load_doc_info, load_prior_top, load_vocab, parse_text
+from inverted_index import InvertedIndex
+from link_ranking import calc_link_ranks
+from models import WeightMatrix, _top_k, bm25_weights, prob_ranking, rank_batch, tf_idf_maxscore_ranking, tf_idf_ranking, weighted_ranking
+from processer import build_vocab_and_index, store_index
+from run import _update_with_feedback
+
+import io
+import numpy as np
+import pandas as pd
+import pytest
+import random
+
+from contextlib import redirect_stdout
+
+### Declare constants
+NUM_WEIGHT_QUERIES = 200
+
+NUM_MAXSCORE_DOCS    = 4000
+NUM_MAXSCORE_QUERIES = 200
+
+NUM_BATCH_DOCS = 1000
+
+NUM_FEEDBACK_DOCS = 200  # few enough that the postings read from parquet are already sorted (so read only)
+
+
+### Declare tests
+def test_weight_matrix() -> None:
+    """Rank queries w/ the stored model weights and w/ the single query models"""
+
+    with scratch_dir():
+        write_pages(make_pages())
+        with redirect_stdout(io.StringIO()):
+            build_vocab_and_index()
+            calc_link_ranks()
+            store_index()
+
+        doc_info, inv_idx, vocab = load_data(silence=True)
+        weights = { model: WeightMatrix.load(INDEX_DIR, model, mmap_mode=None) for model in ('tf_idf', 'prob') }
+
+    rng = random.Random(7)
+    queries = [ ' '.join(rng.choices(WORDS, k=rng.randint(1, 4))) for _ in range(NUM_WEIGHT_QUERIES) ]
+
+    for model, rank_query in (('tf_idf', tf_idf_ranking), ('prob', prob_ranking)):
+        for query in queries:
+            rankings, scores = weighted_ranking(doc_info, weights[model], vocab, query, silence=True)
+            expected_rankings, expected_scores = rank_query(doc_info, inv_idx, vocab, query, silence=True)
+
+            # every doc is ranked, so the scores must be the same to the last bit
+            assert np.array_equal(rankings, expected_rankings) and np.array_equal(scores, expected_scores), \
+                f'Rankings of the {model} weight matrix do not match for {query!r}'
+
+    return
+
+def test_load_data() -> None:
+    """Load the doc lens, link prior, and top prior docs from the stored index and from the doc info"""
+
+    with scratch_dir():
+        write_pages(make_pages())
+        with redirect_stdout(io.StringIO()):
+            build_vocab_and_index()
+            calc_link_ranks()
+
+        expected = load_doc_info(silence=True)
+        expected_prior_top = load_prior_top(expected)
+
+        with redirect_stdout(io.StringIO()):
+            store_index()
+
+        doc_info, _, _ = load_data(silence=True)
+        prior_top = load_prior_top(doc_info)
+
+    for column in ('title', 'url', 'len', 'prior'):
+        assert doc_info[column].equals(expected[column]), f'The {column} column of the indexed doc info does not match'
+    assert doc_info.attrs['stats'] == expected.attrs['stats'], 'The stats of the indexed doc info do not match'
+
+    assert isinstance(prior_top, np.memmap), 'The top prior docs were not memory mapped from the index'
+    assert np.array_equal(prior_top, expected_prior_top), 'The top prior docs do not match'
+
+    return
+
+def test_top_k() -> None:
+    """Select the top k of random scores, and reject a k that isn't positive"""
+
+    doc_rel = np.random.default_rng(8).random(1000)
+    expected = doc_rel.argsort()[::-1]
+
+    for top_k in (1, 10, 999, 1000, 2000, None):
+        rankings, scores = _top_k(doc_rel, top_k)
+
+        assert np.array_equal(rankings, expected[:top_k]), f'The top {top_k} docs do not match'
+        assert np.array_equal(scores, doc_rel[expected[:top_k]]), f'The top {top_k} scores do not match'
+
+    for top_k in (0, -1):
+        with pytest.raises(ValueError):
+            _top_k(doc_rel, top_k)
+
+    return
+
+def maxscore_index(num_docs: int) -> tuple[pd.DataFrame, InvertedIndex, pd.DataFrame, np.ndarray, list[str]]:
+    """Build an index of synthetic docs w/ a skewed link prior, and queries of terms of every doc freq
+
+    :returns:
+        doc info (w/ the prior and the stats MaxScore uses)
+        inverted index
+        vocab
+        docids w/ the highest prior
+        queries
+    """
+
+    with scratch_dir():
+        write_docs(make_docs(num_docs, 9))
+        with redirect_stdout(io.StringIO()):
+            build_vocab_and_index()
+
+        doc_info = pd.read_parquet(DOC_INFO_FILE)
+        inv_idx  = InvertedIndex.from_parquet(INV_IDX_FILE)
+        vocab    = load_vocab(silence=True)
+
+    # a few docs w/ a high link prior, like the combined link ranks
+    rng = np.random.default_rng(9)
+    prior = rng.pareto(1.2, len(doc_info))
+    doc_info['prior'] = (10 * prior / prior.max()).astype(np.float32)
+
+    doc_info.attrs['stats'] = calc_doc_stats(doc_info)
+    prior_top = calc_prior_top(doc_info['prior'].to_numpy())
+
+    # terms of every doc freq, from the most common terms to ones in a few docs
+    ranks = np.exp(rng.uniform(0, np.log(DOC_VOCAB), (NUM_MAXSCORE_QUERIES, 4))).astype(int)
+    queries = [ ' '.join(doc_term(i) for i in query_ranks[:rng.integers(1, 5)]) for query_ranks in ranks ]
+
+    return doc_info, inv_idx, vocab, prior_top, queries
+
+def test_maxscore() -> None:
+    """Rank queries w/ and w/o MaxScore pruning"""
+
+    doc_info, inv_idx, vocab, prior_top, queries = maxscore_index(NUM_MAXSCORE_DOCS)
+
+    for top_k in (1, 10, 100):
+        for query in queries:
+            _, scores = tf_idf_maxscore_ranking(doc_info, inv_idx, vocab, query, top_k=top_k, silence=True, prior_top=prior_top)
+            _, expected_scores = tf_idf_ranking(doc_info, inv_idx, vocab, query, top_k=top_k, silence=True)
+
+            # the terms are added in the same order, so the scores must be the same to the last bit (docs w/ tied scores can swap)
+            assert np.array_equal(scores, expected_scores), f'The top {top_k} scores of {query!r} w/ MaxScore do not match'
+
+    return
+
+def test_rank_batch() -> None:
+    """Rank a batch of queries (incl. ones w/o any known terms) w/ a sparse matmul and w/ the single query models"""
+
+    doc_info, inv_idx, vocab, _, queries = maxscore_index(NUM_BATCH_DOCS)
+    queries += ['', 'the and', 'zzzzz unknownterm', f'unknownterm {doc_term(3)}']
+
+    for model, rank_query in (('tf_idf', tf_idf_ranking), ('prob', prob_ranking)):
+        assert rank_batch(doc_info, inv_idx, vocab, [], model, silence=True) == [], f'An empty {model} batch returned results'
+
+        for top_k in (1, 10):
+            results = rank_batch(doc_info, inv_idx, vocab, queries, model, top_k=top_k, silence=True)
+            assert len(results) == len(queries), f'The {model} batch did not return a result per query'
+
+            for query, (rankings, scores) in zip(queries, results):
+                expected_rankings, expected_scores = rank_query(doc_info, inv_idx, vocab, query, top_k=top_k, silence=True)
+
+                # the terms of a query are summed in a different order, so the scores can differ in the last few bits
+                assert np.array_equal(rankings, expected_rankings), f'The top {top_k} {model} docs of {query!r} do not match'
+                assert np.allclose(scores, expected_scores, rtol=1e-12, atol=0), \
+                    f'The top {top_k} {model} scores of {query!r} do not match'
+
+    return
+
+def test_feedback() -> None:
+    """Apply feedback, then check the postings, the term bounds, and MaxScore against exhaustive ranking"""
+
+    doc_info, inv_idx, vocab, prior_top, queries = maxscore_index(NUM_FEEDBACK_DOCS)
+    assert 'max_weight' in vocab.columns, 'The vocab has no term bounds'
+
+    # a common and a rare term, so the feedback docs both contain the terms and are inserted into their postings
+    query = f'{doc_term(0)} {doc_term(500)}'
+    terms = parse_text(query)
+    feedback_docids = [0, 1, 2, 3, NUM_FEEDBACK_DOCS - 1]
+
+    before = { term: tuple( array.copy() for array in inv_idx.postings(term) ) for term in inv_idx.terms }
+    lens_before = doc_info['len'].to_numpy().copy()
+
+    with redirect_stdout(io.StringIO()):
+        _update_with_feedback(doc_info, inv_idx, vocab, query, feedback_docids)
+
+    offsets = inv_idx.offsets
+    assert offsets[0] == 0 and (np.diff(offsets) >= 0).all(), 'The offsets are not increasing from 0'
+    assert offsets[-1] == len(inv_idx.docids) == len(inv_idx.freqs), 'The offsets do not end at the num of postings'
+
+    for term, (docids, freqs) in before.items():
+        new_docids, new_freqs = inv_idx.postings(term)
+        assert (np.diff(new_docids) > 0).all(), f'The postings of {term} are not sorted by docid'
+
+        expected = dict(zip(docids.tolist(), freqs.tolist()))
+        if term in terms:
+            for docid in feedback_docids:
+                expected[docid] = expected.get(docid, 0) + 2 * terms.count(term)
+        assert dict(zip(new_docids.tolist(), new_freqs.tolist())) == expected, f'The postings of {term} do not match'
+
+    assert any( docid not in before[term][0] for term in terms for docid in feedback_docids ), \
+        'No feedback doc was inserted into a posting list'
+
+    assert np.array_equal(doc_info['len'].to_numpy(), lens_before + np.isin(np.arange(NUM_FEEDBACK_DOCS), feedback_docids) * 2*len(terms)), \
+        'The doc lens were not updated'
+    assert doc_info.attrs['stats'] == calc_doc_stats(doc_info), 'The doc stats were not recomputed'
+
+    avg_doc_len = doc_info.attrs['stats']['avg_doc_len']
+    for term in terms:
+        doc_ids, doc_cnts = inv_idx.postings(term)
+        max_weight = bm25_weights(doc_cnts, doc_info['len'].to_numpy()[doc_ids], avg_doc_len, 1.0).max()
+
+        assert vocab.loc[term, 'max_weight'] == max_weight, f'The max weight of {term} was not recomputed'
+        assert vocab.loc[term, 'avg_len'] == avg_doc_len, f'The avg len of the bound of {term} was not updated'
+
+    for top_k in (1, 10):
+        for query in queries + [query]:
+            _, scores = tf_idf_maxscore_ranking(doc_info, inv_idx, vocab, query, top_k=top_k, silence=True, prior_top=prior_top)
+            _, expected_scores = tf_idf_ranking(doc_info, inv_idx, vocab, query, top_k=top_k, silence=True)
+
+            assert np.array_equal(scores, expected_scores), f'The top {top_k} scores of {query!r} w/ MaxScore do not match after feedback'
+
+    return
@@ -0,0 +1,77 @@
+from crawler_v2 import parse_page
+from fake_wiki import make_pages, page_html
+from helper import RESPONSE_CACHE_FILE, parse_text
+from response_cache import ResponseCache
+
+import os
+
+from bs4 import BeautifulSoup
+
+### Declare constants
+REPO_DIR          = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_FIXTURES_DIR = f'{REPO_DIR}/data/sample/pages'
+
+
+### Declare tests
+def soup_parse_page(html: str) -> tuple[list[str], list[str]]:
+    """Parse the html of a page w/ a BeautifulSoup tree (how parse_page used to work)"""
+
+    page = BeautifulSoup(html, 'lxml')
+
+    out_links: set[str] = set()
+    for sub_link in page.find_all('a'):
+        if not sub_link.has_attr('href'): continue
+
+        sub_link = str(sub_link['href']).split('#', 1)[0]
+        sub_link = sub_link.split('?', 1)[0]
+
+        if (not sub_link.startswith('./')
+            or sub_link.startswith('./File:')
+            or sub_link.startswith('./Help:')
+            or sub_link.startswith('./Special:')
+            or sub_link.startswith('./Template:')
+            or sub_link.startswith('./Template_talk:')
+            or sub_link.startswith('./Wikipedia:')):
+            continue
+
+        out_links.add(sub_link[2:])
+
+    text = ' '.join([ par.text for par in page.find_all('p') ])
+
+    return list(out_links), parse_text(text)
+
+def parser_pages() -> dict[str, str]:
+    """The synthetic fixture pages, the canned pages of the fake API, and the real html of the repo's response cache (if any)
+
+    :returns: name -> html of each page
+    """
+
+    pages: dict[str, str] = dict()
+    for file in sorted(os.listdir(PAGE_FIXTURES_DIR)):
+        with open(f'{PAGE_FIXTURES_DIR}/{file}', 'r', encoding='utf-8') as page:
+            pages[file] = page.read()
+
+    for slug, page in make_pages().items():
+        pages[f'fake/{slug}'] = page_html(page)
+
+    cache_file = f'{REPO_DIR}/{RESPONSE_CACHE_FILE}'
+    if os.path.exists(cache_file):
+        cache = ResponseCache(cache_file, offline=True)
+        for slug in cache.slugs('html'):
+            pages[f'{os.path.basename(cache_file)}/{slug}'] = cache.get('html', slug)[0]
+        cache.close()
+
+    return pages
+
+def test_page_parser() -> None:
+    """Compare the streaming page parser to a BeautifulSoup tree on the test pages"""
+
+    for name, html in parser_pages().items():
+        out_links, filtered = parse_page(html)
+        soup_links, soup_filtered = soup_parse_page(html)
+
+        assert len(out_links) == len(set(out_links)), f'Out links of {name} are not unique'
+        assert set(out_links) == set(soup_links), f'Out links of {name} do not match'
+        assert filtered == soup_filtered, f'Terms of {name} do not match'
+
+    return
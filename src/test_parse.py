@@ -0,0 +1,88 @@
+from helper import parse_text, stop_words
+
+import random
+import re
+
+from nltk.stem.snowball import EnglishStemmer
+from nltk.tokenize import NLTKWordTokenizer
+
+### Declare constants
+NUM_RANDOM_TEXTS = 2000
+
+# hand picked edge cases of the old regexes and the word tokenizer
+REGRESSION_CORPUS = [
+    "",
+    "   \n\r\t  ",
+    "The quick brown fox jumps over the lazy dog.",
+    "Don't stop: it's the dog's bone, isn't it? Rock'n'roll!",
+    "He said ''hello'' and 'twas 'tis \"quoted\" (parens) [brackets] {braces}",
+    "abc123def 123abc abc_def __init__ snake_case_name 42 3.14 1,000,000",
+    "e-mail state-of-the-art U.S.A. Ph.D. end... mid...dle --dash-- a--b",
+    "I cannot go, gonna gotta lemme gimme wanna wanna. whaddya whatcha d'ye more'n",
+    "CANNOT Gonna GOTTA Lemme WANNA cannotx xcannot",
+    "Ünïcödé naïve café résumé façade Straße ΟΔΟΣ İstanbul ﬁnance Ⅻ ½ x² ٣٤ abc٣def",
+    "tab\tseparated\nnew\nlines\r\nand  multiple   spaces",
+    "emoji 🙂 mixed👍words and symbols @home #tag $5 %50 &co *star* ~tilde ^caret",
+    "'leading quote trailing quote' ''double'' `backtick` ´acute´ ’curly’ “quotes”",
+    "x'y'z '_under 'digit9 _'__' .'s ,'t !'re",
+    "Wikipedia is a free online encyclopedia, created and edited by volunteers around the world.",
+]
+
+_stemmer = EnglishStemmer()
+
+# the original parse_text used word_tokenize, which only adds punkt sentence splitting on top of this tokenizer,
+# and the cleaned text has no sentence punctuation left to split on
+_word_tokenizer = NLTKWordTokenizer()
+
+
+### Declare tests
+def parse_text_ref(text: str) -> list[str]:
+    """The original parse_text (five regexes, word_tokenize, and stemming)"""
+
+    # remove new line chars, non-alphanumeric chars, and nums
+    text = re.sub(r'\n|\r', ' ', text)
+    text = re.sub(r"'[\w]*|[^\w\s]+|_+", ' ', text)
+    text = re.sub(r'\d+[\w]*', ' ', text)
+
+    # remove extra whitespace and strip
+    text = re.sub(r'\s+', ' ', text)
+    text = text.strip()
+
+    text = text.lower()
+
+    # tokenize and remove stopwords
+    word_tokens = _word_tokenizer.tokenize(text)
+    filtered = [ _stemmer.stem(w) for w in word_tokens if w not in stop_words ]
+
+    return filtered
+
+def random_texts(num_texts: int, seed: int = 0) -> list[str]:
+    """Generate texts mixing words, contractions, nums, punctuation, and unicode"""
+
+    rng = random.Random(seed)
+
+    pieces = [ word for text in REGRESSION_CORPUS for word in text.split() ]
+    pieces += list(stop_words)
+    chars = "abcXYZ019_'.,;:-!?()\"$#@ \n\téßİΣ½²٣🙂"
+
+    texts = []
+    for _ in range(num_texts):
+        words = []
+        for _ in range(rng.randint(0, 40)):
+            if rng.random() < 0.7:
+                words.append(rng.choice(pieces))
+            else:
+                words.append(''.join(rng.choice(chars) for _ in range(rng.randint(1, 8))))
+        texts.append(rng.choice(['', ' ', '\n']).join(words) if rng.random() < 0.1 else ' '.join(words))
+
+    return texts
+
+def test_parse_text_matches_reference() -> None:
+    """Parse the regression corpus and random texts the same way as the original parse_text"""
+
+    texts = REGRESSION_CORPUS + random_texts(NUM_RANDOM_TEXTS)
+
+    mismatches = [ text for text in texts if parse_text(text) != parse_text_ref(text) ]
+    assert not mismatches, f'{len(mismatches)}/{len(texts)} texts were parsed differently, e.g. {mismatches[0]!r}'
+
+    return
@@ -0,0 +1,90 @@
+from fake_wiki import DOC_VOCAB, make_docs, scratch_dir, write_docs
+from helper import INV_IDX_FILE, VOCAB_FILE, VOCAB_SIZE
+from processer import build_vocab_and_index
+
+import io
+import pandas as pd
+import processer
+import shutil
+
+from contextlib import redirect_stdout
+
+### Declare constants
+NUM_BUILD_PAGES = 1000
+
+
+### Declare tests
+def string_build() -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Create the vocab and reduce the inverted index the way the build used to (grouping and filtering strings)
+
+    Reads a copy of the postings stored w/ plain string terms
+    """
+
+    inv_idx = pd.read_parquet(f'{INV_IDX_FILE}.strings')
+
+    vocab = inv_idx.groupby('term').sum()
+    vocab = vocab.sort_values(by='frequency', ascending=False).head(VOCAB_SIZE)
+
+    terms = set(vocab.index)
+
+    inv_idx = inv_idx.query('term in @terms').sort_index()
+    inv_idx.to_parquet(f'{INV_IDX_FILE}.reduced', engine='pyarrow')
+
+    return vocab, inv_idx
+
+def write_string_postings() -> None:
+    """Save a copy of the postings in ./data w/ plain string terms (read by string_build)"""
+
+    full = pd.read_parquet(INV_IDX_FILE)
+    full.index = full.index.set_levels(full.index.levels[0].astype(str), level='term')
+    full.to_parquet(f'{INV_IDX_FILE}.strings', engine='pyarrow')
+
+    return
+
+def test_term_ids() -> None:
+    """Build the vocab and reduce the inverted index of many docs in the fused stages and w/ strings"""
+
+    with scratch_dir():
+        write_docs(make_docs(NUM_BUILD_PAGES, 4))
+        write_string_postings()
+
+        full = pd.read_parquet(f'{INV_IDX_FILE}.strings')
+        col_freqs = full.groupby('term')['frequency'].sum()
+        shutil.copy(INV_IDX_FILE, f'{INV_IDX_FILE}.full')
+
+        with redirect_stdout(io.StringIO()):
+            old_vocab, _ = string_build()
+
+            build_vocab_and_index()
+            vocab = pd.read_parquet(VOCAB_FILE)
+            inv_idx = pd.read_parquet(INV_IDX_FILE)
+
+            # sum the term counts of a few batches at a time
+            count_merge_size = processer.COUNT_MERGE_SIZE
+            processer.COUNT_MERGE_SIZE = DOC_VOCAB
+            shutil.copy(f'{INV_IDX_FILE}.full', INV_IDX_FILE)
+            try:
+                build_vocab_and_index()
+            finally:
+                processer.COUNT_MERGE_SIZE = count_merge_size
+            merged_vocab = pd.read_parquet(VOCAB_FILE)
+
+            # w/ the vocab counted already (e.g. while the crawl's postings were merged)
+            shutil.copy(f'{INV_IDX_FILE}.full', INV_IDX_FILE)
+            given_stages = build_vocab_and_index(vocab[['frequency']])
+            given_inv_idx = pd.read_parquet(INV_IDX_FILE)
+
+    # ties at the cutoff may be broken differently
+    assert sorted(vocab['frequency']) == sorted(old_vocab['frequency']), 'Vocab frequencies do not match'
+    assert (vocab['frequency'] == col_freqs.reindex(vocab.index)).all(), 'Vocab frequencies are not the term counts'
+
+    expected = full[full.index.get_level_values('term').isin(vocab.index)].sort_index()
+    assert inv_idx.index.levels[0].dtype == 'category', 'Terms of the reduced inverted index are not categorical'
+    assert inv_idx.reset_index().astype({'term': str}).equals(expected.reset_index()), 'Reduced inverted index does not match'
+
+    assert merged_vocab.equals(vocab), 'Vocab does not match when the term counts are summed in parts'
+
+    assert 'count terms' not in given_stages, 'Terms were counted when the vocab was given'
+    assert given_inv_idx.equals(inv_idx), 'Reduced inverted index does not match when the vocab is given'
+
+    return
@@ -0,0 +1,94 @@
+from fake_wiki import make_pages, scratch_dir, write_pages
+from helper import load_data, parse_text
+from link_ranking import calc_link_ranks
+from processer import build_vocab_and_index, store_index
+from query_cache import QueryCache
+from run import _update_with_feedback
+
+import io
+import numpy as np
+import pytest
+
+from contextlib import redirect_stdout
+
+### Declare tests
+def fake_result(i: int) -> tuple[np.ndarray, np.ndarray]:
+    return np.array([i]), np.array([float(i)])
+
+def test_lru_eviction() -> None:
+    """Evict the least recently used entries once the cache is full"""
+
+    cache = QueryCache(max_size=3, ttl=None)
+    for i, term in enumerate(('a', 'b', 'c')):
+        cache.put('tf_idf', [term], 10, fake_result(i))
+
+    # a lookup makes an entry the most recently used, and queries w/ the same terms share an entry
+    assert cache.get('tf_idf', ['a'], 10) is not None, 'A cached query was missed'
+    cache.put('tf_idf', ['d', 'e'], 10, fake_result(3))
+    cache.put('tf_idf', ['e', 'd'], 10, fake_result(4))
+
+    assert len(cache) == 3 and cache.stats()['evictions'] == 1, 'The cache did not evict exactly one entry'
+    assert cache.get('tf_idf', ['b'], 10) is None, 'The least recently used entry was not evicted'
+    assert cache.get('tf_idf', ['a'], 10) is not None and cache.get('tf_idf', ['c'], 10) is not None, \
+        'A recently used entry was evicted'
+    assert cache.get('tf_idf', ['d', 'e'], 10)[0][0] == 4, 'The entry of the reordered query was not replaced'
+
+    assert cache.get('prob', ['a'], 10) is None and cache.get('tf_idf', ['a'], 5) is None, \
+        'Entries of other models or top k were shared'
+    assert 'b' not in cache.keys_by_term, 'The terms of an evicted entry are still referenced'
+
+    return
+
+def test_ttl_expiry(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Expire the entries that are older than the TTL"""
+
+    now = [1000.0]
+    monkeypatch.setattr('query_cache.time.monotonic', lambda: now[0])
+
+    cache = QueryCache(max_size=10, ttl=60)
+    cache.put('tf_idf', ['a'], 10, fake_result(0))
+    now[0] += 30
+    cache.put('tf_idf', ['b'], 10, fake_result(1))
+
+    now[0] += 31
+    assert cache.get('tf_idf', ['a'], 10) is None, 'An entry older than the TTL was returned'
+    assert cache.get('tf_idf', ['b'], 10) is not None, 'An entry younger than the TTL expired'
+    assert len(cache) == 1 and 'a' not in cache.keys_by_term, 'An expired entry was not removed'
+
+    return
+
+def test_feedback_invalidation() -> None:
+    """Drop the cached queries w/ a term updated by feedback, and keep the rest"""
+
+    with scratch_dir():
+        write_pages(make_pages())
+        with redirect_stdout(io.StringIO()):
+            build_vocab_and_index()
+            calc_link_ranks()
+            store_index()
+
+        doc_info, inv_idx, vocab = load_data(silence=True)
+
+    queries = ['cake', 'running dogs', 'history', 'solar energy']
+
+    cache = QueryCache(ttl=None)
+    for i, query in enumerate(queries):
+        cache.put('tf_idf', parse_text(query), 10, fake_result(i))
+
+    # another model's query that shares a term w/ the feedback query (which also has an unknown term)
+    shared = parse_text(f'{queries[0]} {queries[1]}')
+    cache.put('prob', shared, 10, fake_result(len(queries)))
+
+    with redirect_stdout(io.StringIO()):
+        _update_with_feedback(doc_info, inv_idx, vocab, f'{queries[0]} unknownterm', [0, 1, 2], cache)
+
+    assert cache.get('tf_idf', parse_text(queries[0]), 10) is None, 'The query of the updated term is still cached'
+    assert cache.get('prob', shared, 10) is None, 'A query containing the updated term is still cached'
+    assert all( cache.get('tf_idf', parse_text(query), 10) is not None for query in queries[1:] ), \
+        'A query w/o the updated term was invalidated'
+
+    assert cache.stats()['invalidations'] == 2, 'The cache did not count 2 invalidations'
+    assert set(cache.keys_by_term) == { term for query in queries[1:] for term in parse_text(query) }, \
+        'The term references do not match the cached entries'
+
+    return
@@ -0,0 +1,74 @@
+from fake_wiki import WORDS, make_pages, scratch_dir, write_pages
+from helper import INDEX_DIR, load_data
+from link_ranking import calc_link_ranks
+from models import RANKING_MODELS
+from processer import build_vocab_and_index, store_index
+from query_server import QueryServer
+
+import io
+import numpy as np
+import os
+import pytest
+import random
+
+from contextlib import redirect_stdout
+from multiprocessing.shared_memory import SharedMemory
+
+### Declare constants
+NUM_SERVER_QUERIES = 40
+NUM_TEST_WORKERS   = 2
+
+
+### Declare tests
+def server_queries(num_queries: int) -> list[str]:
+    """Random queries of the words of the canned pages (and a few w/o any known terms)"""
+
+    rng = random.Random(11)
+    queries = [ ' '.join(rng.choices(WORDS, k=rng.randint(1, 4))) for _ in range(num_queries) ]
+
+    return queries + ['', 'the and', 'unknownterm']
+
+@pytest.mark.parametrize('use_mmap', (False, True))
+def test_query_server(use_mmap: bool) -> None:
+    """Rank queries on a server (w/ the index in shared memory or memory mapped) and w/ the single query models"""
+
+    queries = server_queries(NUM_SERVER_QUERIES)
+
+    with scratch_dir():
+        write_pages(make_pages())
+        with redirect_stdout(io.StringIO()):
+            build_vocab_and_index()
+            calc_link_ranks()
+            store_index()
+
+        doc_info, inv_idx, vocab = load_data(silence=True)
+        index_dir = os.path.abspath(INDEX_DIR) if use_mmap else None
+
+        with QueryServer(doc_info, inv_idx, vocab, num_workers=NUM_TEST_WORKERS, index_dir=index_dir) as server:
+            shm_names = [ shm.name for shm in server.shms ]
+            assert use_mmap or len(shm_names) == 5, 'The index arrays were not copied into shared memory'
+            assert not use_mmap or not shm_names, 'Shared memory was created for the memory mapped index'
+
+            for model, rank_query in RANKING_MODELS.items():
+                expected = [ rank_query(doc_info, inv_idx, vocab, query, top_k=10, silence=True) for query in queries ]
+
+                for query, (expected_rankings, expected_scores) in zip(queries[:5], expected):
+                    rankings, scores = server.rank(query, model)
+                    assert np.array_equal(rankings, expected_rankings) and np.array_equal(scores, expected_scores), \
+                        f'The {model} ranking of {query!r} on the server does not match'
+
+                for query, (rankings, scores), (expected_rankings, expected_scores) in \
+                        zip(queries, server.rank_many(queries, model), expected):
+                    assert np.array_equal(rankings, expected_rankings) and np.array_equal(scores, expected_scores), \
+                        f'The {model} ranking of {query!r} in a batch on the server does not match'
+
+            workers = list(server.pool._pool)
+
+    assert not any( worker.is_alive() for worker in workers ), 'A worker is still running after the server closed'
+    assert not server.shms, 'The server still holds shared memory after it closed'
+
+    for name in shm_names:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
+
+    return
@@ -0,0 +1,120 @@
+from fake_wiki import ACTION_API_URL, API_URL, fake_server, make_pages
+from resolver import FAILED, RESOLVE_BATCH_SIZE, FakeBackend, MediaWikiBackend, SummaryBackend, apply_resolutions
+from seen_set import SeenSet
+
+import requests
+
+### Declare constants
+NUM_RESOLVE_SLUGS = 200
+
+CLOSED_PORT_URL = 'http://127.0.0.1:9'    # Nothing listens here, so every request fails
+
+
+### Declare tests
+def canonical_pages(pages: dict[str, dict]) -> dict[str, str]:
+    """The canonical slug of each page and alias of the canned pages"""
+
+    canonical = { slug: slug for slug in pages }
+    canonical.update({ f'Alias_{slug[5:]}': slug for slug in pages })
+
+    return canonical
+
+def resolve_slugs(backend: FakeBackend | SummaryBackend | MediaWikiBackend, slugs: list[str],
+                  fake: FakeBackend) -> tuple[list[str], int, int]:
+    """Resolve slugs in batches like an organizer, and compare each batch to the fake backend
+
+    :returns:
+        the pages to crawl
+        num of slugs resolved differently than the fake backend
+        num of slugs whose request failed
+    """
+
+    visited, aliased, omitted = SeenSet(), SeenSet(), SeenSet()
+    aliases: dict[str, str] = dict()
+
+    crawl, num_mismatches, num_failed = list(), 0, 0
+    for i in range(0, len(slugs), RESOLVE_BATCH_SIZE):
+        batch = [ slug for slug in slugs[i:i+RESOLVE_BATCH_SIZE] if slug not in visited and slug not in aliased ]
+        visited.update(batch)
+
+        resolved = backend.resolve(batch)
+        num_mismatches += sum( resolved[slug] != page for slug, page in fake.resolve(batch).items() )
+
+        pages_to_crawl, failed = apply_resolutions(resolved, visited, aliased, omitted, aliases)
+        crawl += [ page[0] for page in pages_to_crawl ]
+        num_failed += len(failed)
+
+    return crawl, num_mismatches, num_failed
+
+def test_resolvers() -> None:
+    """Resolve the links of the canned pages w/ each backend, and compare them to a fake backend"""
+
+    pages = make_pages()
+
+    slugs = list(dict.fromkeys( link for page in pages.values() for link in page['links'] ))[:NUM_RESOLVE_SLUGS]
+    fake = FakeBackend(canonical_pages(pages))
+
+    session = requests.Session()
+    with fake_server(pages):
+        for name, backend in (('Summary', SummaryBackend(session, API_URL)), ('MediaWiki', MediaWikiBackend(session, ACTION_API_URL))):
+            crawl, num_mismatches, num_failed = resolve_slugs(backend, slugs, fake)
+
+            assert num_mismatches == 0, f'{num_mismatches} slugs were resolved differently by the {name} backend'
+            assert num_failed == 0, f'{num_failed} requests of the {name} backend failed'
+            assert len(crawl) == len(set(crawl)), f'A page was crawled more than once w/ the {name} backend'
+    session.close()
+
+    return
+
+def test_failed_requests() -> None:
+    """Resolve slugs while the requests fail, and check that only missing pages are omitted"""
+
+    slugs = [ 'Page_0', 'Alias_1', 'Missing_2', 'Page_3' ]
+
+    # a failed request isn't a missing page
+    session = requests.Session()
+    for name, backend in (('Summary', SummaryBackend(session, f'{CLOSED_PORT_URL}/page')),
+                          ('MediaWiki', MediaWikiBackend(session, f'{CLOSED_PORT_URL}/w/api.php'))):
+        assert backend.resolve(slugs) == { slug: FAILED for slug in slugs }, \
+            f'Failed requests of the {name} backend were not reported as failed'
+    session.close()
+
+    # the failed slugs leave visited (and aren't omitted), so they are resolved again
+    fake = FakeBackend(canonical_pages(make_pages()), num_failures=1)
+    visited, aliased, omitted = SeenSet(), SeenSet(), SeenSet()
+    aliases: dict[str, str] = dict()
+
+    crawl: list[str] = list()
+    for attempt in range(2):
+        batch = [ slug for slug in slugs if slug not in visited and slug not in aliased and slug not in omitted ]
+        visited.update(batch)
+
+        pages_to_crawl, failed = apply_resolutions(fake.resolve(batch), visited, aliased, omitted, aliases)
+        crawl += [ page[0] for page in pages_to_crawl ]
+
+        if attempt == 0:
+            assert failed == slugs and len(crawl) == 0, 'Slugs of the failed request were not reported as failed'
+            assert not any( slug in visited or slug in omitted for slug in slugs ), 'Slugs of the failed request were not left to retry'
+
+    assert sorted(crawl) == [ 'Page_0', 'Page_1', 'Page_3' ], 'Slugs of the retried request were not resolved'
+    assert 'Missing_2' in omitted and len(omitted) == 1, 'Only the missing page should be omitted'
+
+    return
+
+def test_batch_w_alias() -> None:
+    """Resolve a batch w/ a page and its alias, where the page itself isn't resolved (e.g. not cached while offline)"""
+
+    for result in (None, FAILED):
+        visited, aliased, omitted = SeenSet(), SeenSet(), SeenSet()
+        aliases: dict[str, str] = dict()
+
+        batch = [ 'Page_0', 'Alias_0' ]
+        visited.update(batch)
+
+        resolved = { 'Page_0': result, 'Alias_0': ('Page_0', 'Page 0', 'https://en.wikipedia.org/wiki/Page_0') }
+        pages_to_crawl, _ = apply_resolutions(resolved, visited, aliased, omitted, aliases)
+
+        assert [ page[0] for page in pages_to_crawl ] == [ 'Page_0' ] and 'Page_0' in visited, \
+            f'The page was lost when it was {result} and its alias resolved'
+
+    return
@@ -0,0 +1,44 @@
+from fake_wiki import make_pages
+from resolver import CachedBackend, FakeBackend
+from response_cache import ResponseCache, revision_of
+from test_resolver import canonical_pages
+
+import tempfile
+
+### Declare constants
+NUM_RESOLVE_SLUGS = 200
+
+
+### Declare tests
+def test_revisions() -> None:
+    """Parse the revision ids of ETags"""
+
+    assert revision_of('"1234/5678-abcd"') == 1234
+    assert revision_of('W/"99/x"') == 99
+    assert revision_of(None) is None
+
+    return
+
+def test_response_cache() -> None:
+    """Resolve the links of the canned pages through a response cache twice"""
+
+    pages = make_pages()
+
+    slugs = list(dict.fromkeys( link for page in pages.values() for link in page['links'] ))[:NUM_RESOLVE_SLUGS]
+    fake = FakeBackend(canonical_pages(pages))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = ResponseCache(f'{tmp_dir}/resolved.sqlite')
+        backend = CachedBackend(fake, cache)
+        first = backend.resolve(slugs)
+        num_requests = fake.num_requests
+
+        second = backend.resolve(slugs)
+        assert second == first and fake.num_requests == num_requests + 1, 'Cached resolutions were not replayed'
+
+        cache.offline = True
+        assert backend.resolve(['Not_cached']) == {'Not_cached': None}, 'A slug that is not cached was resolved while offline'
+        assert fake.num_requests == num_requests + 1, 'The backend was used while offline'
+        cache.close()
+
+    return
@@ -1,11 +1,17 @@
-from helper import load_data
-from models import prob_ranking, tf_idf_ranking
+from helper import INDEX_DIR, load_data, load_prior_top
+from models import WeightMatrix, prob_ranking, rank_batch, tf_idf_maxscore_ranking, tf_idf_ranking, weighted_ranking
+from query_server import QueryServer
+from run import TOP_NUM_TO_PRINT
 
+import os
 import time
 
+SERVER_WORKER_COUNTS = (1, 2, 4, 8)
+
 def main() -> None:
     # load data
     doc_info, inv_idx, vocab = load_data()
+    prior_top = load_prior_top(doc_info)
 
     queries = [
         "How to bake a chocolate cake",
@@ -111,11 +117,13 @@ def main() -> None:
     ]
 
     print('Testing TF-IDF Model')
+    tf_idf_rankings = list()
     all_query_start = time.time()
     for query in queries:
         # print(f'Query: {query}\n')
         # time_start = time.time()
-        rankings = tf_idf_ranking(doc_info, inv_idx, vocab, query, silence=True)
+        rankings, _ = tf_idf_ranking(doc_info, inv_idx, vocab, query, top_k=TOP_NUM_TO_PRINT, silence=True)
+        tf_idf_rankings.append(rankings)
         # time_end = time.time()
         # query_process_time = time_end - time_start
         # print(f'Query process time: {query_process_time:.2f} seconds\n')
@@ -123,15 +131,32 @@ def main() -> None:
     all_query_end = time.time() - all_query_start
     print(f'\tTime to process {len(queries)} queries: {all_query_end:.2f} seconds')
     average_query_time = all_query_end / len(queries)
-    print(f'\tAverage query process time: {average_query_time:.2f} seconds')
+    print(f'\tAverage query process time: {average_query_time * 1000:.2f} ms')
+    print()
+
+    print('Testing TF-IDF Model w/ MaxScore pruning')
+    num_matching = 0
+    all_query_start = time.time()
+    for query, expected in zip(queries, tf_idf_rankings):
+        rankings, _ = tf_idf_maxscore_ranking(doc_info, inv_idx, vocab, query, top_k=TOP_NUM_TO_PRINT, silence=True,
+                                              prior_top=prior_top)
+        num_matching += (rankings == expected).all()
+
+    all_query_end = time.time() - all_query_start
+    print(f'\tTime to process {len(queries)} queries: {all_query_end:.2f} seconds')
+    average_query_time = all_query_end / len(queries)
+    print(f'\tAverage query process time: {average_query_time * 1000:.2f} ms')
+    print(f'\t{num_matching}/{len(queries)} queries matched the exhaustive top {TOP_NUM_TO_PRINT}')
     print()
 
     print('Testing Probabilistic Model')
+    prob_rankings = list()
     all_query_start = time.time()
     for query in queries:
         # print(f'Query: {query}\n')
         # time_start = time.time()
-        rankings = prob_ranking(doc_info, inv_idx, vocab, query, silence=True)
+        rankings, _ = prob_ranking(doc_info, inv_idx, vocab, query, top_k=TOP_NUM_TO_PRINT, silence=True)
+        prob_rankings.append(rankings)
         # time_end = time.time()
         # query_process_time = time_end - time_start
         # print(f'Query process time: {query_process_time:.2f} seconds\n')
@@ -139,7 +164,52 @@ def main() -> None:
     all_query_end = time.time() - all_query_start
     print(f'\tTime to process {len(queries)} queries: {all_query_end:.2f} seconds')
     average_query_time = all_query_end / len(queries)
-    print(f'\tAverage query process time: {average_query_time:.2f} seconds')
+    print(f'\tAverage query process time: {average_query_time * 1000:.2f} ms')
+    print()
+
+    for model, expected_rankings in (('tf_idf', tf_idf_rankings), ('prob', prob_rankings)):
+        print(f'Testing batch ranking w/ the {model} model')
+        all_query_start = time.time()
+        results = rank_batch(doc_info, inv_idx, vocab, queries, model, top_k=TOP_NUM_TO_PRINT, silence=True)
+        all_query_end = time.time() - all_query_start
+
+        num_matching = sum([ (rankings == expected).all() for (rankings, _), expected in zip(results, expected_rankings) ])
+
+        print(f'\tTime to process {len(queries)} queries: {all_query_end:.2f} seconds')
+        print(f'\tThroughput: {len(queries) / all_query_end:.0f} queries/second')
+        print(f'\t{num_matching}/{len(queries)} queries matched the single query top {TOP_NUM_TO_PRINT}')
+        print()
+
+    for model, expected_rankings in (('tf_idf', tf_idf_rankings), ('prob', prob_rankings)):
+        print(f'Testing precomputed {model} weights')
+        weights = WeightMatrix.load(INDEX_DIR, model)
+
+        num_matching = 0
+        all_query_start = time.time()
+        for query, expected in zip(queries, expected_rankings):
+            rankings, _ = weighted_ranking(doc_info, weights, vocab, query, top_k=TOP_NUM_TO_PRINT, silence=True)
+            num_matching += (rankings == expected).all()
+
+        all_query_end = time.time() - all_query_start
+        print(f'\tTime to process {len(queries)} queries: {all_query_end:.2f} seconds')
+        average_query_time = all_query_end / len(queries)
+        print(f'\tAverage query process time: {average_query_time * 1000:.2f} ms')
+        print(f'\t{num_matching}/{len(queries)} queries matched the single query top {TOP_NUM_TO_PRINT}')
+        print()
+
+    print('Testing query server w/ the tf_idf model')
+    for num_workers in SERVER_WORKER_COUNTS:
+        if num_workers > (os.cpu_count() or 1):
+            break
+
+        with QueryServer(doc_info, inv_idx, vocab, num_workers) as server:
+            server.rank_many(queries[:num_workers], 'tf_idf')   # wait for the workers to start
+
+            all_query_start = time.time()
+            server.rank_many(queries * 10, 'tf_idf', top_k=TOP_NUM_TO_PRINT)
+            all_query_end = time.time() - all_query_start
+
+        print(f'\t{num_workers} workers: {10 * len(queries) / all_query_end:.0f} queries/second')
 
     return
 
@@ -0,0 +1,66 @@
+from seen_set import BloomFilter, SeenSet, ShardedSeenSet
+
+import random
+
+from threading import Thread
+
+### Declare constants
+NUM_SEEN_SLUGS = 50000
+
+NUM_FILTER_THREADS = 8
+
+
+### Declare tests
+def seen_slugs(num_slugs: int) -> tuple[list[str], list[str]]:
+    """Random slugs to add, and slugs that aren't added"""
+
+    rng = random.Random(2)
+    slugs = [ f'Some_Page_Title_{rng.getrandbits(40)}' for _ in range(num_slugs) ]
+    unseen = [ f'Other_Page_Title_{i}' for i in range(num_slugs) ]
+
+    return slugs, unseen
+
+def test_seen_sets() -> None:
+    """Compare a SeenSet, a ShardedSeenSet, and a BloomFilter to a set of slugs"""
+
+    slugs, unseen = seen_slugs(NUM_SEEN_SLUGS)
+    expected = set(slugs)
+
+    for make in (SeenSet, ShardedSeenSet):
+        seen = make()
+        for slug in slugs:
+            seen.add(slug)
+
+        assert len(seen) == len(expected), f'{make.__name__} has {len(seen)} slugs, not {len(expected)}'
+        assert all( slug in seen for slug in slugs ), f'A slug added to a {make.__name__} was not found'
+        assert not any( slug in seen for slug in unseen ), f'A slug not added to a {make.__name__} was found'
+
+    seen_filter = BloomFilter(NUM_SEEN_SLUGS, 0.001)
+    seen_filter.add(slugs)
+
+    assert seen_filter.contains(slugs).all(), 'A slug added to a BloomFilter was not found'
+    assert seen_filter.contains(unseen).mean() < 0.01, 'The false positive rate of a BloomFilter is too high'
+
+    return
+
+def test_concurrent_filter() -> None:
+    """Add slugs to a BloomFilter from many threads at once (so they set bits in the same bytes)"""
+
+    seen_filter = BloomFilter(NUM_SEEN_SLUGS, 0.01)
+    slugs = [ [ f'Page_{i}_{j}' for j in range(NUM_SEEN_SLUGS // NUM_FILTER_THREADS) ] for i in range(NUM_FILTER_THREADS) ]
+
+    def add(i: int) -> None:
+        for j in range(0, len(slugs[i]), 100):
+            seen_filter.add(slugs[i][j:j+100])
+
+        return
+
+    threads = [ Thread(target=add, args=(i,)) for i in range(NUM_FILTER_THREADS) ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all( seen_filter.contains(thread_slugs).all() for thread_slugs in slugs ), 'Slugs added by a thread were lost'
+
+    return